@@ -1,8 +1,14 @@
-import cv2
+import os
+import sys
+
 import mediapipe as mp
 import numpy as np
 from tensorflow.keras.models import load_model
 
+# フレームの処理はリポジトリ直下の frame_pipeline と共通にする
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frame_pipeline import Detect, FramePacket, Preprocess, extract_landmark_data
+
 class GestureRecognizer:
     """
     手のジェスチャーを認識するためのクラス。
@@ -22,6 +28,8 @@ class GestureRecognizer:
             min_detection_confidence=0.5
         )
         self.mp_drawing = mp.solutions.drawing_utils
+        self.preprocess = Preprocess(flip=True)
+        self.detect = Detect(self.hands)
 
         # モデルの読み込み
         try:
@@ -32,11 +40,8 @@ class GestureRecognizer:
             self.model = None
 
     def _extract_landmark_data(self, hand_landmarks):
-        """手のランドマークを1次元のリストに変換する"""
-        landmarks = []
-        for lm in hand_landmarks.landmark:
-            landmarks.extend([lm.x, lm.y, lm.z])
-        return landmarks
+        """手のランドマークを1次元の配列に変換する"""
+        return extract_landmark_data(hand_landmarks)
 
     def _predict_hand_shape(self, landmarks):
         """ランドマークデータから手の形を予測する"""
@@ -75,16 +80,13 @@ class GestureRecognizer:
         label = "unknown"
         confidence = 0.0
 
-        # 画像を水平方向に反転し、RGBに変換
-        frame = cv2.flip(frame, 1)
-        image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-        # 手のランドマークの検出
-        results = self.hands.process(image_rgb)
+        # 画像を水平方向に反転し、手のランドマークを検出
+        packet = self.detect(self.preprocess(FramePacket(frame)))
+        frame = packet.frame
 
         # ランドマークが検出された場合、手の形を判別
-        if results.multi_hand_landmarks:
-            for hand_landmarks in results.multi_hand_landmarks:
+        if packet.multi_hand_landmarks:
+            for hand_landmarks in packet.multi_hand_landmarks:
                 # ランドマークを描画
                 self.mp_drawing.draw_landmarks(
                     frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
@@ -0,0 +1,258 @@
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from frame_sources import RECORDING_FILE
+
+# 認識処理の各層のスループットとレイテンシを計測するベンチマーク。
+# 入力には hand_landmarks.csv のランドマークと、録画済みのフレーム (frame_sources の録画) を使う。
+# 合成フレームには手が写っていないため、--synthetic を指定した場合だけ使い、レポートにもその旨を残す。
+
+LANDMARK_CSV = "hand_landmarks.csv"
+REPORT_FILE = "benchmark_report.json"
+DETECTION_RESOLUTIONS = [(320, 180), (640, 360), (1280, 720), (1920, 1080)]
+BATCH_SIZES = [1, 8, 32, 256]
+
+def time_callable(fn, repeat, warmup=5):
+    """
+    fn を repeat 回実行し、1回あたりの所要時間の統計を返す。
+
+    Returns:
+        dict: mean / p50 / p95 / p99 [ミリ秒] と calls_per_sec。
+    """
+    for _ in range(warmup):
+        fn()
+    durations = np.empty(repeat, dtype=np.float64)
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        fn()
+        durations[i] = time.perf_counter() - start_time
+    durations_ms = durations * 1000
+    return {
+        "repeat": repeat,
+        "mean_ms": float(durations_ms.mean()),
+        "p50_ms": float(np.percentile(durations_ms, 50)),
+        "p95_ms": float(np.percentile(durations_ms, 95)),
+        "p99_ms": float(np.percentile(durations_ms, 99)),
+        "calls_per_sec": float(repeat / durations.sum()),
+    }
+
+def measure_allocations(fn, repeat):
+    """
+    fn の1回あたりの一時的なメモリ確保量 (tracemalloc のピーク増分) と
+    GCの実行回数を計測する。NumPyの配列も tracemalloc の対象になる。
+
+    Returns:
+        dict: 1回あたりの確保ピークの平均 [バイト] と、計測中のGC実行回数。
+    """
+    fn()
+    gc_before = sum(stat["collections"] for stat in gc.get_stats())
+    tracemalloc.start()
+    peaks = np.empty(repeat, dtype=np.float64)
+    for i in range(repeat):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        peaks[i] = peak - current
+    tracemalloc.stop()
+    gc_after = sum(stat["collections"] for stat in gc.get_stats())
+    return {
+        "alloc_peak_bytes_mean": float(peaks.mean()),
+        "gc_collections": gc_after - gc_before,
+    }
+
+def load_landmarks(csv_path=LANDMARK_CSV):
+    """CSVからランドマーク (N, 63) とラベルを読み込む"""
+    df = pd.read_csv(csv_path)
+    X = df.drop('label', axis=1).values.astype(np.float32)
+    y = df['label'].values
+    return X, y
+
+def to_hand_landmarks(row):
+    """63次元のベクトルを MediaPipe の hand_landmarks と同じ形のオブジェクトに変換する"""
+    points = row.reshape(21, 3)
+    return SimpleNamespace(landmark=[SimpleNamespace(x=float(x), y=float(y), z=float(z)) for x, y, z in points])
+
+def load_frames(frames_path, max_frames=100, synthetic=False):
+    """
+    録画ファイルからフレームを読み込む。
+
+    Args:
+        frames_path (str): 録画ファイル。
+        max_frames (int): 読み込む最大フレーム数。
+        synthetic (bool): True なら録画の代わりに手の写っていない合成フレーム (1280x720) を使う。
+    """
+    from frame_sources import ReplaySource, SyntheticSource
+
+    if synthetic:
+        source = SyntheticSource(1280, 720, num_frames=max_frames)
+    else:
+        source = ReplaySource(frames_path, realtime=False)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = source.read()
+        if not ret:
+            break
+        frames.append(frame)
+    source.release()
+    if not frames:
+        raise ValueError(f"No frames could be read from {frames_path}")
+    return frames
+
+def bench_extraction(recognizer, X, repeat):
+    """ランドマーク抽出 (_extract_landmark_data) の計測"""
+    hands = itertools.cycle([to_hand_landmarks(row) for row in X[:repeat]])
+    out = np.empty(63, dtype=np.float32)
+    result = time_callable(lambda: recognizer._extract_landmark_data(next(hands), out), repeat)
+    return [dict(name="extract_landmarks", **result)]
+
+def bench_classification(engines, model_path, X, repeat):
+    """各エンジンの1行推論とバッチ推論の計測"""
+    from discrimination_app import load_engine
+
+    results = []
+    for engine_name in engines:
+        try:
+            engine = load_engine(model_path, engine_name)
+        except Exception as e:
+            print(f"Skipping engine {engine_name}: {e}")
+            continue
+        for batch_size in BATCH_SIZES:
+            batch = X[:batch_size]
+            result = time_callable(lambda: engine.predict(batch, verbose=0), max(repeat // batch_size, 10))
+            result["rows_per_sec"] = result["calls_per_sec"] * batch_size
+            results.append(dict(name="classify", engine=engine_name, batch_size=batch_size, **result))
+    return results
+
+def bench_prediction_cache(engines, model_path, X, repeat):
+    """
+    1行の予測について、キャッシュ無しの順伝播とキャッシュにヒットした場合の参照 (キー計算を含む) を比較する。
+    discrimination_app.CACHED_ENGINES はこの結果で cache_faster になったエンジンに合わせる。
+    """
+    from discrimination_app import GestureRecognizer
+    from prediction_cache import PredictionCache
+
+    results = []
+    rows = X[:repeat]
+    for engine_name in engines:
+        recognizer = GestureRecognizer(model_path=model_path, engine=engine_name, prediction_cache=None)
+        if recognizer.model is None:
+            recognizer.release()
+            continue
+        row_cycle = itertools.cycle([row[np.newaxis, :] for row in rows])
+        cold = time_callable(lambda: recognizer._predict_batch(next(row_cycle)), repeat)
+
+        recognizer.prediction_cache = PredictionCache(maxsize=len(rows))
+        for row in rows:
+            recognizer._predict_cached(row[np.newaxis, :])
+        hit = time_callable(lambda: recognizer._predict_cached(next(row_cycle)), repeat)
+        recognizer.release()
+
+        results.append(dict(name="predict_cold", engine=engine_name, **cold))
+        results.append(dict(name="predict_cache_hit", engine=engine_name,
+                            cache_faster=hit["p50_ms"] < cold["p50_ms"], **hit))
+    return results
+
+def bench_detection(recognizer, frames, repeat, frames_label="replay"):
+    """MediaPipe Hands.process を解像度ごとに計測する"""
+    results = []
+    for width, height in DETECTION_RESOLUTIONS:
+        images = itertools.cycle([cv2.cvtColor(cv2.resize(frame, (width, height)), cv2.COLOR_BGR2RGB)
+                                  for frame in frames])
+        result = time_callable(lambda: recognizer.hands.process(next(images)), repeat)
+        results.append(dict(name="hands_process", width=width, height=height, frames=frames_label, **result))
+    return results
+
+def bench_end_to_end(recognizer, frames, repeat, frames_label="replay"):
+    """GestureRecognizer.recognize 全体の計測"""
+    frame_cycle = itertools.cycle(frames)
+    result = time_callable(lambda: recognizer.recognize(next(frame_cycle)), repeat)
+    result.update(measure_allocations(lambda: recognizer.recognize(next(frame_cycle)), repeat))
+    height, width = frames[0].shape[:2]
+    return [dict(name="recognize", width=width, height=height, frames=frames_label, **result)]
+
+def environment_info():
+    """比較のための実行環境の情報"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.time(),
+        "commit": commit,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the gesture recognition stack.")
+    parser.add_argument("--model", default="model.h5")
+    parser.add_argument("--landmarks", default=LANDMARK_CSV, help="入力に使うランドマークCSV")
+    parser.add_argument("--frames", default=RECORDING_FILE, help="入力に使う録画ファイル")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="録画の代わりに合成フレームを使う (手が写っていないため、検出と分類の負荷は実際と異なる)")
+    parser.add_argument("--engines", nargs="+", default=["numpy", "keras", "knn", "prototype"])
+    parser.add_argument("--only", nargs="+", choices=["extract", "classify", "cache", "detect", "e2e"],
+                        default=["extract", "classify", "detect", "e2e"])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--output", default=REPORT_FILE)
+    args = parser.parse_args()
+
+    uses_frames = bool({"detect", "e2e"} & set(args.only))
+    if uses_frames and not args.synthetic and not os.path.exists(args.frames):
+        parser.error(f"{args.frames} not found. Record one with 'python frame_sources.py record {args.frames}' "
+                     "or pass --synthetic to use frames without hands.")
+    frames_label = "synthetic" if args.synthetic else "replay"
+
+    from discrimination_app import GestureRecognizer
+
+    X, _ = load_landmarks(args.landmarks)
+    recognizer = GestureRecognizer(model_path=args.model, engine=args.engines[0])
+    frames = load_frames(args.frames, synthetic=args.synthetic) if uses_frames else []
+
+    results = []
+    if "extract" in args.only:
+        results += bench_extraction(recognizer, X, args.repeat)
+    if "classify" in args.only:
+        results += bench_classification(args.engines, args.model, X, args.repeat)
+    if "cache" in args.only:
+        results += bench_prediction_cache(args.engines, args.model, X, args.repeat)
+    if "detect" in args.only:
+        results += bench_detection(recognizer, frames, args.repeat, frames_label)
+    if "e2e" in args.only:
+        results += bench_end_to_end(recognizer, frames, args.repeat, frames_label)
+    recognizer.release()
+
+    inputs = {"landmarks": args.landmarks,
+              "frames": ("synthetic" if args.synthetic else args.frames) if uses_frames else None}
+    report = {"environment": environment_info(), "args": vars(args), "inputs": inputs, "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for result in results:
+        params = ", ".join(f"{k}={v}" for k, v in result.items()
+                           if k in ("engine", "batch_size", "width", "height", "frames"))
+        print(f"{result['name']:<18} {params:<32} p50 {result['p50_ms']:8.3f} ms  "
+              f"p95 {result['p95_ms']:8.3f} ms  {result['calls_per_sec']:10.1f} calls/s")
+    if uses_frames and args.synthetic:
+        print("NOTE: detect / e2e used synthetic frames without hands (frames=synthetic in the report)")
+    print(f"Report saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import numpy as np
+
+class CascadeEngine:
+    """
+    安い第1段 (プロトタイプとの距離など) で明らかな手の形を判定し、
+    第1段の上位2クラスの差 (マージン) が校正した値より小さい行だけ第2段 (model.h5) で推論するエンジン。
+    set_target() でお題を指定すると、第1段が「お題ではない」と判断できる行も第2段を省略する。
+    他のエンジンと同じく predict(x) で (batch, クラス数) の確率を返す。
+    """
+    def __init__(self, fast, full, match_threshold=0.8):
+        """
+        Args:
+            fast: 第1段のエンジン (predict(x) を持つもの)。
+            full: 第2段のエンジン。
+            match_threshold (float): ゲームが一致とみなす信頼度。お題の判定の校正に使う。
+        """
+        self.fast = fast
+        self.full = full
+        self.match_threshold = match_threshold
+
+        # calibrate() で決める値。校正するまでは常に第2段を使う
+        self.margin = np.inf
+        self.accept_confidence = 1.0
+        self.reject_thresholds = None # お題のクラスごとの確率の下限。None なら棄却しない
+        self.target = None # お題のクラス番号
+
+        self.fast_answers = 0
+        self.target_rejects = 0
+        self.full_answers = 0
+
+    def calibrate(self, X, agreement=0.99):
+        """
+        第1段が答えた行のうち第2段と一致する割合が agreement 以上になるよう、マージンの閾値を決める。
+        また、お題のクラスごとに、第2段がそのクラスと一致と判定する行 (信頼度 > match_threshold) のうち
+        第1段で棄却されるものが 1 - agreement 以下になるよう、お題の確率の下限を決める。
+        第1段の学習に使っていないデータで校正すること (学習データでは第1段が実際より自信を持つ)。
+
+        Args:
+            X (np.ndarray): 校正に使う形状 (N, 63) のランドマーク。
+            agreement (float): 目標とする第2段との一致率。
+        """
+        fast_p = self.fast.predict(X)
+        full_p = np.array(self.full.predict(X, verbose=0))
+        fast_top = fast_p.argmax(axis=1)
+        full_top = full_p.argmax(axis=1)
+
+        top2 = np.partition(fast_p, -2, axis=1)[:, -2:]
+        margins = top2[:, 1] - top2[:, 0]
+        order = np.argsort(-margins)
+        precision = np.cumsum(fast_top[order] == full_top[order]) / np.arange(1, len(order) + 1)
+        passing = np.flatnonzero(precision >= agreement)
+        if len(passing):
+            last = passing[-1]
+            self.margin = float(margins[order][last])
+            self.accept_confidence = float(precision[last])
+        else:
+            self.margin = np.inf
+
+        # 全クラスで1つの下限にすると、第1段が苦手なクラスに引きずられてほぼ0になるため、クラスごとに決める。
+        # 校正データで第2段が一致と判定した行が無いクラスは棄却しない (下限0)
+        matched = full_p.max(axis=1) > self.match_threshold
+        self.reject_thresholds = np.zeros(fast_p.shape[1], dtype=np.float32)
+        for target in np.unique(full_top[matched]):
+            target_p = fast_p[matched & (full_top == target), target]
+            self.reject_thresholds[target] = min(float(np.quantile(target_p, 1 - agreement)), self.match_threshold)
+        return self
+
+    def set_target(self, target):
+        """お題のクラス番号を指定する。None なら通常の判定のみ行う"""
+        self.target = target
+
+    def predict(self, x, verbose=0):
+        """
+        Args:
+            x: 形状 (batch, 63) の生のランドマーク。
+            verbose: Kerasとの互換用 (未使用)。
+
+        Returns:
+            np.ndarray: 形状 (batch, クラス数) の確率。第1段で答えた行は、予測したクラスに
+            校正時の一致率 (accept_confidence) を置いたものになる。
+        """
+        x = np.asarray(x, dtype=np.float32).reshape(-1, 63)
+        fast_p = self.fast.predict(x)
+        rows = np.arange(len(x))
+        fast_top = fast_p.argmax(axis=1)
+        top2 = np.partition(fast_p, -2, axis=1)[:, -2:]
+        accepted = top2[:, 1] - top2[:, 0] >= self.margin
+
+        probabilities = np.zeros_like(fast_p)
+        probabilities[rows[accepted], fast_top[accepted]] = self.accept_confidence
+        remaining = ~accepted
+
+        # お題の確率が十分低ければ、どのクラスかを決めなくても「一致しない」ことは確定する
+        if self.target is not None and self.reject_thresholds is not None:
+            rejected = remaining & (fast_p[:, self.target] < self.reject_thresholds[self.target])
+            probabilities[rejected] = fast_p[rejected]
+            remaining &= ~rejected
+            self.target_rejects += int(rejected.sum())
+
+        if remaining.any():
+            probabilities[remaining] = self.full.predict(x[remaining], verbose=0)
+        self.fast_answers += int(accepted.sum())
+        self.full_answers += int(remaining.sum())
+        return probabilities
+
+    def stats(self):
+        total = self.fast_answers + self.target_rejects + self.full_answers
+        return {
+            "fast": self.fast_answers,
+            "target_reject": self.target_rejects,
+            "full": self.full_answers,
+            "fast_rate": (self.fast_answers + self.target_rejects) / total if total else 0.0,
+        }
+
+    def summary_text(self):
+        stats = self.stats()
+        total = stats["fast"] + stats["target_reject"] + stats["full"]
+        return (f"cascade: stage1 {stats['fast_rate'] * 100:.0f}% "
+                f"(confident {stats['fast']}, not target {stats['target_reject']}), "
+                f"stage2 {stats['full']}/{total}")
+
+if __name__ == "__main__":
+    # 第2段のみとカスケードの一致率・1行あたりのレイテンシの比較
+    import argparse
+
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+
+    from benchmark import time_callable
+    from discrimination_app import ENGINES, SORTED_WORD, load_engine
+    from knn_engine import LANDMARK_CSV, KnnInferenceEngine
+
+    parser = argparse.ArgumentParser(description="Compare the confidence cascade with the full model.")
+    parser.add_argument("--model", default="model.h5")
+    parser.add_argument("--engine", default="keras", choices=[e for e in ENGINES if e not in ('knn', 'prototype')])
+    parser.add_argument("--agreement", type=float, default=0.99)
+    args = parser.parse_args()
+
+    df = pd.read_csv(LANDMARK_CSV)
+    X = df.drop('label', axis=1).values.astype(np.float32)
+    y = df['label'].values.astype(str)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    full = load_engine(args.model, args.engine)
+    X_fit, X_calibrate, y_fit, _ = train_test_split(X_train, y_train, test_size=0.25, random_state=0,
+                                                     stratify=y_train)
+    fast = KnnInferenceEngine(X_fit, y_fit, labels=SORTED_WORD, mode='prototype')
+    cascade = CascadeEngine(fast, full).calibrate(X_calibrate, args.agreement)
+    thresholds = cascade.reject_thresholds[cascade.reject_thresholds > 0]
+    print(f"Calibrated margin {cascade.margin:.4f} (agreement {cascade.accept_confidence * 100:.2f}%), "
+          f"target reject below a median of {np.median(thresholds) if len(thresholds) else 0:.4f} "
+          f"({len(thresholds)} classes)")
+
+    # ゲームと同じく、お題と一致するかどうか (ラベルが一致し信頼度が閾値を超える) の判定を比べる
+    rng = np.random.default_rng(0)
+    present = sorted(set(y_test))
+    targets = [label if rng.random() < 0.5 else rng.choice(present) for label in y_test]
+    rows = [(X_test[i:i + 1], SORTED_WORD.index(t)) for i, t in enumerate(targets)]
+
+    def decisions(engine, use_target):
+        result = []
+        for row, target in rows:
+            if use_target:
+                engine.set_target(target)
+            p = np.array(engine.predict(row, verbose=0))[0]
+            result.append(p.argmax() == target and p.max() > cascade.match_threshold)
+        return np.array(result)
+
+    full_decisions = decisions(full, False)
+    row_cycle = iter(rows * 1000)
+    full_latency = time_callable(lambda: full.predict(next(row_cycle)[0], verbose=0), len(rows))
+    for use_target in (False, True):
+        cascade.fast_answers = cascade.target_rejects = cascade.full_answers = 0
+        cascade_decisions = decisions(cascade, use_target)
+        stats = cascade.stats()
+        cascade.set_target(None)
+        row_cycle = iter(rows * 1000)
+
+        def run():
+            row, target = next(row_cycle)
+            if use_target:
+                cascade.set_target(target)
+            cascade.predict(row)
+
+        latency = time_callable(run, len(rows))
+        print(f"{'prompt-aware' if use_target else 'cascade':<13} stage1 {stats['fast_rate'] * 100:5.1f}%  "
+              f"decision agreement {(cascade_decisions == full_decisions).mean() * 100:6.2f}%  "
+              f"mean {latency['mean_ms']:.3f} ms vs full {full_latency['mean_ms']:.3f} ms "
+              f"({(1 - latency['mean_ms'] / full_latency['mean_ms']) * 100:+.1f}% saved)")
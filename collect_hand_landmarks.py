@@ -1,10 +1,27 @@
+import argparse
+import time
+
 import cv2
 import mediapipe as mp
-import pandas as pd
-import os
 
+from frame_pipeline import FramePipeline
+from landmark_store import LandmarkShardWriter, export_csv
+
+# 収集したサンプルはこのディレクトリにシャードとして逐次保存する。
+# 同じディレクトリで再実行すると、前回の続きから追記する
+output_dir = "hand_landmarks_ta"
 csv_file = "hand_landmarks_ta.csv"
 
+# --sequence N を指定すると、スペースキーを押すごとに連続した N フレームを1つのシーケンスとして記録する
+# (動きのある文字用。temporal_window.py train でシーケンスモデルを学習する)。
+# シーケンスは1フレームのサンプルと混ざらないよう、別のディレクトリに保存する
+parser = argparse.ArgumentParser( description="Collect hand landmarks for training.")
+parser.add_argument( "--sequence", type=int, default=0, help="1シーケンスのフレーム数 (0なら1フレームずつ記録する)")
+args = parser.parse_args()
+sequence_length = args.sequence
+if sequence_length:
+    output_dir = "hand_landmarks_seq"
+
 # MediaPipe Handsのセットアップ
 mp_hands = mp.solutions.hands
 hands = mp_hands.Hands( static_image_mode=False, max_num_hands=1, min_detection_confidence=0.5)
@@ -13,67 +30,107 @@ mp_drawing = mp.solutions.drawing_utils
 # カメラのセットアップ
 cap = cv2.VideoCapture(0)
 
-# 手の座標データを収集
-landmarks_data = []
-
-def collect_landmarks( label):
-    global landmarks_data
+def collect_landmarks( writer, label):
     count = 0
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print( "Failed to capture image")
-            break
-
-        # 画像を水平方向に反転
-        frame = cv2.flip( frame, 1)
-
-        # 画像をRGBに変換
-        image = cv2.cvtColor( frame, cv2.COLOR_BGR2RGB)
-
-        # 手のランドマークの検出
-        results = hands.process( image)
+    stopped = False
 
-        # 画像をBGRに戻す
-        frame = cv2.cvtColor( image, cv2.COLOR_RGB2BGR)
+    # 取得 → 反転 → 検出 → ランドマーク抽出 は frame_pipeline の各段で行う
+    # (表示用のフレームはBGRのままなので、検出後に色を戻す必要は無い)
+    def collect( packet):
+        nonlocal count, stopped
+        frame = packet.frame
 
         # ランドマークが検出された場合、データを収集
-        if results.multi_hand_landmarks:
-            for hand_landmarks in results.multi_hand_landmarks:
-                landmarks = []
-                for lm in hand_landmarks.landmark:
-                    landmarks.extend( [ lm.x, lm.y, lm.z])
-                landmarks.append( label)
-                landmarks_data.append( landmarks)
-                mp_drawing.draw_landmarks( frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
-                count += 1
-                print( f"Collected {count} images for {label}")
+        for i, hand_landmarks in enumerate( packet.multi_hand_landmarks[ :len( packet.landmarks)]):
+            writer.append( packet.landmarks[ i], label, packet.handedness[ i] if packet.handedness else None)
+            mp_drawing.draw_landmarks( frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+            count += 1
+            print( f"Collected {count} images for {label}")
 
         # 画像を表示
         cv2.imshow( 'Hand Landmarks', frame)
 
         # 'q'キーが押されたら終了
-        if cv2.waitKey( 1) & 0xFF == ord( 'q'):
-            break
+        stopped = cv2.waitKey( 1) & 0xFF == ord( 'q')
+        return not stopped
+
+    pipeline = FramePipeline( cap).preprocess().detect( hands).extract( max_num_hands=1)
+    pipeline.run( collect)
+    if not stopped:
+        print( "Failed to capture image")
+
+    print( f'Collected {count} data points for {label} ({writer.label_counts.get( label, 0)} in total)')
+
+def collect_sequences( writer, label):
+    count = 0
+    stopped = False
+    recording = None # 記録中のシーケンスの (ランドマーク, 時刻) のリスト
+
+    def collect( packet):
+        nonlocal count, stopped, recording
+        frame = packet.frame
+
+        if recording is not None:
+            if len( packet.landmarks) == 0:
+                # 途中で手を見失ったシーケンスは捨てる
+                print( "Hand lost; sequence discarded")
+                recording = None
+            else:
+                recording.append( ( packet.landmarks[ 0].copy(), time.time()))
+                if len( recording) == sequence_length:
+                    frames, timestamps = zip( *recording)
+                    writer.append_sequence( frames, label, packet.handedness[ 0] if packet.handedness else None,
+                                            timestamps)
+                    recording = None
+                    count += 1
+                    print( f"Collected {count} sequences for {label}")
+
+        for hand_landmarks in packet.multi_hand_landmarks:
+            mp_drawing.draw_landmarks( frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+        status = f"REC {len( recording)}/{sequence_length}" if recording is not None else "Press SPACE to record"
+        cv2.putText( frame, status, ( 10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, ( 0, 0, 255), 2, cv2.LINE_AA)
+        cv2.imshow( 'Hand Landmarks', frame)
+
+        # スペースキーで記録開始、'q'キーで終了
+        key = cv2.waitKey( 1) & 0xFF
+        if key == ord( ' ') and recording is None:
+            recording = []
+        stopped = key == ord( 'q')
+        return not stopped
+
+    pipeline = FramePipeline( cap).preprocess().detect( hands).extract( max_num_hands=1)
+    pipeline.run( collect)
+    if not stopped:
+        print( "Failed to capture image")
 
-    print( f'Collected { len( landmarks_data)} data points for {label}')
+    print( f'Collected {count} sequences for {label} ({writer.label_counts.get( label, 0)} in total)')
 
 # データ収集のための指示    
 #word = ['a', 'i', 'u', 'e', 'o', 'ka', 'ki', 'ku', 'ke', 'ko', 'sa', 'shi', 'su', 'se', 'so', 'ta', 'chi', 'tsu', 'te', 'to', 'na', 'ni', 'nu', 'ne', 'ha', 'hi', 'hu', 'he', 'ho', 'ma', 'mi', 'mu', 'me', 'ya', 'yu', 'yo', 'ra', 'ru', 're', 'ro', 'wa']
 word = ["a","i","u","e","o","ka","ki","ku","ke","ko","sa","shi","su","se","so","ta","chi","tsu","te","to"]
 word = ["ta","chi","tsu","te","to"]
-for i in word:
-    input(f"Press Enter to collect data for {i}...")
-    collect_landmarks(i)
-
-# データをCSVファイルに保存
-try:
-    columns = [f'x{i}' for i in range( 21)] + [f'y{i}' for i in range( 21)] + [f'z{i}' for i in range( 21)] + ['label']
-    df = pd.DataFrame( landmarks_data, columns=columns)
-    df.to_csv( csv_file, index=False)
-    print( f'Data saved successfully to { csv_file}')
-except Exception as e:
-    print( f'Error saving data: {e}')
+with LandmarkShardWriter( output_dir) as writer:
+    for i in word:
+        # 再開時は収集済みのラベルを飛ばせるようにする
+        collected = writer.label_counts.get( i, 0)
+        if collected:
+            answer = input( f"{i} already has {collected} samples. Press Enter to add more, or 's' to skip...")
+            if answer.strip().lower() == 's':
+                continue
+        else:
+            input(f"Press Enter to collect data for {i}...")
+        if sequence_length:
+            collect_sequences( writer, i)
+        else:
+            collect_landmarks( writer, i)
+
+# 学習スクリプト用にCSVにも書き出す (シーケンスはシャードのまま使う)
+if not sequence_length:
+    try:
+        rows = export_csv( output_dir, csv_file)
+        print( f'Data saved successfully to { csv_file} ({rows} rows)')
+    except Exception as e:
+        print( f'Error saving data: {e}')
 
 # リソースの解放
 cap.release()
@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import tracemalloc
+
+import numpy as np
+
+from gesture_model import load_labels, save_labels
+from numpy_engine import NumpyInferenceEngine, _apply_activation, load_dense_layers
+
+# model.h5 の重みを圧縮した軽量版 (.npz) を作り、GestureRecognizer の 'compact' エンジンで実行できるようにする。
+#   float32   重みをそのまま保存 (比較の基準)
+#   float16   重みを半精度で保存
+#   int8      重みを出力ユニットごとのスケールで8ビット整数に量子化 (学習後量子化)
+#   prunedNN  絶対値の小さい重みを NN% 0にし、残りの重みだけを保存
+# int8 は Int8InferenceEngine で、行ごとに量子化した入力と int8 の重みの整数の行列積 (int32 で累積) を行い、
+# 積のあとにスケールを掛けて戻す。float16 と pruned は保存形式だけの圧縮で、読み込み時に float32 に戻して
+# NumpyInferenceEngine で計算する (NumPy には float16 の高速な行列積が無い)。
+# レポートの compute 列はこの計算の型で、float32 の行のレイテンシは float32 の行列積の計測になる。
+
+# 各形式の推論時の計算の型
+COMPUTE_DTYPES = {'float32': 'float32', 'float16': 'float32', 'int8': 'int8',
+                  'pruned50': 'float32', 'pruned80': 'float32'}
+
+VARIANTS = ('float32', 'float16', 'int8', 'pruned50', 'pruned80')
+
+def compress_layers(layers, variant):
+    """
+    (kernel, bias, activation) のリストを variant の形式の配列の辞書にする。
+
+    Returns:
+        dict: np.savez に渡す配列の辞書。
+    """
+    arrays = {
+        "variant": np.array(variant),
+        "activations": np.array(json.dumps([activation for _, _, activation in layers])),
+    }
+    for i, (kernel, bias, _) in enumerate(layers):
+        arrays[f"b{i}"] = bias.astype(np.float32)
+        arrays[f"shape{i}"] = np.array(kernel.shape)
+        if variant == 'float32':
+            arrays[f"k{i}"] = kernel.astype(np.float32)
+        elif variant == 'float16':
+            arrays[f"k{i}"] = kernel.astype(np.float16)
+        elif variant == 'int8':
+            # 出力ユニット (列) ごとに対称なスケールで量子化する
+            scale = np.abs(kernel).max(axis=0) / 127
+            scale[scale == 0] = 1.0
+            arrays[f"k{i}"] = np.clip(np.rint(kernel / scale), -127, 127).astype(np.int8)
+            arrays[f"scale{i}"] = scale.astype(np.float32)
+        elif variant.startswith('pruned'):
+            sparsity = int(variant[len('pruned'):]) / 100
+            flat = kernel.ravel()
+            threshold = np.quantile(np.abs(flat), sparsity)
+            index = np.flatnonzero(np.abs(flat) > threshold)
+            arrays[f"index{i}"] = index.astype(np.uint32)
+            arrays[f"k{i}"] = flat[index].astype(np.float32)
+        else:
+            raise ValueError(f"Unknown variant: {variant}")
+    return arrays
+
+def save_compact(layers, path, variant):
+    """軽量版のモデルを圧縮した .npz として保存する"""
+    with open(path, "wb") as f:
+        np.savez_compressed(f, **compress_layers(layers, variant))
+
+class Int8InferenceEngine:
+    """
+    int8 に量子化した重みのまま推論するエンジン (動的量子化)。
+    各層の入力を行ごとに対称なスケールで int8 にし、int8 の重みとの行列積を int32 で累積してから、
+    入力のスケールと出力ユニットごとの重みのスケールを掛けて float32 に戻す。
+    NumpyInferenceEngine と同じ predict(x) を持つ。
+    """
+    def __init__(self, layers):
+        """
+        Args:
+            layers (list): (int8 の kernel, 出力ユニットごとのスケール, bias, activation) のリスト。
+        """
+        self.layers = layers
+        self.input_dim = layers[0][0].shape[0]
+        self.output_dim = layers[-1][0].shape[1]
+
+    def predict(self, x, verbose=0):
+        """
+        Args:
+            x: 形状 (batch, input_dim) の入力。
+            verbose: Kerasとの互換用 (未使用)。
+
+        Returns:
+            np.ndarray: 形状 (batch, output_dim) の確率。
+        """
+        h = np.asarray(x, dtype=np.float32).reshape(-1, self.input_dim)
+        for kernel, scale, bias, activation in self.layers:
+            input_scale = np.abs(h).max(axis=1, keepdims=True) / 127
+            input_scale[input_scale == 0] = 1.0
+            quantized = np.rint(h / input_scale).astype(np.int8)
+            accumulated = np.matmul(quantized, kernel, dtype=np.int32)
+            h = accumulated.astype(np.float32)
+            h *= input_scale
+            h *= scale
+            h += bias
+            _apply_activation(h, activation)
+        return h
+
+def load_int8_layers(path):
+    """int8 形式で保存したモデルを、量子化したままの (kernel, scale, bias, activation) のリストで読む"""
+    with np.load(path) as data:
+        if str(data["variant"]) != 'int8':
+            raise ValueError(f"{path} is not an int8 model")
+        activations = json.loads(str(data["activations"]))
+        return [(np.ascontiguousarray(data[f"k{i}"]), data[f"scale{i}"], data[f"b{i}"], activation)
+                for i, activation in enumerate(activations)]
+
+def load_compact_layers(path):
+    """
+    save_compact で保存したモデルを読み、float32 の (kernel, bias, activation) のリストに戻す。
+    """
+    with np.load(path) as data:
+        variant = str(data["variant"])
+        activations = json.loads(str(data["activations"]))
+        layers = []
+        for i, activation in enumerate(activations):
+            shape = tuple(data[f"shape{i}"])
+            if variant.startswith('pruned'):
+                kernel = np.zeros(int(np.prod(shape)), dtype=np.float32)
+                kernel[data[f"index{i}"]] = data[f"k{i}"]
+                kernel = kernel.reshape(shape)
+            elif variant == 'int8':
+                kernel = data[f"k{i}"].astype(np.float32) * data[f"scale{i}"]
+            else:
+                kernel = data[f"k{i}"].astype(np.float32)
+            layers.append((np.ascontiguousarray(kernel), data[f"b{i}"], activation))
+    return layers
+
+def load_compact_engine(path):
+    """GestureRecognizer の 'compact' エンジン。int8 は整数の行列積で、それ以外は float32 で計算する"""
+    with np.load(path) as data:
+        variant = str(data["variant"])
+    if variant == 'int8':
+        return Int8InferenceEngine(load_int8_layers(path))
+    return NumpyInferenceEngine(layers=load_compact_layers(path))
+
+def evaluate_variant(name, load, path, X_test, y_test, labels):
+    """
+    1つのモデルについて、ラベルごとの正解率、1行推論のレイテンシ、バッチのスループット、
+    ファイルサイズ、読み込み後のメモリ量を計測する。レイテンシは compute の型での計算の計測になる。
+    """
+    from benchmark import time_callable
+
+    tracemalloc.start()
+    engine = load(path)
+    memory_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    predicted = np.asarray(labels)[engine.predict(X_test).argmax(axis=1)]
+    correct = predicted == y_test
+    single = time_callable(lambda: engine.predict(X_test[:1]), 2000)
+    batch = X_test[:256]
+    batched = time_callable(lambda: engine.predict(batch), 200)
+    return {
+        "variant": name,
+        "compute": COMPUTE_DTYPES.get(name, 'float32'),
+        "path": path,
+        "file_bytes": os.path.getsize(path),
+        "memory_bytes": int(memory_bytes),
+        "accuracy": float(correct.mean()),
+        "per_class_accuracy": {str(label): float(correct[y_test == label].mean()) for label in np.unique(y_test)},
+        "single_p50_ms": single["p50_ms"],
+        "single_p95_ms": single["p95_ms"],
+        "batch_rows_per_sec": batched["calls_per_sec"] * len(batch),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Build compact variants of the classifier and compare them.")
+    parser.add_argument("--model", default="model.h5")
+    parser.add_argument("--data", nargs="+", default=["hand_landmarks.csv"],
+                        help="評価に使うランドマークのCSV、シャードのディレクトリ、またはストア")
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument("--output-dir", default="compact_models")
+    parser.add_argument("--report", default="compact_report.json")
+    args = parser.parse_args()
+
+    from sklearn.model_selection import train_test_split
+
+    from dataset_store import read_sources
+
+    labels = load_labels(args.model)
+    if labels is None:
+        from discrimination_app import SORTED_WORD
+        labels = SORTED_WORD
+
+    # data_Preprocessing.py と同じ分割のテスト側だけを使う
+    X, y, _ = read_sources(args.data)
+    _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    layers = load_dense_layers(args.model)
+    stem = os.path.splitext(os.path.basename(args.model))[0]
+    results = [evaluate_variant("h5", NumpyInferenceEngine, args.model, X_test, y_test, labels)]
+    for variant in args.variants:
+        path = os.path.join(args.output_dir, f"{stem}.{variant}.npz")
+        save_compact(layers, path, variant)
+        save_labels(path, labels)
+        results.append(evaluate_variant(variant, load_compact_engine, path, X_test, y_test, labels))
+
+    print(f"{'variant':<9} {'compute':>8} {'file KB':>8} {'mem KB':>8} {'accuracy':>9} {'single p50':>11} "
+          f"{'batch rows/s':>13}")
+    for r in results:
+        print(f"{r['variant']:<9} {r['compute']:>8} {r['file_bytes'] / 1024:8.1f} {r['memory_bytes'] / 1024:8.1f} "
+              f"{r['accuracy'] * 100:8.2f}% {r['single_p50_ms']:9.3f}ms {r['batch_rows_per_sec']:13.0f}")
+    print("float16 / pruned variants only shrink the file; they are computed in float32 (compute column).")
+    with open(args.report, "w") as f:
+        json.dump({"model": args.model, "test_rows": int(len(X_test)), "results": results}, f, indent=2)
+    print(f"Report saved to {args.report}")
+    print("Run a variant with GestureRecognizer(model_path=PATH, engine='compact')")
+
+if __name__ == "__main__":
+    main()
@@ -1,60 +1,69 @@
+import os
+import sys
+import time
+
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
 from tensorflow.keras.utils import to_categorical
 import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Dropout
-
-# データを読み込む
-df = pd.read_csv( "hand_landmarks_merged.csv")
 
-# 特徴量（X）とラベル（y）に分ける
-X = df.drop( 'label', axis=1).values
-y = df['label'].values
+from dataset_store import STORE_DIR, load_store, make_tf_dataset
+from gesture_model import build_model, save_labels
 
-# ラベルを数値にエンコード
-label_encoder = LabelEncoder()
-y_encoded = label_encoder.fit_transform( y)
-print(y_encoded[400])
+BATCH_SIZE = 32
+MODEL_PATH = 'model.h5'
 
-# OHE
-y_categorical = to_categorical( y_encoded, num_classes=41)#ここを変える
-
-# 訓練データとテストデータに分割
-X_train, X_test, y_train, y_test = train_test_split( X, y_categorical, test_size=0.2, random_state=42)
+# データを読み込む
+# dataset_store.py build で作ったストアがあればメモリマップで開き、無ければCSVを読む
+# 引数でストアを指定することもできる (例: prune_dataset.py で間引いたストア)
+store_dir = sys.argv[1] if len( sys.argv) > 1 else STORE_DIR
+load_start = time.perf_counter()
+if os.path.isdir( store_dir):
+    X, y_encoded, classes = load_store( store_dir)
+    num_classes = len( classes)
+    print( f"Opened {store_dir} ({len( X)} rows) in {( time.perf_counter() - load_start) * 1000:.1f} ms")
 
+    # 訓練データとテストデータに分割 (行番号だけを分割し、データはバッチごとに読み込む)
+    train_indices, test_indices = train_test_split( np.arange( len( X)), test_size=0.2, random_state=42)
+    train_data = make_tf_dataset( X, y_encoded, train_indices, BATCH_SIZE, num_classes, shuffle=True)
+    test_data = make_tf_dataset( X, y_encoded, test_indices, BATCH_SIZE, num_classes, shuffle=False)
+else:
+    df = pd.read_csv( "hand_landmarks_merged.csv")
 
+    # 特徴量（X）とラベル（y）に分ける
+    X = df.drop( 'label', axis=1).values
+    y = df['label'].values
+    print( f"Loaded hand_landmarks_merged.csv ({len( X)} rows) in {( time.perf_counter() - load_start) * 1000:.1f} ms")
 
-# モデルの構築
-model = Sequential()
+    # ラベルを数値にエンコード (クラス数はデータ中のラベルから決める)
+    classes, y_encoded = np.unique( y, return_inverse=True)
+    num_classes = len( classes)
 
-# 入力層
-model.add(Dense( 128, input_shape=(X_train.shape[1],), activation='relu'))
+    # OHE
+    y_categorical = to_categorical( y_encoded, num_classes=num_classes)
 
-# 中間層
-model.add(Dense( 64, activation='relu'))
-model.add(Dropout( 0.3))  # 過学習防止のためのDropout層
+    # 訓練データとテストデータに分割
+    X_train, X_test, y_train, y_test = train_test_split( X, y_categorical, test_size=0.2, random_state=42)
+    train_data = tf.data.Dataset.from_tensor_slices( ( X_train, y_train)).shuffle( len( X_train), seed=42).batch( BATCH_SIZE)
+    test_data = tf.data.Dataset.from_tensor_slices( ( X_test, y_test)).batch( BATCH_SIZE)
 
-model.add(Dense( 64, activation='relu'))
-model.add(Dropout( 0.3))
 
-# 出力層 
-model.add(Dense( 41, activation='softmax'))#ここを変える
 
-# モデルのコンパイル
-model.compile( optimizer='adam', loss='categorical_crossentropy', metrics=[ 'accuracy'])
+# モデルの構築 (model.h5 と同じ構成)
+model = build_model( X.shape[1], num_classes)
 
 # モデルの概要を表示
 model.summary()
 
 # モデルの学習
-history = model.fit( X_train, y_train, epochs=10, batch_size=32, validation_data=( X_test, y_test))
+history = model.fit( train_data, epochs=10, validation_data=test_data)
 
 # モデルの評価
-loss, accuracy = model.evaluate( X_test, y_test)
+loss, accuracy = model.evaluate( test_data)
 print( f"Test Accuracy: {accuracy * 100:.2f}%")
 
-#モデルの保存
-model.save( 'model.h5')
+#モデルの保存 (出力の順のラベルをモデルの隣に保存する)
+model.save( MODEL_PATH)
+save_labels( MODEL_PATH, classes)
+print( f"Saved {MODEL_PATH} with {num_classes} classes")
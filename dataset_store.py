@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from landmark_store import NUM_FEATURES, read_shards
+
+# 学習用のランドマークを、CSVのテキストではなくメモリマップできる配列として保存するストア。
+#   landmarks.npy  float32 (N, 63)
+#   labels.npy     int16   (N,)     classes.json のインデックス
+#   classes.json   ラベル名のリスト (ソート順。LabelEncoder と同じ並び)
+#   manifest.json  入力ファイルと件数、重複として除いた件数
+
+STORE_DIR = "hand_landmarks_store"
+
+def _read_source(path):
+    """CSV (63列 + label列)、landmark_store のシャードのディレクトリ、またはストアを読む"""
+    if os.path.exists(os.path.join(path, "landmarks.npy")):
+        X, codes, classes = load_store(path)
+        return np.asarray(X), np.asarray(classes)[codes]
+    if os.path.isdir(path):
+        data = read_shards(path)
+        return data["landmarks"], data["label"].astype(str)
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    return df.drop('label', axis=1).values.astype(np.float32), df['label'].values.astype(str)
+
+def read_sources(sources):
+    """
+    複数の入力を読み、連結して返す。
+
+    Returns:
+        tuple: (ランドマーク (N, 63) のfloat32配列, ラベル (N,) の文字列配列, 入力ごとの行数の辞書)
+    """
+    parts_X, parts_y, counts = [], [], {}
+    for path in sources:
+        X, y = _read_source(path)
+        if X.shape[1] != NUM_FEATURES:
+            raise ValueError(f"{path} has {X.shape[1]} feature columns, expected {NUM_FEATURES}")
+        parts_X.append(X)
+        parts_y.append(y)
+        counts[path] = len(X)
+    X = np.ascontiguousarray(np.concatenate(parts_X), dtype=np.float32)
+    return X, np.concatenate(parts_y), counts
+
+def save_store(X, y, store_dir=STORE_DIR, **manifest):
+    """
+    ランドマークと文字列のラベルをストアとして保存する。
+
+    Args:
+        X (np.ndarray): 形状 (N, 63) のランドマーク。
+        y (np.ndarray): 長さ N のラベル。
+        store_dir (str): 保存先のディレクトリ。
+        **manifest: manifest.json に追加で書き出す内容。
+
+    Returns:
+        dict: manifest.json に書き出した内容。
+    """
+    classes = sorted(set(y))
+    codes = np.searchsorted(classes, y).astype(np.int16)
+
+    os.makedirs(store_dir, exist_ok=True)
+    np.save(os.path.join(store_dir, "landmarks.npy"), np.ascontiguousarray(X, dtype=np.float32))
+    np.save(os.path.join(store_dir, "labels.npy"), codes)
+    with open(os.path.join(store_dir, "classes.json"), "w") as f:
+        json.dump(classes, f, ensure_ascii=False)
+    manifest = dict(manifest, rows=int(len(X)), classes=len(classes))
+    with open(os.path.join(store_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+def build_store(sources, store_dir=STORE_DIR):
+    """
+    複数の入力を結合し、ランドマークとラベルがともに同じ行を除いてストアに保存する。
+
+    Args:
+        sources (list): 入力のCSVファイル、シャードのディレクトリ、またはストア。
+        store_dir (str): 保存先のディレクトリ。
+
+    Returns:
+        dict: manifest.json に書き出した内容。
+    """
+    X, y, counts = read_sources(sources)
+
+    # ランドマーク63列とラベルを1つのレコードとみなして重複を除く (元の順序は保つ)
+    codes = np.unique(y, return_inverse=True)[1].astype(np.int16)
+    records = np.empty((len(X), NUM_FEATURES * 4 + 2), dtype=np.uint8)
+    records[:, :-2] = X.view(np.uint8)
+    records[:, -2:] = codes[:, np.newaxis].view(np.uint8)
+    _, first = np.unique(records.view(np.dtype((np.void, records.shape[1]))).ravel(), return_index=True)
+    keep = np.sort(first)
+
+    return save_store(X[keep], y[keep], store_dir, sources=counts,
+                      duplicates_removed=int(len(X) - len(keep)))
+
+def load_store(store_dir=STORE_DIR):
+    """
+    ストアをメモリマップで開く。配列の内容は実際に参照されるまで読み込まれない。
+
+    Returns:
+        tuple: (ランドマーク (N, 63) の memmap, ラベル番号 (N,) の memmap, ラベル名のリスト)
+    """
+    X = np.load(os.path.join(store_dir, "landmarks.npy"), mmap_mode='r')
+    y = np.load(os.path.join(store_dir, "labels.npy"), mmap_mode='r')
+    with open(os.path.join(store_dir, "classes.json"), "r") as f:
+        classes = json.load(f)
+    return X, y, classes
+
+def batch_generator(X, y, indices, batch_size=32, num_classes=None, shuffle=True, seed=0):
+    """
+    indices の行をバッチにして返し続けるジェネレータ (Keras の fit にそのまま渡せる)。
+    メモリマップからはバッチごとに必要な行だけを読み込む。
+
+    Args:
+        X, y: load_store() が返した配列。
+        indices (np.ndarray): 使う行の番号。
+        batch_size (int): バッチサイズ。
+        num_classes (int): 指定するとラベルを one-hot にする。
+        shuffle (bool): エポックごとに順序を入れ替えるかどうか。
+        seed: 乱数シード、または np.random.Generator (呼び出しをまたいで同じ乱数列を進める場合)。
+
+    Yields:
+        tuple: (形状 (batch, 63) のfloat32配列, ラベル)
+    """
+    rng = np.random.default_rng(seed)
+    eye = np.eye(num_classes, dtype=np.float32) if num_classes else None
+    while True:
+        order = rng.permutation(indices) if shuffle else indices
+        for start in range(0, len(order), batch_size):
+            # 行番号を昇順にしておくとメモリマップの読み込みが連続になる
+            rows = np.sort(order[start:start + batch_size])
+            labels = y[rows]
+            yield X[rows], eye[labels] if eye is not None else np.asarray(labels)
+
+def make_tf_dataset(X, y, indices, batch_size=32, num_classes=None, shuffle=True, seed=0):
+    """
+    batch_generator を tf.data.Dataset にしたもの。1エポック分で終わり、次のバッチを先読みする。
+    from_tensor_slices と違い、全体をテンソルにコピーしない。
+    Keras はエポックごとにジェネレータを作り直すため、乱数の状態はその外で持ち、
+    Dataset.shuffle と同じくエポックごとに異なる順序にする。
+    """
+    import tensorflow as tf
+
+    rng = np.random.default_rng(seed)
+
+    steps = (len(indices) + batch_size - 1) // batch_size
+    label_spec = (tf.TensorSpec((None, num_classes), tf.float32) if num_classes
+                  else tf.TensorSpec((None,), tf.int16))
+    dataset = tf.data.Dataset.from_generator(
+        lambda: batch_generator(X, y, indices, batch_size, num_classes, shuffle, rng),
+        output_signature=(tf.TensorSpec((None, NUM_FEATURES), tf.float32), label_spec))
+    return dataset.take(steps).prefetch(tf.data.AUTOTUNE)
+
+def compare_load_times(csv_path, store_dir=STORE_DIR, repeat=5):
+    """CSVを pd.read_csv で読む場合と、ストアを開いて全体を1回読む場合の所要時間を比べる"""
+    import pandas as pd
+
+    def load_csv():
+        df = pd.read_csv(csv_path)
+        return df.drop('label', axis=1).values.astype(np.float32), df['label'].values
+
+    def load_mmap():
+        X, y, _ = load_store(store_dir)
+        # 公平に比べるため、全行を一度読み込ませる
+        return float(X.sum()), int(y.sum())
+
+    results = {}
+    for name, fn in (("csv", load_csv), ("store", load_mmap)):
+        durations = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            fn()
+            durations.append(time.perf_counter() - start_time)
+        results[name] = {"min_ms": min(durations) * 1000, "mean_ms": float(np.mean(durations)) * 1000}
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and inspect the memory-mapped landmark dataset store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="CSV・シャードを結合して重複を除き、ストアを作る")
+    build_parser.add_argument("sources", nargs="+", help="ランドマークのCSV、シャードのディレクトリ、またはストア")
+    build_parser.add_argument("--store", default=STORE_DIR)
+
+    report_parser = subparsers.add_parser("report", help="CSVとストアの読み込み時間を比べる")
+    report_parser.add_argument("csv", help="比較に使うCSV (ストアの元になったもの)")
+    report_parser.add_argument("--store", default=STORE_DIR)
+    report_parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        manifest = build_store(args.sources, args.store)
+        print(f"Stored {manifest['rows']} rows of {manifest['classes']} classes in {args.store} "
+              f"({manifest['duplicates_removed']} duplicates removed)")
+    else:
+        results = compare_load_times(args.csv, args.store, args.repeat)
+        for name, result in results.items():
+            print(f"{name:<6} min {result['min_ms']:8.2f} ms  mean {result['mean_ms']:8.2f} ms")
+        print(f"Speedup: {results['csv']['min_ms'] / results['store']['min_ms']:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import multiprocessing
+import queue
+from collections import deque
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+# MediaPipe の手の検出を複数のプロセスで並列に実行するためのワーカープール。
+# フレームは共有メモリ上のリングバッファに直接書き込み、ワーカーとの間では
+# (シーケンス番号, スロット番号, 形状) と検出結果のランドマーク配列だけをやり取りする。
+
+def _attach_shared_memory(name):
+    # 子プロセス側では共有メモリの後始末を親に任せる (track は Python 3.13 以降)
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+def _detection_worker(shm_name, slots, slot_bytes, tasks, results, max_num_hands, min_detection_confidence):
+    """
+    ワーカープロセスの本体。専用の MediaPipe Hands でスロットのRGB画像を処理し、
+    (シーケンス番号, スロット番号, 形状 (手の数, 63) のランドマーク, 左右判定のリスト) を返す。
+    """
+    import mediapipe as mp
+
+    shm = _attach_shared_memory(shm_name)
+    ring = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=shm.buf)
+    hands = mp.solutions.hands.Hands(
+        static_image_mode=False,
+        max_num_hands=max_num_hands,
+        min_detection_confidence=min_detection_confidence
+    )
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            seq, slot, shape = task
+            image = ring[slot, :int(np.prod(shape))].reshape(shape)
+            output = hands.process(image)
+
+            multi_hand_landmarks = output.multi_hand_landmarks or []
+            landmarks = np.array([[(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
+                                  for hand_landmarks in multi_hand_landmarks], dtype=np.float32).reshape(-1, 63)
+            handedness = [h.classification[0].label for h in output.multi_handedness or []]
+            results.put((seq, slot, landmarks, handedness))
+    finally:
+        hands.close()
+        del ring
+        shm.close()
+
+class DetectionPool:
+    """
+    共有メモリのリングバッファとワーカープロセスで手の検出を並列に行うプール。
+    submit() でフレームを投入し、get() で投入順 (シーケンス番号順) に結果を受け取る。
+    ワーカーごとに MediaPipe Hands を持つため、複数のカメラを扱う場合は stream を指定すると
+    同じストリームのフレームは常に同じワーカーで処理され、トラッキングが途切れない。
+    """
+    def __init__(self, frame_shape, num_workers=2, slots=None, max_num_hands=1, min_detection_confidence=0.5):
+        """
+        Args:
+            frame_shape (tuple): 投入するフレームの最大の形状 (高さ, 幅, 3)。
+            num_workers (int): ワーカープロセスの数。
+            slots (int): リングバッファのスロット数 (同時に処理中にできるフレーム数)。None ならワーカー数の2倍。
+            max_num_hands (int): 同時に検出する手の最大数。
+            min_detection_confidence (float): MediaPipe Hands の検出の閾値。
+        """
+        self.frame_shape = tuple(frame_shape)
+        self.slot_bytes = int(np.prod(frame_shape))
+        self.slots = slots or num_workers * 2
+        self.max_num_hands = max_num_hands
+
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+        self._ring = np.ndarray((self.slots, self.slot_bytes), dtype=np.uint8, buffer=self._shm.buf)
+        self._free_slots = deque(range(self.slots))
+
+        # MediaPipe / TensorFlow のスレッドを fork で引き継がないよう spawn で起動する
+        context = multiprocessing.get_context("spawn")
+        self._task_queues = [context.Queue() for _ in range(num_workers)]
+        self._result_queue = context.Queue()
+        self._workers = []
+        for i, tasks in enumerate(self._task_queues):
+            worker = context.Process(
+                target=_detection_worker,
+                args=(self._shm.name, self.slots, self.slot_bytes, tasks, self._result_queue,
+                      max_num_hands, min_detection_confidence),
+                name=f"detection-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+        self._next_seq = 0 # 次に投入するフレームの番号
+        self._next_result = 0 # 次に返す結果の番号
+        self._completed = {} # 順番待ちの結果 (seq -> (ランドマーク, 左右判定))
+
+    @property
+    def in_flight(self):
+        """投入済みでまだ get() していないフレームの数"""
+        return self._next_seq - self._next_result
+
+    def submit(self, frame, stream=None):
+        """
+        BGRのフレームをRGBに変換しながら空きスロットに書き込み、ワーカーに処理を依頼する。
+        空きスロットが無い場合は結果が返ってくるまで待つ。
+
+        Args:
+            frame (np.ndarray): BGRのフレーム。frame_shape 以下のサイズであること。
+            stream (int): フレームの属するストリームの番号。None ならワーカーに順に割り振る。
+
+        Returns:
+            int: フレームのシーケンス番号。
+        """
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame of shape {frame.shape} does not fit in a slot of shape {self.frame_shape}")
+        while not self._free_slots:
+            self._receive()
+        slot = self._free_slots.popleft()
+        image = self._ring[slot, :frame.nbytes].reshape(frame.shape)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=image)
+
+        seq = self._next_seq
+        self._next_seq += 1
+        worker = (stream if stream is not None else seq) % len(self._task_queues)
+        self._task_queues[worker].put((seq, slot, frame.shape))
+        return seq
+
+    def _receive(self, poll_interval=0.5):
+        # ワーカーが異常終了した場合に永久に待たないよう、一定間隔で生存を確認する
+        while True:
+            try:
+                seq, slot, landmarks, handedness = self._result_queue.get(timeout=poll_interval)
+                break
+            except queue.Empty:
+                if not all(worker.is_alive() for worker in self._workers):
+                    raise RuntimeError("A detection worker exited unexpectedly")
+        self._free_slots.append(slot)
+        self._completed[seq] = (landmarks, handedness)
+
+    def get(self):
+        """
+        次の順番の検出結果を返す。先に終わった後続のフレームの結果は順番が来るまで保持する。
+
+        Returns:
+            tuple: (シーケンス番号, 形状 (手の数, 63) のランドマーク, 各手の左右判定のリスト)
+        """
+        if self.in_flight == 0:
+            raise RuntimeError("No frames have been submitted")
+        while self._next_result not in self._completed:
+            self._receive()
+        seq = self._next_result
+        landmarks, handedness = self._completed.pop(seq)
+        self._next_result += 1
+        return seq, landmarks, handedness
+
+    def close(self):
+        """ワーカーを終了し、共有メモリを解放する"""
+        for tasks in self._task_queues:
+            tasks.put(None)
+        for worker in self._workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        self._ring = None
+        self._shm.close()
+        self._shm.unlink()
@@ -1,65 +1,467 @@
-import cv2
+import time
+from collections import deque, namedtuple
+
 import mediapipe as mp
 import numpy as np
-from tensorflow.keras.models import load_model
+
+from frame_buffers import FrameBufferPool
+from frame_pipeline import (FramePipeline, detect_hands, extract_landmark_data, extract_landmarks, flip_frame,
+                            resize_for_detection)
+from gesture_model import load_labels
+from prediction_cache import PredictionCache
+from telemetry import NULL_TELEMETRY
+
+ENGINES = ('keras', 'numpy', 'compact', 'knn', 'prototype')
+
+SORTED_WORD = ['a', 'chi', 'e', 'ha', 'he', 'hi', 'ho', 'hu' , 'i', 'ka', 'ke', 'ki', 'ko', 'ku', 'ma', 'me', 'mi', 'mu', 'na', 'ne', 'ni', 'nu', 'o', 'ra', 're', 'ro', 'ru', 'sa', 'se', 'shi', 'so', 'su', 'ta', 'te', 'to', 'tsu', 'u', 'wa', 'ya', 'yo', 'yu']
+
+def load_engine(model_path, engine, dataset_path='hand_landmarks.csv'):
+    """
+    推論エンジンを読み込む。どのエンジンも predict(x) で (batch, クラス数) の確率を返す。
+
+    Args:
+        model_path (str): 学習済みモデルのパス ('keras' / 'numpy' では .h5、'compact' では compact_model.py の .npz)。
+        engine (str): ENGINES のいずれか。
+        dataset_path (str): ランドマークのCSV ('knn' / 'prototype' で使用)。
+    """
+    if engine in ('knn', 'prototype'):
+        from knn_engine import KnnInferenceEngine
+        return KnnInferenceEngine.from_csv(dataset_path, labels=load_labels(model_path, SORTED_WORD), mode=engine)
+    if engine == 'numpy':
+        from numpy_engine import NumpyInferenceEngine
+        return NumpyInferenceEngine(model_path)
+    if engine == 'compact':
+        from compact_model import load_compact_engine
+        return load_compact_engine(model_path)
+    if engine == 'keras':
+        from tensorflow.keras.models import load_model
+        return load_model(model_path)
+    raise ValueError(f"Unknown engine: {engine}")
+
+# 予測キャッシュを既定で有効にするエンジン。
+# benchmark.py --only cache の計測で、キャッシュの参照がキャッシュ無しの順伝播より速かったもの
+CACHED_ENGINES = ('keras',)
+
+# 1つの手の認識結果。bbox は正規化座標の (x_min, y_min, x_max, y_max)
+HandPrediction = namedtuple('HandPrediction', ['label', 'confidence', 'handedness', 'bbox'])
 
 class GestureRecognizer:
     """
     手のジェスチャーを認識するためのクラス。
     モデルの読み込み、MediaPipeの初期化、フレームごとの認識処理をカプセル化する。
     """
-    def __init__(self, model_path='model.h5'):
+    def __init__(self, model_path='model.h5', engine='keras', telemetry=None, detection_width=640,
+                 max_num_hands=1, motion_gate=None, prediction_cache='auto', detection_workers=0,
+                 cascade=False, temporal=None):
         """
         クラスの初期化。モデルとMediaPipeをセットアップする。
         Args:
             model_path (str): 使用する学習済みモデルのパス。
+            engine (str): 推論エンジン。ENGINES のいずれか。それ以外なら ValueError を送出する。
+                'numpy' の場合はTensorFlowをインポートせずにNumPyで推論する。
+                'knn' / 'prototype' の場合は hand_landmarks.csv の最近傍で分類する。
+            telemetry (LatencyTelemetry): 各段の所要時間を記録する場合に指定する。
+            detection_width (int): 手の検出に使う縮小フレームの幅 (縦横比は維持する)。
+                入力がこれより大きい場合だけ縮小する。None なら縮小しない。
+            max_num_hands (int): 同時に認識する手の最大数。
+            motion_gate (MotionGate): 指定すると、手が動いていないフレームで検出・分類を省略し、
+                前回の結果を使い回す。
+            prediction_cache: PredictionCache のインスタンス、None (無効)、または 'auto'。
+                'auto' の場合は CACHED_ENGINES のエンジンでのみ既定の設定で有効にする。
+            detection_workers (int): 1以上なら process_source() の検出を DetectionPool の
+                ワーカープロセスで並列に行う。0 ならメインスレッドの MediaPipe Hands で行う。
+            cascade (bool): True なら hand_landmarks.csv のプロトタイプで先に判定し、
+                確信できない場合だけモデルで推論する (CascadeEngine)。set_target() でお題も考慮する。
+            temporal (TemporalSmoother): 指定すると、直近のフレームの窓で予測を安定させる (時系列モード)。
         """
+        # エンジン名の誤りはモデルファイルの不備とは違い設定の誤りなので、読み込みの例外処理に含めず送出する
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine} (choose from {', '.join(ENGINES)})")
+
         # MediaPipe Handsのセットアップ
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=1,
-            min_detection_confidence=0.5
-        )
+        self.max_num_hands = max_num_hands
+        self.hands = self._create_hands(max_num_hands)
         self.mp_drawing = mp.solutions.drawing_utils
 
         # モデルの読み込み
+        self.model_path = model_path
+        self.engine = engine
         try:
-            self.model = load_model(model_path)
+            self.model = self._load_model(model_path, engine)
         except Exception as e:
             print(f"Error loading model: {e}")
             print(f"Please ensure the model file exists at: {model_path}")
             self.model = None
+        if cascade and self.model is not None:
+            self.model = self._build_cascade(self.model, model_path)
         
-        self.sorted_word = ['a', 'chi', 'e', 'ha', 'he', 'hi', 'ho', 'hu' , 'i', 'ka', 'ke', 'ki', 'ko', 'ku', 'ma', 'me', 'mi', 'mu', 'na', 'ne', 'ni', 'nu', 'o', 'ra', 're', 'ro', 'ru', 'sa', 'se', 'shi', 'so', 'su', 'ta', 'te', 'to', 'tsu', 'u', 'wa', 'ya', 'yo', 'yu']
+        self.last_latency = 0.0 # process_source での直近フレームの認識時間 (秒)
+        self.telemetry = telemetry or NULL_TELEMETRY
+        self.detection_width = detection_width
+        self.motion_gate = motion_gate
+        self.temporal = temporal
+        self._last_detection = ([], []) # 検出を省略したときに返す (ランドマーク, 左右判定)
+        self._last_predictions = [] # 分類を省略したときに返す結果
+        self._last_raw_predictions = [] # 時系列で安定させる前の直前の結果 (省略したフレームを窓に入れるのに使う)
+        if prediction_cache == 'auto':
+            # カスケードの結果はお題によって変わるため、キャッシュは使わない
+            prediction_cache = PredictionCache() if engine in CACHED_ENGINES and not cascade else None
+        self.prediction_cache = prediction_cache
+        self.detection_workers = detection_workers
+        self.detection_pool = None # process_source() の初回フレームで起動する
 
-    def _extract_landmark_data(self, hand_landmarks):
-        """手のランドマークを1次元のリストに変換する"""
-        landmarks = []
-        for lm in hand_landmarks.landmark:
-            landmarks.extend([lm.x, lm.y, lm.z])
-        return landmarks
+        # --- 毎フレームの確保を避けるための出力バッファ ---
+        # 反転後のフレームはパイプラインの後段に渡るため、同時に扱われうる枚数分を巡回させる
+        self._flip_buffers = FrameBufferPool(4)
+        self._detection_buffers = FrameBufferPool(1)
+        self._rgb_buffers = FrameBufferPool(1)
+        self._landmark_buffer = np.zeros((max_num_hands, 63), dtype=np.float32) # (手の数, 63)
 
-    def _predict_hand_shape(self, landmarks):
-        """ランドマークデータから手の形を予測する"""
-        if self.model is None:
-            return "Model not loaded", 0.0
+        # 学習時にラベルが保存されていればその順序を使う (model.h5 は SORTED_WORD の順)
+        self.sorted_word = list(load_labels(model_path, SORTED_WORD))
+
+    def _create_hands(self, max_num_hands):
+        return self.mp_hands.Hands(
+            static_image_mode=False,
+            max_num_hands=max_num_hands,
+            min_detection_confidence=0.5
+        )
+
+    def set_max_num_hands(self, max_num_hands):
+        """
+        同時に認識する手の最大数を変更する。変わる場合だけ MediaPipe Hands を作り直す。
+        手が1つしか無いときに最大数を大きくしておくと毎フレーム手のひら検出が走るため、
+        ラウンドの人数に合わせて切り替える。
+        """
+        if max_num_hands == self.max_num_hands:
+            return
+        self.hands.close()
+        self.hands = self._create_hands(max_num_hands)
+        self.max_num_hands = max_num_hands
+        self._landmark_buffer = np.zeros((max_num_hands, 63), dtype=np.float32)
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        if self.temporal is not None:
+            self.temporal.reset()
+        if self.detection_pool is not None:
+            self.detection_pool.close()
+            self.detection_pool = None
+
+    def _load_model(self, model_path, engine):
+        """指定されたエンジンでモデルを読み込む"""
+        return load_engine(model_path, engine)
+
+    def _build_cascade(self, model, model_path, dataset_path='hand_landmarks.csv'):
+        """
+        プロトタイプを第1段、model を第2段とする CascadeEngine を作り、データセットで校正する。
+        プロトタイプは学習データでは実際より自信を持つため、校正にはプロトタイプの計算に使っていない行を使う。
+        """
+        import pandas as pd
+        from sklearn.model_selection import train_test_split
 
-        # ランドマークデータを正しい形に変換
-        landmarks_array = np.array(landmarks).reshape(1, -1)
+        from cascade_engine import CascadeEngine
+        from knn_engine import KnnInferenceEngine
+
+        df = pd.read_csv(dataset_path)
+        X = df.drop('label', axis=1).values.astype(np.float32)
+        y = df['label'].values.astype(str)
+        X_fit, X_calibrate, y_fit, _ = train_test_split(X, y, test_size=0.25, random_state=0, stratify=y)
+        fast = KnnInferenceEngine(X_fit, y_fit, labels=load_labels(model_path, SORTED_WORD), mode='prototype')
+        return CascadeEngine(fast, model).calibrate(X_calibrate)
+
+    def reload_model(self, model_path=None):
+        """
+        学習し直したモデルに差し替える。読み込みは呼び出し元のスレッドで行い、
+        差し替えは参照の代入だけなので、認識中のスレッドを止めずに呼べる。
+
+        Args:
+            model_path (str): 新しいモデルのパス。None なら現在のパスを読み直す。
+        """
+        model_path = model_path or self.model_path
+        model = self._load_model(model_path, self.engine)
+        if hasattr(self.model, 'full'):
+            target = self.model.target
+            model = self._build_cascade(model, model_path)
+            model.set_target(target)
+        labels = list(load_labels(model_path, SORTED_WORD))
+        model.predict(np.zeros((1, 63), dtype=np.float32), verbose=0) # 初回推論の遅延を差し替え前に消化する
+
+        # 追加学習ではラベルは末尾に追加されるだけなので、ラベルを先に差し替えても
+        # 古いモデルの出力の番号はそのまま正しいラベルを指す
+        self.sorted_word = labels
+        self.model = model
+        self.model_path = model_path
+        if self.prediction_cache is not None:
+            self.prediction_cache.clear()
+
+    def set_target(self, label):
+        """
+        お題のラベルを指定する。カスケードでは、お題ではないと確信できる手の推論を省略する。
+        None ならお題を考慮しない。
+        """
+        if not hasattr(self.model, 'set_target'):
+            return
+        self.model.set_target(self.sorted_word.index(label) if label in self.sorted_word else None)
+        if self.prediction_cache is not None:
+            self.prediction_cache.clear()
+
+    def _extract_landmark_data(self, hand_landmarks, out=None):
+        """手のランドマークを63次元のfloat32配列に書き込む (frame_pipeline.extract_landmark_data)"""
+        return extract_landmark_data(hand_landmarks, out)
+
+    def _predict_batch(self, landmarks_array):
+        """
+        形状 (n, 63) のランドマークを1回の順伝播でまとめて予測する。
+
+        Returns:
+            tuple: (予測ラベルのリスト, 信頼度の配列)
+        """
+        if self.model is None:
+            return ["Model not loaded"] * len(landmarks_array), np.zeros(len(landmarks_array))
 
         # モデルで予測
         prediction = self.model.predict(landmarks_array)
-        predicted_class = np.argmax(prediction)
-        confidence = prediction[0][predicted_class]
+        predicted_classes = np.argmax(prediction, axis=1)
+        confidences = prediction[np.arange(len(prediction)), predicted_classes]
 
         # ラベルを返す
-        if predicted_class < len(self.sorted_word):
-            label = self.sorted_word[predicted_class]
+        labels = [self.sorted_word[c] if c < len(self.sorted_word) else "unknown"
+                  for c in predicted_classes]
+        return labels, confidences
+
+    def _predict_cached(self, landmarks_array):
+        """
+        予測キャッシュを参照し、キャッシュに無い行だけをまとめて予測する。
+
+        Returns:
+            tuple: (予測ラベルのリスト, 信頼度の配列)
+        """
+        cache = self.prediction_cache
+        keys = cache.keys(landmarks_array)
+        labels = [None] * len(keys)
+        confidences = np.zeros(len(keys), dtype=np.float32)
+        missing = []
+        for i, key in enumerate(keys):
+            cached = cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                labels[i], confidences[i] = cached
+
+        if missing:
+            missing_labels, missing_confidences = self._predict_batch(landmarks_array[missing])
+            for j, i in enumerate(missing):
+                labels[i], confidences[i] = missing_labels[j], missing_confidences[j]
+                if self.model is not None:
+                    cache.put(keys[i], (missing_labels[j], float(missing_confidences[j])))
+        return labels, confidences
+
+    def _predict_hand_shape(self, landmarks):
+        """ランドマークデータから手の形を予測する"""
+        # ランドマークデータを正しい形に変換 (float32の配列であればコピーしない)
+        landmarks_array = np.asarray(landmarks, dtype=np.float32).reshape(1, -1)
+        labels, confidences = self._predict_batch(landmarks_array)
+        return labels[0], confidences[0]
+
+    def _detection_frame(self, frame):
+        """検出用に縮小したフレームを返す。ランドマークは正規化座標なので縮小しても表示側で使える"""
+        return resize_for_detection(frame, self.detection_width, self._detection_buffers, self.telemetry)
+
+    def draw_landmarks(self, frame, multi_hand_landmarks):
+        """
+        ランドマークをフレームに描画する。座標は正規化されているため、
+        検出時とは異なるサイズの表示用フレームにもそのまま描画できる。
+        """
+        with self.telemetry.stage("draw_landmarks"):
+            for hand_landmarks in multi_hand_landmarks:
+                self.mp_drawing.draw_landmarks(
+                    frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
+        return frame
+
+    def flip(self, frame):
+        """フレームを水平方向に反転する (出力は内部バッファを巡回して使う)"""
+        return flip_frame(frame, self._flip_buffers, self.telemetry)
+
+    def detect(self, frame, debug=False):
+        """
+        フレームを反転し、手のランドマークを検出する。
+        検出は detection_width に縮小したコピーで行い、返すフレームは元の解像度のままにする。
+        返すフレームは内部バッファを巡回して使うため、長く保持する場合はコピーすること。
+
+        Args:
+            frame: 入力となるOpenCVのフレーム。
+            debug (bool): デバッグモードが有効かどうか。
+
+        Returns:
+            tuple: (反転後のフレーム, 検出された手のランドマークのリスト, 各手の左右判定のリスト)
+        """
+        telemetry = self.telemetry
+
+        # 画像を水平方向に反転し、検出用に縮小してからRGBに変換
+        frame = self.flip(frame)
+        detection_frame = self._detection_frame(frame)
+
+        # 画像がほとんど変化していなければ前回の検出結果を使い回す
+        if self.motion_gate is not None:
+            with telemetry.stage("motion_gate"):
+                changed = self.motion_gate.frame_changed(detection_frame)
+            if not changed:
+                multi_hand_landmarks, multi_handedness = self._last_detection
+                if debug:
+                    self.draw_landmarks(frame, multi_hand_landmarks)
+                return frame, multi_hand_landmarks, multi_handedness
+
+        # 手のランドマークの検出
+        multi_hand_landmarks, multi_handedness = detect_hands(self.hands, detection_frame, self._rgb_buffers,
+                                                              telemetry)
+        self._last_detection = (multi_hand_landmarks, multi_handedness)
+
+        # デバッグモードの場合のみランドマークを描画
+        if debug:
+            self.draw_landmarks(frame, multi_hand_landmarks)
+
+        return frame, multi_hand_landmarks, multi_handedness
+
+    def classify_hands(self, multi_hand_landmarks, multi_handedness=None):
+        """
+        検出済みのすべての手を1回のバッチ推論で判別する。
+
+        Args:
+            multi_hand_landmarks: detect() が返したランドマークのリスト。
+            multi_handedness: detect() が返した左右判定のリスト。
+
+        Returns:
+            list: 手ごとの HandPrediction のリスト。
+        """
+        # ランドマークは事前確保したバッファに書き込み、全員分をまとめて予測する
+        batch, handedness = extract_landmarks(multi_hand_landmarks, multi_handedness, self._landmark_buffer,
+                                              self.telemetry)
+        return self.classify_landmark_array(batch, handedness)
+
+    def classify_landmark_array(self, landmarks, handedness=None):
+        """
+        形状 (手の数, 63) のランドマーク配列をまとめて判別する。
+        DetectionPool のように MediaPipe のオブジェクトではなく配列で検出結果を受け取る場合に使う。
+
+        Args:
+            landmarks (np.ndarray): 形状 (手の数, 63) のfloat32配列。
+            handedness (list): 各手の左右判定のラベル ("Left" / "Right")。
+
+        Returns:
+            list: 手ごとの HandPrediction のリスト。
+        """
+        batch = landmarks[:self.max_num_hands]
+        n = len(batch)
+        if n == 0:
+            self._last_predictions = []
+            self._last_raw_predictions = []
+            return []
+
+        # 手がほとんど動いていなければ前回の分類結果を使い回す。
+        # 時系列モードでは、手が止まっている間も窓を進めるため、前回の1フレームの結果をこのフレームとして窓に入れる
+        if self.motion_gate is not None and len(self._last_predictions) == n and \
+                not self.motion_gate.landmarks_changed(batch):
+            if self.temporal is None:
+                return self._last_predictions
+            raw = self._last_raw_predictions
+            labels, confidences = [p.label for p in raw], [p.confidence for p in raw]
         else:
-            label = "unknown"
+            labels, confidences = self.predict_landmarks(batch)
+        raw = self._hand_predictions(batch, labels, confidences, handedness)
+        predictions = self._smooth(batch, raw)
+        self._last_raw_predictions = raw
+        self._last_predictions = predictions
+        return predictions
+
+    def classify_landmark_batches(self, landmark_arrays, handedness_lists):
+        """
+        複数フレーム分のランドマーク配列を1回の推論でまとめて判別する。
+        フレーム間の比較は行わないため、motion_gate による省略はしない。
+
+        Args:
+            landmark_arrays (list): フレームごとの形状 (手の数, 63) の配列。
+            handedness_lists (list): フレームごとの左右判定のラベルのリスト (不明なら None)。
+
+        Returns:
+            list: フレームごとの HandPrediction のリスト。
+        """
+        batches = [landmarks[:self.max_num_hands] for landmarks in landmark_arrays]
+        rows = np.concatenate(batches) if batches else np.empty((0, 63), dtype=np.float32)
+        if len(rows) == 0:
+            return [[] for _ in batches]
+        labels, confidences = self.predict_landmarks(rows)
+
+        # 時系列モードではフレームの順に窓へ入れる
+        results = []
+        start = 0
+        for batch, handedness in zip(batches, handedness_lists):
+            end = start + len(batch)
+            predictions = self._hand_predictions(batch, labels[start:end], confidences[start:end], handedness)
+            results.append(self._smooth(batch, predictions))
+            start = end
+        return results
+
+    def predict_landmarks(self, landmarks):
+        """
+        形状 (n, 63) のランドマークを予測する (予測キャッシュがあれば参照する)。
+
+        Returns:
+            tuple: (予測ラベルのリスト, 信頼度の配列)
+        """
+        with self.telemetry.stage("predict"):
+            if self.prediction_cache is not None:
+                return self._predict_cached(landmarks)
+            return self._predict_batch(landmarks)
 
-        return label, confidence
+    def _smooth(self, batch, predictions):
+        """時系列モードであれば、1フレームの予測を窓内の結果に置き換える"""
+        if self.temporal is None:
+            return predictions
+        with self.telemetry.stage("temporal"):
+            return self.temporal.update(batch, predictions)
+
+    def _hand_predictions(self, batch, labels, confidences, handedness):
+        """予測結果とランドマークのバウンディングボックスから HandPrediction のリストを作る"""
+        n = len(batch)
+        points = batch.reshape(n, 21, 3)[:, :, :2]
+        mins = points.min(axis=1)
+        maxs = points.max(axis=1)
+
+        predictions = []
+        for i in range(n):
+            bbox = (float(mins[i, 0]), float(mins[i, 1]), float(maxs[i, 0]), float(maxs[i, 1]))
+            predictions.append(HandPrediction(labels[i], float(confidences[i]),
+                                              handedness[i] if handedness else None, bbox))
+        return predictions
+
+    def classify(self, multi_hand_landmarks, multi_handedness=None):
+        """
+        検出済みのランドマークから手の形を判別する。複数の手がある場合は信頼度が最も高いものを返す。
+
+        Args:
+            multi_hand_landmarks: detect() が返したランドマークのリスト。
+            multi_handedness: detect() が返した左右判定のリスト。
+
+        Returns:
+            tuple: (予測ラベル, 信頼度)
+        """
+        predictions = self.classify_hands(multi_hand_landmarks, multi_handedness)
+        if not predictions:
+            # デフォルトの戻り値
+            return "unknown", 0.0
+        best = max(predictions, key=lambda p: p.confidence)
+        return best.label, best.confidence
+
+    def recognize_hands(self, frame, debug=False):
+        """
+        与えられたフレームのすべての手を認識する。
+
+        Returns:
+            tuple: (処理後のフレーム, 手ごとの HandPrediction のリスト)
+        """
+        frame, multi_hand_landmarks, multi_handedness = self.detect(frame, debug=debug)
+        return frame, self.classify_hands(multi_hand_landmarks, multi_handedness)
 
     def recognize(self, frame, debug=False):
         """
@@ -72,31 +474,162 @@ class GestureRecognizer:
         Returns:
             tuple: (処理後のフレーム, 予測ラベル, 信頼度)
         """
-        # デフォルトの戻り値
-        label = "unknown"
-        confidence = 0.0
+        frame, multi_hand_landmarks, multi_handedness = self.detect(frame, debug=debug)
+        label, confidence = self.classify(multi_hand_landmarks, multi_handedness)
+        return frame, label, confidence
 
-        # 画像を水平方向に反転し、RGBに変換
-        frame = cv2.flip(frame, 1)
-        image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    def process_source(self, source, debug=False, max_frames=None):
+        """
+        フレーム取得元から順にフレームを読み、認識を行うジェネレータ。
 
-        # 手のランドマークの検出
-        results = self.hands.process(image_rgb)
+        Args:
+            source: cv2.VideoCapture または frame_sources の各ソース。
+            debug (bool): デバッグモードが有効かどうか。
+            max_frames (int): 処理する最大フレーム数。None なら読み切るまで。
 
-        # ランドマークが検出された場合、手の形を判別
-        if results.multi_hand_landmarks:
-            for hand_landmarks in results.multi_hand_landmarks:
-                # デバッグモードの場合のみランドマークを描画
-                if debug:
-                    self.mp_drawing.draw_landmarks(
-                        frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
+        Yields:
+            tuple: (処理後のフレーム, 予測ラベル, 信頼度)
+        """
+        if self.detection_workers > 0:
+            yield from self._process_source_parallel(source, debug, max_frames)
+            return
 
-                # 予測を実行
-                landmarks_data = self._extract_landmark_data(hand_landmarks)
-                label, confidence = self._predict_hand_shape(landmarks_data)
+        for packet in self.pipeline(source, max_frames=max_frames):
+            if debug:
+                self.draw_landmarks(packet.frame, packet.multi_hand_landmarks)
+            self.last_latency = time.perf_counter() - packet.timestamp
+            if packet.predictions:
+                best = max(packet.predictions, key=lambda p: p.confidence)
+                yield packet.frame, best.label, best.confidence
+            else:
+                yield packet.frame, "unknown", 0.0
 
-        return frame, label, confidence
+    def pipeline(self, source, max_frames=None, batch_size=1, queue_size=0, retry=False):
+        """
+        この認識器の設定 (検出の縮小幅、motion_gate、手の数) で FramePipeline を組み立てる。
+        各フレームの結果は FramePacket の predictions などに入る。
+
+        Args:
+            source: cv2.VideoCapture 互換の取得元。
+            max_frames (int): 処理する最大フレーム数。None なら読み切るまで。
+            batch_size (int): 分類をまとめて行うフレーム数。
+            queue_size (int): 1以上なら、取得と検出をそれぞれ別スレッドで実行し、
+                古いフレームを捨てる長さ queue_size のキューでつなぐ (ライブ映像向け)。
+                この場合は検出が追いつかないフレームをキューが捨てるため、AdaptiveFrameScheduler の
+                間引きは使わない (間引きは queue_size=0 でゲームループから1フレームずつ認識する場合のみ)。
+            retry (bool): 読み込みに失敗しても終了せずに読み直す (カメラ向け)。
+
+        Returns:
+            FramePipeline: 反復すると FramePacket を返すパイプライン。
+        """
+        latest_only = queue_size > 0
+        pipeline = FramePipeline(source, max_frames=max_frames, retry=retry, telemetry=self.telemetry)
+        if queue_size:
+            pipeline.buffer(queue_size, latest_only)
+        return (pipeline
+                .preprocess(detection_width=self.detection_width)
+                .detect(self.hands, motion_gate=self.motion_gate, buffer=queue_size, latest_only=latest_only)
+                .extract(max_num_hands=self.max_num_hands)
+                .classify(self, batch_size=batch_size))
+
+    def _detection_pool_fits(self, frame_shape):
+        """現在の DetectionPool のスロットに frame_shape のフレームが収まるか"""
+        pool = self.detection_pool
+        return pool is not None and int(np.prod(frame_shape)) <= pool.slot_bytes
+
+    def _detection_pool_for(self, frame_shape):
+        """
+        frame_shape のフレームを受け付ける DetectionPool を返す (足りなければ作り直す)。
+        作り直すと投入済みのフレームの結果は失われるため、呼び出し元は結果をすべて受け取ってから呼ぶこと。
+        """
+        if self._detection_pool_fits(frame_shape):
+            return self.detection_pool
+        if self.detection_pool is not None:
+            self.detection_pool.close()
+        from detection_pool import DetectionPool
+        self.detection_pool = DetectionPool(frame_shape, num_workers=self.detection_workers,
+                                            max_num_hands=self.max_num_hands)
+        return self.detection_pool
+
+    def _process_source_parallel(self, source, debug, max_frames):
+        """
+        process_source() の並列版。スロットが埋まるまでフレームを先読みしてワーカーに投入し、
+        投入順に結果を受け取って分類する。last_latency は待ち時間を含む1フレームの所要時間になる。
+        途中でスロットに収まらない大きさのフレームが来た場合は、投入済みのフレームの結果を
+        すべて受け取ってからプールを作り直す。
+        """
+        in_flight = deque() # 投入済みのフレームと読み込み時刻
+        pending = None # 読み込んだがプールの作り直しを待っている (フレーム, 検出用フレーム, 読み込み時刻)
+        read_count = 0
+        exhausted = False
+        while True:
+            # 空きスロットの分だけ先読みして投入する
+            pool = self.detection_pool
+            capacity = pool.slots if pool is not None else 1
+            while len(in_flight) < capacity:
+                if pending is None:
+                    if exhausted or (max_frames is not None and read_count >= max_frames):
+                        break
+                    ret, frame = source.read()
+                    if not ret:
+                        exhausted = True
+                        break
+                    start_time = time.perf_counter()
+                    # 結果が返るまで保持するため、反転は内部バッファを使わずに新しい配列へ行う
+                    frame = flip_frame(frame, telemetry=self.telemetry)
+                    pending = (frame, self._detection_frame(frame), start_time)
+                    read_count += 1
+
+                frame, detection_frame, start_time = pending
+                if in_flight and not self._detection_pool_fits(detection_frame.shape):
+                    break # 投入済みのフレームの結果を受け取ってから作り直す
+                pool = self._detection_pool_for(detection_frame.shape)
+                capacity = pool.slots
+                pool.submit(detection_frame)
+                in_flight.append((frame, start_time))
+                pending = None
+            if not in_flight:
+                break
+
+            frame, start_time = in_flight.popleft()
+            _, landmarks, handedness = self.detection_pool.get()
+            predictions = self.classify_landmark_array(landmarks, handedness)
+            if debug:
+                self.draw_landmarks(frame, self._landmark_protos(landmarks))
+            self.last_latency = time.perf_counter() - start_time
+
+            if predictions:
+                best = max(predictions, key=lambda p: p.confidence)
+                yield frame, best.label, best.confidence
+            else:
+                yield frame, "unknown", 0.0
+
+    def _landmark_protos(self, landmarks):
+        """配列のランドマークを描画用の MediaPipe の形式に変換する"""
+        from mediapipe.framework.formats import landmark_pb2
+        return [landmark_pb2.NormalizedLandmarkList(landmark=[
+                    landmark_pb2.NormalizedLandmark(x=float(x), y=float(y), z=float(z))
+                    for x, y, z in hand.reshape(21, 3)])
+                for hand in landmarks]
+
+    def warm_up(self, frame_shape=(480, 640, 3)):
+        """
+        ダミーの入力で検出と分類を一度ずつ実行し、初回推論の遅延を前倒しで消化する。
+
+        Args:
+            frame_shape (tuple): ダミーフレームの形状。
+        """
+        # ウォームアップの所要時間は計測に含めない
+        telemetry, self.telemetry = self.telemetry, NULL_TELEMETRY
+        try:
+            self.recognize(np.zeros(frame_shape, dtype=np.uint8))
+            self._predict_hand_shape(np.zeros(63, dtype=np.float32))
+        finally:
+            self.telemetry = telemetry
 
     def release(self):
         """リソースを解放する"""
         self.hands.close()
+        if self.detection_pool is not None:
+            self.detection_pool.close()
+            self.detection_pool = None
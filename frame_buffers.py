@@ -0,0 +1,24 @@
+import numpy as np
+
+class FrameBufferPool:
+    """
+    フレーム処理の出力先 (cv2 の dst= 引数) として使い回すバッファのリング。
+    形状が変わったときだけ確保し直す。
+    取得したバッファは size 回後の get() で再利用されるため、
+    別スレッドに渡すフレームには、同時に扱われうる枚数以上の size を指定すること。
+    """
+    def __init__(self, size=1):
+        self.size = size
+        self._buffers = []
+        self._key = None
+        self._index = 0
+
+    def get(self, shape, dtype=np.uint8):
+        key = (tuple(shape), np.dtype(dtype))
+        if key != self._key:
+            self._buffers = [np.empty(shape, dtype=dtype) for _ in range(self.size)]
+            self._key = key
+            self._index = 0
+        buffer = self._buffers[self._index]
+        self._index = (self._index + 1) % self.size
+        return buffer
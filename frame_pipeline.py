@@ -0,0 +1,458 @@
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from frame_buffers import FrameBufferPool
+from telemetry import NULL_TELEMETRY
+
+# フレーム取得 → 前処理 → 手の検出 → ランドマーク抽出 → 分類 → 出力 のパイプライン。
+# 各段はフレームを1つずつ受け取って FramePacket に結果を書き込むジェネレータとして連結する。
+# GestureRecognizer、ゲーム画面、収集・確認用のスクリプトはすべてここの処理を使うため、
+# 1フレーム分の処理 (flip_frame、detect_hands など) を速くすればすべてに反映される。
+#
+#   pipeline = (FramePipeline(cap)
+#               .preprocess(detection_width=640)
+#               .detect(hands, buffer=1, latest_only=True) # 検出以前を別スレッドで実行する
+#               .extract(max_num_hands=2)
+#               .classify(recognizer, batch_size=8))
+#   for packet in pipeline:
+#       ...
+
+# --- 1フレーム分の処理 ---
+
+def flip_frame(frame, buffers=None, telemetry=NULL_TELEMETRY):
+    """
+    フレームを水平方向に反転する。
+
+    Args:
+        buffers (FrameBufferPool): 出力先のバッファ。None なら新しい配列に書き込む。
+    """
+    with telemetry.stage("flip"):
+        return cv2.flip(frame, 1, dst=buffers.get(frame.shape) if buffers is not None else None)
+
+def resize_for_detection(frame, detection_width, buffers=None, telemetry=NULL_TELEMETRY):
+    """
+    検出用に幅 detection_width に縮小したフレームを返す (縦横比は維持する)。
+    入力がこれより小さい場合や detection_width が None の場合はそのまま返す。
+    ランドマークは正規化座標なので、縮小したフレームで検出しても元のフレームに描画できる。
+    """
+    height, width = frame.shape[:2]
+    if detection_width is None or width <= detection_width:
+        return frame
+    with telemetry.stage("detection_resize"):
+        detection_height = max(1, round(height * detection_width / width))
+        shape = (detection_height, detection_width) + frame.shape[2:]
+        return cv2.resize(frame, (detection_width, detection_height),
+                          dst=buffers.get(shape) if buffers is not None else None, interpolation=cv2.INTER_AREA)
+
+def detect_hands(hands, detection_frame, buffers=None, telemetry=NULL_TELEMETRY):
+    """
+    BGRのフレームをRGBに変換して MediaPipe Hands で手を検出する。
+
+    Returns:
+        tuple: (検出された手のランドマークのリスト, 各手の左右判定のリスト)
+    """
+    with telemetry.stage("cvtcolor"):
+        image_rgb = cv2.cvtColor(detection_frame, cv2.COLOR_BGR2RGB,
+                                 dst=buffers.get(detection_frame.shape) if buffers is not None else None)
+    with telemetry.stage("hands_process"):
+        results = hands.process(image_rgb)
+    return results.multi_hand_landmarks or [], results.multi_handedness or []
+
+def extract_landmark_data(hand_landmarks, out=None):
+    """
+    手のランドマークを [x0, y0, z0, x1, ...] の63次元のfloat32配列に書き込む。
+
+    Args:
+        hand_landmarks: MediaPipeが返した1つの手のランドマーク。
+        out (np.ndarray): 書き込み先。None の場合は新しく確保する。
+    """
+    if out is None:
+        out = np.empty(63, dtype=np.float32)
+    i = 0
+    for lm in hand_landmarks.landmark:
+        out[i] = lm.x
+        out[i + 1] = lm.y
+        out[i + 2] = lm.z
+        i += 3
+    return out
+
+def extract_landmarks(multi_hand_landmarks, multi_handedness, out, telemetry=NULL_TELEMETRY):
+    """
+    検出されたすべての手のランドマークを out の先頭の行から書き込む。
+
+    Args:
+        out (np.ndarray): 形状 (最大の手の数, 63) の書き込み先。入りきらない手は無視する。
+
+    Returns:
+        tuple: (形状 (手の数, 63) の out の一部, 各手の左右判定のラベルのリスト。不明なら None)
+    """
+    n = min(len(multi_hand_landmarks), len(out))
+    with telemetry.stage("extract_landmarks"):
+        for i in range(n):
+            extract_landmark_data(multi_hand_landmarks[i], out[i])
+    handedness = [h.classification[0].label for h in multi_handedness[:n]] if multi_handedness else None
+    return out[:n], handedness
+
+# --- パイプラインの段 ---
+
+class FramePacket:
+    """パイプラインを流れる1フレーム分のデータ。各段が担当の属性を埋める"""
+    __slots__ = ('index', 'timestamp', 'frame', 'detection_frame', 'multi_hand_landmarks',
+                 'multi_handedness', 'landmarks', 'handedness', 'predictions')
+
+    def __init__(self, frame, index=0, timestamp=None):
+        self.index = index
+        self.timestamp = time.perf_counter() if timestamp is None else timestamp # 取得時刻 (レイテンシの計算用)
+        self.frame = frame # 表示用のフレーム (前処理後は反転済み)
+        self.detection_frame = frame # 検出に使う縮小済みのフレーム
+        self.multi_hand_landmarks = [] # MediaPipe のランドマーク (描画用)
+        self.multi_handedness = []
+        self.landmarks = np.empty((0, 63), dtype=np.float32) # 形状 (手の数, 63)
+        self.handedness = None
+        self.predictions = [] # 手ごとの HandPrediction
+
+def read_frames(source, max_frames=None, retry=False, stop_event=None):
+    """
+    取得元からフレームを読み、FramePacket を返すジェネレータ。
+
+    Args:
+        source: cv2.VideoCapture 互換の取得元。
+        max_frames (int): 読む最大フレーム数。None なら読み切るまで。
+        retry (bool): 読み込みに失敗しても終了せずに読み直す (カメラ向け)。
+        stop_event (threading.Event): セットされたら終了する。
+    """
+    index = 0
+    while max_frames is None or index < max_frames:
+        if stop_event is not None and stop_event.is_set():
+            return
+        ret, frame = source.read()
+        if not ret:
+            if not retry:
+                return
+            time.sleep(0.005)
+            continue
+        yield FramePacket(frame, index)
+        index += 1
+
+class Stage:
+    """1フレームずつ処理する段の基底クラス。__call__ で1つの FramePacket に結果を書き込む"""
+    def __call__(self, packet):
+        raise NotImplementedError
+
+    def run(self, packets):
+        for packet in packets:
+            yield self(packet)
+
+class Preprocess(Stage):
+    """フレームを反転し、検出用の縮小フレームを作る"""
+    def __init__(self, flip=True, detection_width=None, buffers=2, telemetry=NULL_TELEMETRY):
+        """
+        Args:
+            flip (bool): 水平方向に反転するかどうか。
+            detection_width (int): 検出に使うフレームの幅。None なら縮小しない。
+            buffers (int): 出力を巡回させるバッファの枚数。後段が同時に保持しうるフレーム数以上にする。
+        """
+        self.flip = flip
+        self.detection_width = detection_width
+        self.telemetry = telemetry
+        self._flip_buffers = FrameBufferPool(buffers)
+        self._detection_buffers = FrameBufferPool(buffers)
+
+    def __call__(self, packet):
+        if self.flip:
+            packet.frame = flip_frame(packet.frame, self._flip_buffers, self.telemetry)
+        packet.detection_frame = resize_for_detection(packet.frame, self.detection_width, self._detection_buffers,
+                                                      self.telemetry)
+        return packet
+
+class Detect(Stage):
+    """MediaPipe Hands で手を検出する"""
+    def __init__(self, hands, motion_gate=None, telemetry=NULL_TELEMETRY):
+        """
+        Args:
+            hands: MediaPipe Hands (process(image_rgb) を持つもの)。
+            motion_gate (MotionGate): 指定すると、画像がほとんど変化していないフレームでは前回の検出結果を使い回す。
+        """
+        self.hands = hands
+        self.motion_gate = motion_gate
+        self.telemetry = telemetry
+        self._rgb_buffers = FrameBufferPool(1) # process() の間だけ使う
+        self._last_detection = ([], [])
+
+    def __call__(self, packet):
+        if self.motion_gate is not None:
+            with self.telemetry.stage("motion_gate"):
+                changed = self.motion_gate.frame_changed(packet.detection_frame)
+            if not changed:
+                packet.multi_hand_landmarks, packet.multi_handedness = self._last_detection
+                return packet
+        packet.multi_hand_landmarks, packet.multi_handedness = detect_hands(
+            self.hands, packet.detection_frame, self._rgb_buffers, self.telemetry)
+        self._last_detection = (packet.multi_hand_landmarks, packet.multi_handedness)
+        return packet
+
+class Extract(Stage):
+    """検出された手のランドマークを形状 (手の数, 63) の配列にする"""
+    def __init__(self, max_num_hands=1, buffers=2, telemetry=NULL_TELEMETRY):
+        self.telemetry = telemetry
+        self._buffers = [np.zeros((max_num_hands, 63), dtype=np.float32) for _ in range(buffers)]
+        self._index = 0
+
+    def __call__(self, packet):
+        out = self._buffers[self._index]
+        self._index = (self._index + 1) % len(self._buffers)
+        packet.landmarks, packet.handedness = extract_landmarks(packet.multi_hand_landmarks, packet.multi_handedness,
+                                                                out, self.telemetry)
+        return packet
+
+class Classify(Stage):
+    """
+    ランドマークを GestureRecognizer で分類する。
+    batch_size が2以上なら、その数のフレームの手をまとめて1回の推論で分類する
+    (録画の一括処理など、フレームを溜めても遅延が問題にならない場合向け)。
+    """
+    def __init__(self, recognizer, batch_size=1):
+        self.recognizer = recognizer
+        self.batch_size = batch_size
+
+    def __call__(self, packet):
+        packet.predictions = self.recognizer.classify_landmark_array(packet.landmarks, packet.handedness)
+        return packet
+
+    def run(self, packets):
+        if self.batch_size <= 1:
+            yield from super().run(packets)
+            return
+        batch = []
+        for packet in packets:
+            batch.append(packet)
+            if len(batch) >= self.batch_size:
+                yield from self._classify_batch(batch)
+                batch = []
+        if batch:
+            yield from self._classify_batch(batch)
+
+    def _classify_batch(self, batch):
+        predictions = self.recognizer.classify_landmark_batches([p.landmarks for p in batch],
+                                                                [p.handedness for p in batch])
+        for packet, packet_predictions in zip(batch, predictions):
+            packet.predictions = packet_predictions
+            yield packet
+
+# --- 段の間のバッファ ---
+
+class LatestFrameQueue:
+    """
+    最新の要素を優先する有界キュー。
+    満杯のときに put すると最も古い要素を捨てる (latest-frame-wins)。
+    """
+    def __init__(self, maxsize=1):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.dropped = 0 # 捨てられた要素の数
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """要素を取り出す。timeout 以内に要素が無ければ None を返す"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            return self._items.popleft()
+
+    def get_latest(self):
+        """待たずに最新の要素を取り出し、残りは捨てる。無ければ None を返す"""
+        with self._cond:
+            if not self._items:
+                return None
+            item = self._items.pop()
+            self.dropped += len(self._items)
+            self._items.clear()
+            return item
+
+_END = object() # 上流の終了を表す印
+
+class _Failure:
+    """上流のスレッドで発生した例外を下流に渡すための入れ物"""
+    def __init__(self, error):
+        self.error = error
+
+def buffered(items, size=1, latest_only=False, stop_event=None, telemetry=NULL_TELEMETRY, name="pipeline"):
+    """
+    上流のジェネレータを別スレッドで実行し、長さ size のキューを介して要素を返す。
+
+    Args:
+        items: 上流のイテレータ。以降はこのスレッドからだけ進める。
+        size (int): キューの長さ。
+        latest_only (bool): True なら下流が遅れたときに古い要素を捨てる (カメラ映像向け)。
+            False なら下流が追いつくまで上流を待たせ、すべての要素を渡す。
+        stop_event (threading.Event): セットされたら上流・下流ともに終了する。
+        telemetry (LatencyTelemetry): 上流のスレッドでの計測をフレームごとに確定する。
+    """
+    stop_event = stop_event or threading.Event()
+    items_queue = LatestFrameQueue(size) if latest_only else queue.Queue(maxsize=size)
+
+    def put(item):
+        if latest_only:
+            items_queue.put(item)
+            return
+        while not stop_event.is_set():
+            try:
+                items_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def produce():
+        try:
+            for item in items:
+                telemetry.end_frame()
+                if stop_event.is_set():
+                    return
+                put(item)
+            put(_END)
+        except Exception as e:
+            put(_Failure(e))
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+    try:
+        while not stop_event.is_set():
+            if latest_only:
+                item = items_queue.get(timeout=0.1)
+            else:
+                try:
+                    item = items_queue.get(timeout=0.1)
+                except queue.Empty:
+                    item = None
+            if item is None:
+                continue
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop_event.set()
+        thread.join(1.0)
+
+class FramePipeline:
+    """
+    段を連結したパイプライン。各段のメソッドは自身を返すので、つなげて書ける。
+    buffer を指定した段は、そこまでを別スレッドで実行し、次の段とはキューでつなぐ。
+    反復するたびに段を作り直すため、同じパイプラインを何度でも実行できる。
+    ただし close() した後は、反復を始める前であっても以降の反復はすぐに終わる。
+    """
+    def __init__(self, source, max_frames=None, retry=False, hold=2, telemetry=None):
+        """
+        Args:
+            source: cv2.VideoCapture 互換の取得元。
+            max_frames (int): 読む最大フレーム数。
+            retry (bool): 読み込みに失敗しても読み直す (カメラ向け)。
+            hold (int): パイプラインの外で同時に保持するフレームの数。内部バッファの枚数の計算に使う。
+            telemetry (LatencyTelemetry): 各段の所要時間を記録する場合に指定する。
+        """
+        self.source = source
+        self.max_frames = max_frames
+        self.retry = retry
+        self.hold = hold
+        self.telemetry = telemetry or NULL_TELEMETRY
+        self._specs = [] # (段のクラス, 引数) または (None, (キューの長さ, latest_only))
+        self._stop_event = threading.Event() # 実行中の反復を止めるイベント (反復ごとに作る)
+        self._closed = False
+
+    def _add(self, stage_class, kwargs, buffer, latest_only):
+        self._specs.append((stage_class, kwargs))
+        if buffer:
+            self.buffer(buffer, latest_only)
+        return self
+
+    def buffer(self, size=1, latest_only=False):
+        """ここまでの段を別スレッドで実行し、長さ size のキューで次の段とつなぐ"""
+        self._specs.append((None, (size, latest_only)))
+        return self
+
+    def preprocess(self, flip=True, detection_width=None, buffer=0, latest_only=False):
+        return self._add(Preprocess, dict(flip=flip, detection_width=detection_width), buffer, latest_only)
+
+    def detect(self, hands, motion_gate=None, buffer=0, latest_only=False):
+        return self._add(Detect, dict(hands=hands, motion_gate=motion_gate), buffer, latest_only)
+
+    def extract(self, max_num_hands=1, buffer=0, latest_only=False):
+        return self._add(Extract, dict(max_num_hands=max_num_hands), buffer, latest_only)
+
+    def classify(self, recognizer, batch_size=1, buffer=0, latest_only=False):
+        return self._add(Classify, dict(recognizer=recognizer, batch_size=batch_size), buffer, latest_only)
+
+    def _buffer_count(self):
+        """
+        バッファを持つ段の出力が同時に存在しうる数。
+        キューの中身、各段が処理中のもの、バッチ、パイプラインの外で保持されるものの合計。
+        """
+        count = len(self._specs) + self.hold + 1
+        for stage_class, kwargs in self._specs:
+            if stage_class is None:
+                count += kwargs[0]
+            elif stage_class is Classify:
+                count += kwargs["batch_size"]
+        return count
+
+    def __iter__(self):
+        # 前回の反復は終了時にイベントをセットするため、反復ごとに新しいイベントを使う。
+        # 既存のイベントをクリアすると、反復を始める前に呼ばれた close() を取り消してしまう
+        stop_event = threading.Event()
+        self._stop_event = stop_event
+        if self._closed:
+            stop_event.set()
+        buffers = self._buffer_count()
+        packets = read_frames(self.source, self.max_frames, self.retry, stop_event)
+        for stage_class, kwargs in self._specs:
+            if stage_class is None:
+                size, latest_only = kwargs
+                packets = buffered(packets, size, latest_only, stop_event, self.telemetry)
+                continue
+            if stage_class in (Preprocess, Extract):
+                kwargs = dict(kwargs, buffers=buffers)
+            if stage_class is not Classify:
+                kwargs = dict(kwargs, telemetry=self.telemetry)
+            packets = stage_class(**kwargs).run(packets)
+        return packets
+
+    def run(self, sink=None):
+        """
+        パイプラインを最後まで実行する。
+
+        Args:
+            sink (callable): sink(packet) を各フレームで呼ぶ。False を返すとそこで終了する。
+
+        Returns:
+            int: 処理したフレーム数。
+        """
+        count = 0
+        packets = iter(self)
+        try:
+            for packet in packets:
+                count += 1
+                if sink is not None and sink(packet) is False:
+                    break
+        finally:
+            packets.close()
+        return count
+
+    def close(self):
+        """
+        別スレッドで実行中の段を停止する (反復中のループは次の要素で終了する)。
+        反復を始める前に呼んだ場合も、その反復はすぐに終わる。
+        """
+        self._closed = True
+        self._stop_event.set()
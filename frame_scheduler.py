@@ -0,0 +1,96 @@
+import time
+
+class AdaptiveFrameScheduler:
+    """
+    ゲームループの次回呼び出しまでの待ち時間を、目標FPSと各反復の所要時間から決めるスケジューラ。
+    認識を含む反復が1フレームの予算に収まらない場合は、認識をNフレームに1回に間引く。
+    表示とタイマーは毎回更新されるため、負荷が高くても画面の動きは滑らかなままになる。
+    間引きはゲームループの中で認識する同期モードでのみ働く。パイプラインモード
+    (GestureRecognizer.pipeline(queue_size>0)) では古いフレームを捨てるキューが間引きの役割を持つため、
+    end(recognized=False) でループの周期だけに使う。
+    """
+    def __init__(self, target_fps=30, max_stride=4, smoothing=0.1, adapt_interval=30):
+        """
+        Args:
+            target_fps (float): 目標とするループのFPS。
+            max_stride (int): 認識を間引く最大の間隔 (Nフレームに1回)。
+            smoothing (float): 所要時間・FPSの指数移動平均の係数。
+            adapt_interval (int): 間引き間隔を見直すフレーム数。
+        """
+        self.frame_interval = 1.0 / target_fps
+        self.max_stride = max_stride
+        self.smoothing = smoothing
+        self.adapt_interval = adapt_interval
+
+        self.recognition_stride = 1 # 認識を行う間隔 (1なら毎フレーム)
+        self.effective_fps = 0.0 # 実際のループのFPS (指数移動平均)
+        self.recognition_time = 0.0 # 認識を行った反復の所要時間 (指数移動平均)
+
+        self._frame_index = 0
+        self._frames_since_adapt = 0
+        self._iteration_start = None
+        self._last_start = None
+
+    def reset(self):
+        """ラウンド開始時に統計をリセットする"""
+        self.recognition_stride = 1
+        self.effective_fps = 0.0
+        self.recognition_time = 0.0
+        self._frame_index = 0
+        self._frames_since_adapt = 0
+        self._last_start = None
+
+    def begin(self):
+        """反復の開始時に呼ぶ"""
+        now = time.perf_counter()
+        if self._last_start is not None:
+            interval = now - self._last_start
+            if interval > 0:
+                fps = 1.0 / interval
+                if self.effective_fps == 0.0:
+                    self.effective_fps = fps
+                else:
+                    self.effective_fps += self.smoothing * (fps - self.effective_fps)
+        self._last_start = now
+        self._iteration_start = now
+
+    def should_recognize(self):
+        """このフレームで認識を行うかどうか"""
+        return self._frame_index % self.recognition_stride == 0
+
+    def end(self, recognized=True):
+        """
+        反復の終了時に呼び、次の反復までの待ち時間を返す。
+
+        Args:
+            recognized (bool): この反復で認識を行ったかどうか。
+
+        Returns:
+            int: after() に渡す待ち時間 [ミリ秒]。予定より遅れている場合は1。
+        """
+        elapsed = time.perf_counter() - self._iteration_start
+        if recognized:
+            if self.recognition_time == 0.0:
+                self.recognition_time = elapsed
+            else:
+                self.recognition_time += self.smoothing * (elapsed - self.recognition_time)
+
+        self._frame_index += 1
+        self._frames_since_adapt += 1
+        if self._frames_since_adapt >= self.adapt_interval:
+            self._adapt_stride()
+            self._frames_since_adapt = 0
+
+        delay = self.frame_interval - elapsed
+        return max(1, int(delay * 1000))
+
+    def _adapt_stride(self):
+        # 認識を行う反復が予算を超えていれば間引きを増やし、十分余裕があれば戻す
+        if self.recognition_time > self.frame_interval and self.recognition_stride < self.max_stride:
+            self.recognition_stride += 1
+        elif self.recognition_time < self.frame_interval * 0.6 and self.recognition_stride > 1:
+            self.recognition_stride -= 1
+
+    def status_text(self):
+        """デバッグ表示用の文字列"""
+        return f"loop {self.effective_fps:.1f} fps (recognize 1/{self.recognition_stride})"
@@ -0,0 +1,294 @@
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+# フレーム取得元の抽象化。
+# いずれのクラスも cv2.VideoCapture と同じ read() / isOpened() / release() を持つため、
+# GestureRecognizer やゲームループからはカメラと区別なく扱える。
+
+# ベンチマークやソークテストが既定で再生する録画 (手が写っているもの)。
+# python frame_sources.py record session.avi で作成する
+RECORDING_FILE = "session.avi"
+
+def timestamps_path(video_path):
+    """録画ファイルに対応するタイムスタンプファイルのパスを返す"""
+    return video_path + ".timestamps.txt"
+
+class CameraSource:
+    """Webカメラからフレームを取得するソース"""
+    def __init__(self, index=0):
+        self.cap = cv2.VideoCapture(index)
+        # 処理が遅れたときに古いフレームが溜まらないよう、ドライバのバッファを最小にする
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+class RecordingSource:
+    """
+    別のソースから読んだフレームをそのまま返しつつ、動画ファイルに保存するソース。
+    各フレームの取得時刻 (録画開始からの秒数) はタイムスタンプファイルに1行ずつ書き出す。
+    """
+    def __init__(self, source, video_path, fps=30.0):
+        """
+        Args:
+            source: 録画対象のソース。
+            video_path (str): 保存先の動画ファイル (.avi なら MJPG、それ以外は mp4v)。
+            fps (float): 動画ファイルに記録するFPS (再生時はタイムスタンプを優先する)。
+        """
+        self.source = source
+        self.video_path = video_path
+        self.fps = fps
+        self.writer = None
+        self.timestamps_file = open(timestamps_path(video_path), "w")
+        self.start_time = None
+        self.frame_count = 0
+
+    def isOpened(self):
+        return self.source.isOpened()
+
+    def read(self):
+        ret, frame = self.source.read()
+        if not ret:
+            return ret, frame
+
+        now = time.monotonic()
+        if self.writer is None:
+            # 最初のフレームのサイズで VideoWriter を作成する
+            fourcc = cv2.VideoWriter_fourcc(*("MJPG" if self.video_path.endswith(".avi") else "mp4v"))
+            height, width = frame.shape[:2]
+            self.writer = cv2.VideoWriter(self.video_path, fourcc, self.fps, (width, height))
+            self.start_time = now
+
+        self.writer.write(frame)
+        self.timestamps_file.write(f"{now - self.start_time:.6f}\n")
+        self.frame_count += 1
+        return ret, frame
+
+    def release(self):
+        if self.writer is not None:
+            self.writer.release()
+        self.timestamps_file.close()
+        self.source.release()
+
+class ReplaySource:
+    """
+    RecordingSource で保存した動画を再生するソース。
+    realtime=True なら記録時のタイミングで (読み出しが遅れた分は捨てて)、
+    False なら最大速度ですべてのフレームを返す。
+    """
+    def __init__(self, video_path, realtime=True, loop=False):
+        """
+        Args:
+            video_path (str): 再生する動画ファイル。
+            realtime (bool): 記録時のタイミングを再現するかどうか。
+            loop (bool): 最後まで再生したら先頭に戻るかどうか。
+        """
+        self.video_path = video_path
+        self.realtime = realtime
+        self.loop = loop
+        self.cap = cv2.VideoCapture(video_path)
+
+        ts_path = timestamps_path(video_path)
+        if os.path.exists(ts_path):
+            with open(ts_path, "r") as f:
+                self.timestamps = [float(line) for line in f if line.strip()]
+        else:
+            # タイムスタンプが無い場合は動画のFPSから求める
+            fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+            frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.timestamps = [i / fps for i in range(frame_count)]
+
+        self.frame_index = 0
+        self.start_time = None
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop and self.frame_index > 0:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self.frame_index = 0
+            self.start_time = None
+            ret, frame = self.cap.read()
+        if not ret:
+            return ret, frame
+
+        if self.realtime:
+            now = time.monotonic()
+            if self.start_time is None:
+                self.start_time = now
+            # カメラと同様に、読み出しが遅れた分のフレームは捨てて最新のフレームを返す
+            skipped = False
+            while self.frame_index + 1 < len(self.timestamps) and \
+                    self.start_time + self.timestamps[self.frame_index + 1] <= now:
+                if not self.cap.grab():
+                    break
+                self.frame_index += 1
+                skipped = True
+            if skipped:
+                ret, frame = self.cap.retrieve()
+                if not ret:
+                    return ret, frame
+            if self.frame_index < len(self.timestamps):
+                delay = self.start_time + self.timestamps[self.frame_index] - now
+                if delay > 0:
+                    time.sleep(delay)
+
+        self.frame_index += 1
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+class SyntheticSource:
+    """
+    決まった内容のフレームを生成するソース。カメラの無い環境での計測用。
+    フレームは初期化時にまとめて生成し、read() では使い回すだけにする。
+    """
+    def __init__(self, width=640, height=480, num_frames=None, fps=None, seed=0, pattern_count=8):
+        """
+        Args:
+            width (int): フレームの幅。
+            height (int): フレームの高さ。
+            num_frames (int): 返すフレーム数。None なら無制限。
+            fps (float): 指定した場合はこのFPSを超えないように待つ。
+            seed (int): 乱数シード。同じシードなら同じフレーム列になる。
+            pattern_count (int): 事前に生成して巡回させるフレームの枚数。
+        """
+        rng = np.random.default_rng(seed)
+        gradient = np.linspace(0, 255, width, dtype=np.float32)[np.newaxis, :, np.newaxis]
+        self.frames = []
+        for i in range(pattern_count):
+            noise = rng.normal(0, 8, (height, width, 3))
+            frame = np.clip(gradient + noise + i * 4, 0, 255).astype(np.uint8)
+            self.frames.append(frame)
+
+        self.num_frames = num_frames
+        self.interval = 1.0 / fps if fps else None
+        self.frame_index = 0
+        self.last_time = None
+        self.opened = True
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self):
+        if not self.opened or (self.num_frames is not None and self.frame_index >= self.num_frames):
+            return False, None
+
+        if self.interval is not None:
+            now = time.monotonic()
+            if self.last_time is not None:
+                delay = self.last_time + self.interval - now
+                if delay > 0:
+                    time.sleep(delay)
+            self.last_time = time.monotonic()
+
+        frame = self.frames[self.frame_index % len(self.frames)].copy()
+        self.frame_index += 1
+        return True, frame
+
+    def release(self):
+        self.opened = False
+
+def open_frame_source(spec=0, realtime=True, loop=False):
+    """
+    文字列の指定からソースを生成する。
+
+    Args:
+        spec: 次のいずれか。
+            0 / "0"                カメラ番号
+            "synthetic"            合成フレーム (640x480)
+            "synthetic:WxH"        サイズを指定した合成フレーム
+            "replay:PATH" / PATH   録画ファイルの再生
+            "record:PATH"          カメラ0を録画しながら取得
+        realtime (bool): 再生時に記録時のタイミングを再現するかどうか。
+        loop (bool): 再生時に先頭に戻って繰り返すかどうか。
+
+    Returns:
+        cv2.VideoCapture 互換のソース。
+    """
+    if isinstance(spec, int):
+        return CameraSource(spec)
+    if spec.isdigit():
+        return CameraSource(int(spec))
+    if spec.startswith("synthetic"):
+        _, _, size = spec.partition(":")
+        if size:
+            width, height = (int(v) for v in size.lower().split("x"))
+            return SyntheticSource(width, height)
+        return SyntheticSource()
+    if spec.startswith("record:"):
+        return RecordingSource(CameraSource(0), spec[len("record:"):])
+    if spec.startswith("replay:"):
+        spec = spec[len("replay:"):]
+    return ReplaySource(spec, realtime=realtime, loop=loop)
+
+def main():
+    from discrimination_app import ENGINES, GestureRecognizer
+
+    parser = argparse.ArgumentParser(description="Record or replay camera sessions.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="カメラ映像を録画する ('q'キーで終了)")
+    record_parser.add_argument("output", help="保存先の動画ファイル (.avi / .mp4)")
+    record_parser.add_argument("--camera", type=int, default=0)
+    record_parser.add_argument("--seconds", type=float, default=None, help="録画時間 (秒)")
+
+    run_parser = subparsers.add_parser("run", help="ソースに対して認識を実行し、スループットを計測する")
+    run_parser.add_argument("source", help="open_frame_source に渡す指定 (例: replay:session.avi, synthetic)")
+    run_parser.add_argument("--model", default="model.h5")
+    run_parser.add_argument("--engine", default="numpy", choices=ENGINES)
+    run_parser.add_argument("--max-speed", action="store_true", help="記録時のタイミングを無視して最大速度で再生する")
+    run_parser.add_argument("--max-frames", type=int, default=300)
+    run_parser.add_argument("--detection-workers", type=int, default=0,
+                            help="検出を並列に行うワーカープロセスの数 (0ならメインスレッドで検出)")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        source = RecordingSource(CameraSource(args.camera), args.output)
+        start_time = time.monotonic()
+        while source.isOpened():
+            ret, frame = source.read()
+            if not ret:
+                break
+            cv2.imshow('Recording', frame)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+            if args.seconds is not None and time.monotonic() - start_time >= args.seconds:
+                break
+        source.release()
+        cv2.destroyAllWindows()
+        print(f"Recorded {source.frame_count} frames to {args.output}")
+        return
+
+    source = open_frame_source(args.source, realtime=not args.max_speed)
+    recognizer = GestureRecognizer(model_path=args.model, engine=args.engine,
+                                   detection_workers=args.detection_workers)
+    latencies = []
+    start_time = time.perf_counter()
+    for _ in recognizer.process_source(source, max_frames=args.max_frames):
+        latencies.append(recognizer.last_latency)
+    elapsed = time.perf_counter() - start_time
+    source.release()
+    recognizer.release()
+
+    if latencies:
+        latencies_ms = np.array(latencies) * 1000
+        print(f"Frames: {len(latencies)}  throughput: {len(latencies) / elapsed:.1f} fps")
+        print(f"Latency: mean {latencies_ms.mean():.2f} ms  p50 {np.percentile(latencies_ms, 50):.2f} ms  "
+              f"p95 {np.percentile(latencies_ms, 95):.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import json
+import os
+
+# 手の形の分類モデルの構築と学習。data_Preprocessing.py と学習・評価用のツールで共通に使う。
+
+DEFAULT_WIDTHS = (128, 64, 64)
+DEFAULT_DROPOUT = 0.3
+
+def build_model(input_dim=63, num_classes=41, widths=DEFAULT_WIDTHS, dropout=DEFAULT_DROPOUT):
+    """
+    全結合の分類モデルを構築してコンパイルする。
+    既定値は model.h5 と同じ構成 (Dense 128 → Dense 64 → Dropout → Dense 64 → Dropout → softmax)。
+
+    Args:
+        input_dim (int): 入力の次元数。
+        num_classes (int): クラス数。
+        widths (tuple): 中間層のユニット数。2層目以降の後ろには Dropout を入れる。
+        dropout (float): Dropout の割合。
+
+    Returns:
+        tf.keras.Model: コンパイル済みのモデル。
+    """
+    from tensorflow.keras.layers import Dense, Dropout
+    from tensorflow.keras.models import Sequential
+
+    model = Sequential()
+
+    # 入力層
+    model.add(Dense(widths[0], input_shape=(input_dim,), activation='relu'))
+
+    # 中間層
+    for width in widths[1:]:
+        model.add(Dense(width, activation='relu'))
+        model.add(Dropout(dropout))  # 過学習防止のためのDropout層
+
+    # 出力層
+    model.add(Dense(num_classes, activation='softmax'))
+
+    model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+def train_and_evaluate(X_train, y_train, X_test, y_test, num_classes, widths=DEFAULT_WIDTHS,
+                       dropout=DEFAULT_DROPOUT, epochs=10, batch_size=32, seed=42):
+    """
+    モデルを学習し、テストデータでの正解率と学習時間を返す。
+
+    Args:
+        X_train, X_test: ランドマークの配列。
+        y_train, y_test: ラベル番号 (one-hot ではない整数) の配列。
+        num_classes (int): クラス数。
+
+    Returns:
+        tuple: (学習済みモデル, 結果の辞書 (accuracy, train_seconds, predicted))
+    """
+    import time
+
+    import numpy as np
+    import tensorflow as tf
+    from tensorflow.keras.utils import to_categorical
+
+    tf.keras.utils.set_random_seed(seed)
+    model = build_model(X_train.shape[1], num_classes, widths, dropout)
+    start_time = time.perf_counter()
+    model.fit(X_train, to_categorical(y_train, num_classes), epochs=epochs, batch_size=batch_size, verbose=0)
+    train_seconds = time.perf_counter() - start_time
+
+    predicted = model.predict(X_test, batch_size=1024, verbose=0).argmax(axis=1)
+    return model, {
+        "accuracy": float((predicted == np.asarray(y_test)).mean()),
+        "train_seconds": train_seconds,
+        "predicted": predicted,
+    }
+
+def labels_path(model_path):
+    """モデルの出力順のラベルを保存するファイルのパス"""
+    return model_path + ".labels.json"
+
+def save_labels(model_path, labels):
+    """モデルの出力順のラベルをモデルの隣に保存する"""
+    with open(labels_path(model_path), "w") as f:
+        json.dump(list(labels), f, ensure_ascii=False)
+
+def load_labels(model_path, default=None):
+    """モデルの隣に保存されたラベルを読む。無ければ default を返す"""
+    path = labels_path(model_path)
+    if not os.path.exists(path):
+        return default
+    with open(path, "r") as f:
+        return json.load(f)
+
+def count_parameters(input_dim, num_classes, widths):
+    """build_model が作るモデルのパラメータ数"""
+    sizes = [input_dim] + list(widths) + [num_classes]
+    return sum(n_in * n_out + n_out for n_in, n_out in zip(sizes[:-1], sizes[1:]))
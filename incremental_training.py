@@ -0,0 +1,171 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from dataset_store import read_sources
+from gesture_model import load_labels, save_labels
+
+# 新しく集めたサンプルだけで既存のモデルを追加学習するツール。
+# 新しいラベルは出力層の末尾に追加し (既存のラベルの番号は変わらない)、
+# 新しいサンプルと既存データから少しだけ選んだリプレイ用のサンプルで短時間だけ学習する。
+# 既存のラベルの正解率が max_regression 以上下がった場合は保存しない。
+
+def sample_replay(X, y, labels, per_class, seed=0):
+    """既存のラベルごとに最大 per_class 件を無作為に選んだインデックスを返す"""
+    rng = np.random.default_rng(seed)
+    indices = []
+    for label in labels:
+        rows = np.flatnonzero(y == label)
+        if len(rows):
+            indices.append(rng.choice(rows, min(per_class, len(rows)), replace=False))
+    return np.concatenate(indices) if indices else np.empty(0, dtype=int)
+
+def extend_model(model, num_classes, seed=0):
+    """
+    出力層を num_classes に広げたモデルを作る。既存のクラスの重みはそのまま引き継ぎ、
+    追加したクラスは小さな乱数で初期化する (バイアスは既存の最小値にして、最初は選ばれにくくする)。
+    """
+    from tensorflow.keras import Input
+    from tensorflow.keras.layers import Dense
+    from tensorflow.keras.models import Sequential
+
+    extended = Sequential([Input(shape=model.input_shape[1:])])
+    for layer in model.layers[:-1]:
+        extended.add(layer.__class__.from_config(layer.get_config()))
+    output = model.layers[-1]
+    kernel, bias = output.get_weights()
+    extended.add(Dense(num_classes, activation=output.get_config().get('activation', 'softmax'),
+                       name=output.name))
+
+    for old_layer, new_layer in zip(model.layers[:-1], extended.layers[:-1]):
+        new_layer.set_weights(old_layer.get_weights())
+    added = num_classes - kernel.shape[1]
+    rng = np.random.default_rng(seed)
+    extended.layers[-1].set_weights([
+        np.concatenate([kernel, rng.normal(0, 0.01, (kernel.shape[0], added)).astype(np.float32)], axis=1),
+        np.concatenate([bias, np.full(added, bias.min(), dtype=np.float32)]),
+    ])
+    return extended
+
+def per_class_accuracy(model, X, y, labels):
+    """ラベルごとの正解率 (X に含まれるラベルのみ)"""
+    predicted = np.asarray(labels)[model.predict(X, batch_size=1024, verbose=0).argmax(axis=1)]
+    correct = predicted == y
+    return float(correct.mean()), {str(label): float(correct[y == label].mean()) for label in np.unique(y)}
+
+def fine_tune(model_path, new_sources, old_sources, output_path, replay_per_class=50, epochs=20,
+              learning_rate=5e-4, batch_size=32, max_regression=0.02, seed=42):
+    """
+    Args:
+        model_path (str): 既存のモデル。
+        new_sources (list): 新しく集めたサンプル (CSV、シャードのディレクトリ、またはストア)。
+        old_sources (list): 既存のデータ。リプレイ用のサンプルと、回帰の確認用のデータに使う。
+        output_path (str): 保存先。既存のモデルと同じパスでもよい (置き換えは一度に行う)。
+        replay_per_class (int): 既存のラベルごとのリプレイ用のサンプル数。
+        max_regression (float): 既存のラベルの正解率の低下の許容値。
+
+    Returns:
+        dict: 学習の結果。saved が False なら回帰の確認で不合格になり保存していない。
+    """
+    import tensorflow as tf
+    from sklearn.model_selection import train_test_split
+    from tensorflow.keras.models import load_model
+    from tensorflow.keras.optimizers import Adam
+    from tensorflow.keras.utils import to_categorical
+
+    tf.keras.utils.set_random_seed(seed)
+    old_model = load_model(model_path)
+    old_labels = list(load_labels(model_path) or _default_labels())
+
+    X_new, y_new, _ = read_sources(new_sources)
+    X_old, y_old, _ = read_sources(old_sources)
+    known = np.isin(y_old, old_labels)
+    X_old, y_old = X_old[known], y_old[known]
+
+    # 既存データは回帰の確認用とリプレイ用に分ける
+    X_old_pool, X_old_check, y_old_pool, y_old_check = train_test_split(
+        X_old, y_old, test_size=0.2, random_state=seed, stratify=y_old)
+    replay = sample_replay(X_old_pool, y_old_pool, old_labels, replay_per_class, seed)
+
+    added = [label for label in sorted(set(y_new)) if label not in old_labels]
+    labels = old_labels + added
+    model = extend_model(old_model, len(labels), seed) if added else old_model
+    model.compile(optimizer=Adam(learning_rate=learning_rate), loss='categorical_crossentropy',
+                  metrics=['accuracy'])
+
+    X_train = np.concatenate([X_new, X_old_pool[replay]])
+    label_index = {label: i for i, label in enumerate(labels)}
+    y_train = np.array([label_index[label] for label in np.concatenate([y_new, y_old_pool[replay]])])
+
+    before, before_per_class = per_class_accuracy(old_model, X_old_check, y_old_check, old_labels)
+    start_time = time.perf_counter()
+    model.fit(X_train, to_categorical(y_train, len(labels)), epochs=epochs, batch_size=batch_size,
+              shuffle=True, verbose=0)
+    train_seconds = time.perf_counter() - start_time
+    after, after_per_class = per_class_accuracy(model, X_old_check, y_old_check, labels)
+    new_accuracy, new_per_class = per_class_accuracy(model, X_new, y_new, labels)
+
+    result = {
+        "added_labels": added,
+        "train_rows": int(len(X_train)),
+        "replay_rows": int(len(replay)),
+        "train_seconds": train_seconds,
+        "old_accuracy_before": before,
+        "old_accuracy_after": after,
+        "old_per_class_change": {label: after_per_class[label] - before_per_class[label]
+                                 for label in before_per_class},
+        "new_accuracy": new_accuracy,
+        "new_per_class": new_per_class,
+        "saved": False,
+    }
+    if before - after > max_regression:
+        return result
+
+    # 実行中のゲームが書きかけのファイルを読まないよう、一時ファイルに保存してから置き換える。
+    # ラベルを先に書くのは、モデルの更新時刻で差し替えを検知する側が新しいラベルを読めるようにするため
+    tmp_path = output_path + ".tmp.h5"
+    model.save(tmp_path)
+    save_labels(output_path, labels)
+    os.replace(tmp_path, output_path)
+    result["saved"] = True
+    return result
+
+def _default_labels():
+    from discrimination_app import SORTED_WORD
+    return SORTED_WORD
+
+def main():
+    parser = argparse.ArgumentParser(description="Fine-tune the gesture classifier on newly collected samples.")
+    parser.add_argument("new", nargs="+", help="新しいサンプル (CSV、シャードのディレクトリ、またはストア)")
+    parser.add_argument("--model", default="model.h5")
+    parser.add_argument("--old", nargs="+", default=["hand_landmarks.csv"],
+                        help="既存のデータ (リプレイと回帰の確認に使う)")
+    parser.add_argument("--output", default=None, help="保存先 (省略時は --model を置き換える)")
+    parser.add_argument("--replay-per-class", type=int, default=50)
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--learning-rate", type=float, default=5e-4)
+    parser.add_argument("--max-regression", type=float, default=0.02,
+                        help="既存のラベルの正解率の低下の許容値 (0.02 = 2ポイント)")
+    args = parser.parse_args()
+
+    result = fine_tune(args.model, args.new, args.old, args.output or args.model, args.replay_per_class,
+                       args.epochs, args.learning_rate, max_regression=args.max_regression)
+    print(f"Added labels: {', '.join(result['added_labels']) or '(none)'}")
+    print(f"Trained on {result['train_rows']} rows ({result['replay_rows']} replayed) "
+          f"in {result['train_seconds']:.1f} s")
+    print(f"New samples accuracy: {result['new_accuracy'] * 100:.2f}%")
+    print(f"Old classes accuracy: {result['old_accuracy_before'] * 100:.2f}% -> "
+          f"{result['old_accuracy_after'] * 100:.2f}%")
+    for label, change in sorted(result["old_per_class_change"].items(), key=lambda item: item[1])[:5]:
+        if change < 0:
+            print(f"  {label:<5} {change * 100:+.2f} points")
+    if not result["saved"]:
+        print("Regression check failed; the model was not saved")
+        sys.exit(1)
+    print(f"Model saved to {args.output or args.model}")
+
+if __name__ == "__main__":
+    main()
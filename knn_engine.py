@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+from landmark_features import normalize_landmarks
+
+LANDMARK_CSV = "hand_landmarks.csv"
+
+class KnnInferenceEngine:
+    """
+    hand_landmarks.csv の正規化済みランドマークを使う最近傍分類エンジン。
+    mode='knn' では距離で重み付けしたk近傍の投票、mode='prototype' ではクラスごとの平均との距離で分類する。
+    model.h5 のエンジンと同じく predict(x) で (batch, クラス数) の確率を返す。
+    """
+    def __init__(self, X, y, labels=None, k=5, mode='knn'):
+        """
+        正規化したランドマークで近傍探索用のインデックスとクラスごとのプロトタイプを作る。
+
+        Args:
+            X: 形状 (N, 63) の学習データ。
+            y: 長さ N のラベル。
+            labels (list): 出力のクラス順。None ならデータ中のラベルをソートした順。
+                データに無いクラスの確率は常に0になる。
+            k (int): 投票に使う近傍の数。
+            mode (str): 'knn' または 'prototype'。
+        """
+        if mode not in ('knn', 'prototype'):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.k = k
+        self.mode = mode
+
+        self.labels = list(labels) if labels is not None else sorted(set(y))
+        label_index = {label: i for i, label in enumerate(self.labels)}
+        keep = np.array([label in label_index for label in y])
+
+        self.train = normalize_landmarks(np.asarray(X)[keep])
+        self.train_classes = np.array([label_index[label] for label in np.asarray(y)[keep]])
+        self.train_t = np.ascontiguousarray(self.train.T)
+        self.train_sq = (self.train ** 2).sum(axis=1)
+
+        # クラスごとのプロトタイプ (平均ベクトル)
+        self.present_classes = np.unique(self.train_classes)
+        self.prototypes = np.stack([self.train[self.train_classes == c].mean(axis=0)
+                                    for c in self.present_classes])
+        self.prototypes_t = np.ascontiguousarray(self.prototypes.T)
+        self.prototypes_sq = (self.prototypes ** 2).sum(axis=1)
+
+        self._calibrate()
+
+    @classmethod
+    def from_csv(cls, dataset_path=LANDMARK_CSV, **kwargs):
+        """CSV (63列 + label列) からエンジンを作る"""
+        df = pd.read_csv(dataset_path)
+        return cls(df.drop('label', axis=1).values, df['label'].values.astype(str), **kwargs)
+
+    def _calibrate(self, sample_size=500, seed=0):
+        """
+        予測時と同じ種類の距離から距離のスケールを決める。
+        mode='knn' では学習データ内の最近傍距離 (自分自身を除く)、
+        mode='prototype' では各サンプルから自分のクラスのプロトタイプまでの距離を使う
+        (プロトタイプまでの距離はサンプル間の距離よりずっと大きいため、同じスケールは使えない)。
+        tau: 重みの減衰の基準 (中央値)、radius: これより遠い入力は信頼度を下げる (95パーセンタイル)。
+        """
+        rng = np.random.default_rng(seed)
+        sample = rng.choice(len(self.train), min(sample_size, len(self.train)), replace=False)
+        if self.mode == 'prototype':
+            d2 = self._squared_distances(self.train[sample], self.prototypes_t, self.prototypes_sq)
+            own = np.searchsorted(self.present_classes, self.train_classes[sample])
+            nearest = np.sqrt(d2[np.arange(len(sample)), own])
+        else:
+            d2 = self._squared_distances(self.train[sample], self.train_t, self.train_sq)
+            d2[np.arange(len(sample)), sample] = np.inf
+            nearest = np.sqrt(d2.min(axis=1))
+        self.tau = max(float(np.median(nearest)), 1e-6)
+        self.radius = max(float(np.percentile(nearest, 95)), self.tau)
+
+    @staticmethod
+    def _squared_distances(queries, reference_t, reference_sq):
+        d2 = queries @ reference_t
+        d2 *= -2
+        d2 += reference_sq
+        d2 += (queries ** 2).sum(axis=1, keepdims=True)
+        np.maximum(d2, 0, out=d2)
+        return d2
+
+    def predict(self, x, verbose=0):
+        """
+        Args:
+            x: 形状 (batch, 63) の生のランドマーク。
+            verbose: Kerasとの互換用 (未使用)。
+
+        Returns:
+            np.ndarray: 形状 (batch, len(labels)) の確率。学習データから遠い入力ほど小さくなる。
+        """
+        queries = normalize_landmarks(x)
+        rows = np.arange(len(queries))[:, np.newaxis]
+        probabilities = np.zeros((len(queries), len(self.labels)), dtype=np.float32)
+
+        if self.mode == 'prototype':
+            d = np.sqrt(self._squared_distances(queries, self.prototypes_t, self.prototypes_sq))
+            nearest = d.min(axis=1)
+            weights = np.exp(-(d - nearest[:, np.newaxis]) / self.tau)
+            probabilities[:, self.present_classes] = weights
+        else:
+            d2 = self._squared_distances(queries, self.train_t, self.train_sq)
+            k = min(self.k, d2.shape[1])
+            neighbors = np.argpartition(d2, k - 1, axis=1)[:, :k]
+            d = np.sqrt(d2[rows, neighbors])
+            nearest = d.min(axis=1)
+            weights = np.exp(-(d - nearest[:, np.newaxis]) / self.tau)
+            np.add.at(probabilities, (np.broadcast_to(rows, neighbors.shape), self.train_classes[neighbors]), weights)
+
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        # 学習データから離れている入力は信頼度を下げる
+        probabilities *= np.minimum(1.0, self.radius / np.maximum(nearest, 1e-12))[:, np.newaxis]
+        return probabilities
+
+if __name__ == "__main__":
+    # model.h5 との精度・レイテンシの比較
+    from sklearn.model_selection import train_test_split
+
+    from benchmark import time_callable
+    from discrimination_app import SORTED_WORD, load_engine
+
+    df = pd.read_csv(LANDMARK_CSV)
+    X = df.drop('label', axis=1).values.astype(np.float32)
+    y = df['label'].values.astype(str)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    engines = {mode: KnnInferenceEngine(X_train, y_train, labels=SORTED_WORD, mode=mode)
+               for mode in ('knn', 'prototype')}
+    # model.h5 は分割前のデータを含めて学習されている可能性があるため、精度は参考値
+    engines['model.h5 (numpy)'] = load_engine('model.h5', 'numpy')
+
+    print(f"{'engine':<18} {'accuracy':>9} {'single p50':>12} {'single p95':>12} {'batch rows/s':>14}")
+    for name, engine in engines.items():
+        predicted = np.array(SORTED_WORD)[engine.predict(X_test).argmax(axis=1)]
+        accuracy = (predicted == y_test).mean() * 100
+        single = time_callable(lambda: engine.predict(X_test[:1]), 1000)
+        batch = time_callable(lambda: engine.predict(X_test), 20)
+        print(f"{name:<18} {accuracy:8.2f}% {single['p50_ms']:10.3f}ms {single['p95_ms']:10.3f}ms "
+              f"{batch['calls_per_sec'] * len(X_test):14.0f}")
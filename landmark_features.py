@@ -0,0 +1,18 @@
+import numpy as np
+
+def normalize_landmarks(X):
+    """
+    ランドマークを手首基準・スケール不変に正規化する。
+
+    Args:
+        X: 形状 (N, 63) または (63,) の [x0, y0, z0, x1, ...]。
+
+    Returns:
+        np.ndarray: 手首 (0番) を原点とし、手首から最も遠い点までの距離で割った (N, 63) のfloat32配列。
+    """
+    points = np.asarray(X, dtype=np.float32).reshape(-1, 21, 3)
+    centered = points - points[:, :1, :]
+    scale = np.sqrt((centered ** 2).sum(axis=2)).max(axis=1)
+    scale[scale == 0] = 1.0
+    centered /= scale[:, np.newaxis, np.newaxis]
+    return centered.reshape(-1, 63)
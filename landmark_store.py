@@ -0,0 +1,250 @@
+import glob
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+
+# 収集したランドマークを .npz のシャードとして追記保存する形式。
+# シャードは一時ファイルに書いてから名前を変えるため、途中でクラッシュしても
+# 完成したシャードだけが残る (失うのは最後にフラッシュしてからのサンプルのみ)。
+#
+# 各シャードの列:
+#   landmarks   float32 (N, 63)  [x0, y0, z0, x1, y1, z1, ..., x20, y20, z20]
+#   label       str     (N,)
+#   timestamp   float64 (N,)     収集時刻 (UNIX時間)
+#   session     str     (N,)     収集セッションのID
+#   handedness  str     (N,)     "Left" / "Right" (不明なら空文字)
+#   sequence    int64   (N,)     連続したフレームとして記録した場合のセッション内の番号 (1フレームのサンプルは -1)
+#                                (session, sequence) が同じ行が1つのシーケンスになる (timestamp の順)
+
+SCHEMA_FILE = "schema.json"
+SHARD_PATTERN = "shard-*.npz"
+SCHEMA_VERSION = 2
+COMPATIBLE_VERSIONS = (1, 2) # 1 には sequence 列が無い (読み込み時は -1 とみなす)
+NUM_FEATURES = 63
+
+# CSVに書き出すときの列名。データの並び (点ごとに x, y, z) と一致させる
+CSV_COLUMNS = [f'{axis}{i}' for i in range(21) for axis in 'xyz'] + ['label']
+
+COLUMNS = {
+    "landmarks": ("float32", [NUM_FEATURES]),
+    "label": ("str", []),
+    "timestamp": ("float64", []),
+    "session": ("str", []),
+    "handedness": ("str", []),
+    "sequence": ("int64", []),
+}
+
+def _fsync_directory(directory):
+    # 名前の変更をディスクに確定させる (Windows ではディレクトリを開けないので省略)
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _sequence_column(shard):
+    """シャードの sequence 列。バージョン1のシャードには無いので -1 で埋める"""
+    if "sequence" in shard.files:
+        return shard["sequence"]
+    return np.full(len(shard["label"]), -1, dtype=np.int64)
+
+def shard_paths(directory):
+    """完成したシャードのパスを番号順に返す"""
+    return sorted(glob.glob(os.path.join(directory, SHARD_PATTERN)))
+
+class LandmarkShardWriter:
+    """
+    サンプルを固定サイズのバッファに溜め、chunk_size 件または flush_interval 秒ごとに
+    シャードとして書き出すライター。メモリ使用量はバッファの分だけで一定になる。
+    既存のディレクトリを開いた場合は続きの番号からシャードを追加する (再開)。
+    """
+    def __init__(self, directory, chunk_size=256, flush_interval=5.0, session=None):
+        """
+        Args:
+            directory (str): シャードを保存するディレクトリ。無ければ作成する。
+            chunk_size (int): 1つのシャードに入れる最大のサンプル数。
+            flush_interval (float): 最後の書き出しからこの秒数が経ったら、件数に関わらず書き出す。
+            session (str): 収集セッションのID。None なら日時と乱数から生成する。
+        """
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.session = session or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        os.makedirs(directory, exist_ok=True)
+        self._write_schema()
+
+        # 前回クラッシュしたときに残った書きかけのファイルを消す
+        for path in glob.glob(os.path.join(directory, "*.tmp")):
+            os.remove(path)
+
+        # 再開時は既存のシャードからラベルごとの件数と次のシャード番号を求める
+        self.label_counts = {}
+        existing = shard_paths(directory)
+        # シーケンスはシャードをまたぐことがあるため、(セッション, 番号) の組で数える
+        sequences = set()
+        for path in existing:
+            with np.load(path) as shard:
+                labels = shard["label"]
+                sessions = shard["session"]
+                sequence = _sequence_column(shard)
+            single = sequence < 0
+            for label, count in zip(*np.unique(labels[single], return_counts=True)):
+                self.label_counts[str(label)] = self.label_counts.get(str(label), 0) + int(count)
+            sequences.update(zip(sessions[~single].tolist(), sequence[~single].tolist(), labels[~single].tolist()))
+        for _, _, label in sequences:
+            self.label_counts[str(label)] = self.label_counts.get(str(label), 0) + 1
+        self._next_shard = int(os.path.basename(existing[-1])[len("shard-"):-len(".npz")]) + 1 if existing else 0
+
+        self._landmarks = np.empty((chunk_size, NUM_FEATURES), dtype=np.float32)
+        self._labels = [None] * chunk_size
+        self._timestamps = np.empty(chunk_size, dtype=np.float64)
+        self._handedness = [None] * chunk_size
+        self._sequences = np.empty(chunk_size, dtype=np.int64)
+        self._count = 0
+        self._next_sequence = 0
+        self._last_flush = time.monotonic()
+
+    def _write_schema(self):
+        path = os.path.join(self.directory, SCHEMA_FILE)
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                version = json.load(f).get("version")
+            if version not in COMPATIBLE_VERSIONS:
+                raise ValueError(f"{self.directory} uses schema version {version}, expected {SCHEMA_VERSION}")
+            if version == SCHEMA_VERSION:
+                return
+        schema = {
+            "version": SCHEMA_VERSION,
+            "columns": {name: {"dtype": dtype, "shape": shape} for name, (dtype, shape) in COLUMNS.items()},
+            "landmark_order": CSV_COLUMNS[:-1],
+        }
+        with open(path, "w") as f:
+            json.dump(schema, f, indent=2)
+
+    def append(self, landmarks, label, handedness=None, timestamp=None, sequence=-1):
+        """
+        1つのサンプルを追加する。バッファが一杯になるか flush_interval が過ぎていれば書き出す。
+
+        Args:
+            landmarks: [x0, y0, z0, x1, ...] の63次元のランドマーク。
+            label (str): ラベル。
+            handedness (str): 左右判定のラベル。
+            timestamp (float): 収集時刻。None なら現在時刻。
+            sequence (int): シーケンスの番号。1フレームのサンプルなら -1。
+        """
+        i = self._count
+        self._landmarks[i] = landmarks
+        self._labels[i] = label
+        self._timestamps[i] = time.time() if timestamp is None else timestamp
+        self._handedness[i] = handedness or ""
+        self._sequences[i] = sequence
+        self._count += 1
+        if sequence < 0:
+            self.label_counts[label] = self.label_counts.get(label, 0) + 1
+
+        if self._count == self.chunk_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def append_sequence(self, frames, label, handedness=None, timestamps=None):
+        """
+        連続したフレームのランドマークを1つのシーケンスとして追加する。
+        label_counts はシーケンスの数で数える。
+
+        Args:
+            frames: 形状 (フレーム数, 63) のランドマーク。
+            timestamps (list): 各フレームの取得時刻。None なら現在時刻。
+        """
+        sequence = self._next_sequence
+        self._next_sequence += 1
+        for i, landmarks in enumerate(frames):
+            self.append(landmarks, label, handedness, None if timestamps is None else timestamps[i], sequence)
+        self.label_counts[label] = self.label_counts.get(label, 0) + 1
+
+    def flush(self):
+        """バッファの内容を新しいシャードとして書き出す"""
+        self._last_flush = time.monotonic()
+        n = self._count
+        if n == 0:
+            return
+        path = os.path.join(self.directory, f"shard-{self._next_shard:06d}.npz")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f,
+                     landmarks=self._landmarks[:n],
+                     label=np.array(self._labels[:n], dtype=str),
+                     timestamp=self._timestamps[:n],
+                     session=np.full(n, self.session),
+                     handedness=np.array(self._handedness[:n], dtype=str),
+                     sequence=self._sequences[:n])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        _fsync_directory(self.directory)
+        self._next_shard += 1
+        self._count = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # 例外で中断した場合も、溜まっているサンプルは書き出す
+        self.close()
+
+def read_shards(directory):
+    """
+    ディレクトリのすべてのシャードを読み、列ごとに連結して返す。
+
+    Returns:
+        dict: 列名 -> np.ndarray。
+    """
+    columns = {name: [] for name in COLUMNS}
+    for path in shard_paths(directory):
+        with np.load(path) as shard:
+            for name in COLUMNS:
+                columns[name].append(_sequence_column(shard) if name == "sequence" else shard[name])
+    if not columns["landmarks"]:
+        return {"landmarks": np.empty((0, NUM_FEATURES), dtype=np.float32),
+                **{name: np.empty(0, dtype=str) for name in ("label", "session", "handedness")},
+                "timestamp": np.empty(0, dtype=np.float64),
+                "sequence": np.empty(0, dtype=np.int64)}
+    return {name: np.concatenate(parts) for name, parts in columns.items()}
+
+def read_sequences(directory, min_length=1):
+    """
+    シーケンスとして記録したサンプルを読み、シーケンスごとにまとめる。
+
+    Args:
+        min_length (int): これより短いシーケンスは除く。
+
+    Returns:
+        tuple: (形状 (フレーム数, 63) の配列のリスト, ラベルの配列)
+    """
+    data = read_shards(directory)
+    rows = np.flatnonzero(data["sequence"] >= 0)
+    groups = {}
+    for i in rows[np.argsort(data["timestamp"][rows], kind="stable")]:
+        groups.setdefault((data["session"][i], int(data["sequence"][i])), []).append(i)
+    sequences, labels = [], []
+    for indices in groups.values():
+        if len(indices) >= min_length:
+            sequences.append(data["landmarks"][indices])
+            labels.append(data["label"][indices[0]])
+    return sequences, np.array(labels, dtype=str)
+
+def export_csv(directory, csv_path):
+    """シャードを hand_landmarks.csv と同じ形式 (63列 + label列) のCSVに書き出す"""
+    import pandas as pd
+
+    data = read_shards(directory)
+    df = pd.DataFrame(data["landmarks"], columns=CSV_COLUMNS[:-1])
+    df['label'] = data["label"]
+    df.to_csv(csv_path, index=False)
+    return len(df)
@@ -1,17 +1,36 @@
+import argparse
 import tkinter as tk
 from tkinter import ttk
 
 from screens.game_start_screen import GameStartScreen
 from screens.game_play_screen import GamePlayScreen
 from screens.game_over_screen import GameOverScreen
+from recognition_session import RecognitionSession
+from motion_gate import MotionGate
+from prediction_cache import PredictionCache
+from telemetry import LatencyTelemetry
+
+MODEL_CHECK_INTERVAL_MS = 2000 # モデルファイルの更新を確認する間隔
 
 class GameManager(tk.Tk):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, source=0, telemetry=None, detection_width=640, motion_gate=None,
+                 prediction_cache='auto', cascade=False, temporal=None, watch_model=False, **kwargs):
         tk.Tk.__init__(self, *args, **kwargs)
 
         self.title("Jesture Game App")
         self.attributes('-fullscreen', True)
         self.bind('<Escape>', self.exit_fullscreen)
+        self.protocol("WM_DELETE_WINDOW", self.destroy)
+
+        # 認識セッションはアプリ全体で一度だけ生成する
+        # 重い読み込みとウォームアップはスタート画面の表示中にバックグラウンドで行う
+        self.session = RecognitionSession(model_path='model.h5', engine='numpy', source=source,
+                                          telemetry=telemetry, detection_width=detection_width,
+                                          motion_gate=motion_gate, prediction_cache=prediction_cache,
+                                          cascade=cascade, temporal=temporal)
+        self.session.start_loading()
+        if watch_model:
+            self.after(MODEL_CHECK_INTERVAL_MS, self._check_model_update)
 
         # コンテナフレームをインスタンス変数として保持
         self.container = tk.Frame(self)
@@ -29,11 +48,23 @@ class GameManager(tk.Tk):
 
         self.show_frame("GameStartScreen")
 
+    def _check_model_update(self):
+        """モデルファイルが更新されていれば、ゲームを止めずに差し替える"""
+        self.session.check_model_update()
+        self.after(MODEL_CHECK_INTERVAL_MS, self._check_model_update)
+
     def exit_fullscreen(self, event=None):
         """Escapeキーでフルスクリーンを解除する"""
         self.attributes('-fullscreen', False)
 
-    def show_frame(self, page_name, debug=False):
+    def destroy(self):
+        """ウィンドウを閉じる前に認識セッションを解放する"""
+        if "GamePlayScreen" in self.frames:
+            self.frames["GamePlayScreen"].stop_game_loop()
+        self.session.close()
+        tk.Tk.destroy(self)
+
+    def show_frame(self, page_name, debug=False, num_players=1):
         """指定された画面を最前面に表示する"""
         # GamePlayScreenに遷移する場合、またはGamePlayScreenから遷移する場合の処理
         # まず、既存のGamePlayScreenがあれば破棄する
@@ -57,15 +88,50 @@ class GameManager(tk.Tk):
 
         # 遷移先がGamePlayScreenであればゲームループを開始
         if page_name == "GamePlayScreen":
-            self.frames["GamePlayScreen"].start_game_loop(debug=debug)
+            self.frames["GamePlayScreen"].start_game_loop(debug=debug, num_players=num_players)
 
     def show_game_over_screen(self, final_score):
-        """ゲームオーバー画面を表示し、スコアを渡す"""
+        """ゲームオーバー画面を表示し、スコア (2人プレイではプレイヤーごとのリスト) を渡す"""
         game_over_frame = self.frames["GameOverScreen"]
         game_over_frame.set_score(final_score)
         self.show_frame("GameOverScreen")
 
 
 if __name__ == "__main__":
-    app = GameManager()
+    parser = argparse.ArgumentParser(description="Jesture Game App")
+    parser.add_argument("--source", default="0",
+                        help="フレーム取得元 (カメラ番号、replay:PATH、synthetic など)")
+    parser.add_argument("--telemetry", action="store_true",
+                        help="認識処理の各段の所要時間を計測し、デバッグモードで表示する")
+    parser.add_argument("--telemetry-log", default=None,
+                        help="フレームごとの計測結果を書き出すJSONLファイル (--telemetry を有効にする)")
+    parser.add_argument("--detection-width", type=int, default=640,
+                        help="手の検出に使う縮小フレームの幅 (表示解像度とは独立)")
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="手が動いていないフレームでは検出・分類を省略し、前回の結果を使い回す")
+    parser.add_argument("--prediction-cache", choices=["auto", "on", "off"], default="auto",
+                        help="同じ手の形の予測結果をキャッシュする (auto: 効果のあるエンジンでのみ有効)")
+    parser.add_argument("--cascade", action="store_true",
+                        help="プロトタイプで先に判定し、確信できない手だけモデルで推論する")
+    parser.add_argument("--temporal-window", type=int, default=0,
+                        help="1以上なら直近のこのフレーム数の窓で予測を安定させる (時系列モード)")
+    parser.add_argument("--sequence-model", default=None,
+                        help="時系列モードで使うシーケンスモデル (temporal_window.py train で作成)")
+    parser.add_argument("--watch-model", action="store_true",
+                        help="model.h5 が更新されたら (incremental_training.py など) 再起動せずに差し替える")
+    args = parser.parse_args()
+
+    telemetry = None
+    if args.telemetry or args.telemetry_log:
+        telemetry = LatencyTelemetry(jsonl_path=args.telemetry_log)
+
+    temporal = None
+    if args.temporal_window > 0:
+        from temporal_window import TemporalSmoother
+        temporal = TemporalSmoother(args.temporal_window, sequence_model=args.sequence_model)
+
+    app = GameManager(source=args.source, telemetry=telemetry, detection_width=args.detection_width,
+                      motion_gate=MotionGate() if args.motion_gate else None,
+                      prediction_cache={"auto": "auto", "on": PredictionCache(), "off": None}[args.prediction_cache],
+                      cascade=args.cascade, temporal=temporal, watch_model=args.watch_model)
     app.mainloop()
\ No newline at end of file
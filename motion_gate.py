@@ -0,0 +1,94 @@
+import time
+
+import cv2
+import numpy as np
+
+class MotionGate:
+    """
+    手がほとんど動いていないフレームで、検出と分類を省略するための判定を行うクラス。
+    - フレーム差分: 縮小したグレースケール画像の平均差分が小さければ MediaPipe の検出を省略する
+    - ランドマーク差分: 前回のランドマークからの移動量が小さければ分類を省略する
+    いずれも max_skip_interval 秒以上省略が続いた場合は必ず処理を行う。
+    """
+    def __init__(self, frame_threshold=2.0, landmark_threshold=0.01, max_skip_interval=0.5,
+                 thumbnail_size=(32, 24)):
+        """
+        Args:
+            frame_threshold (float): フレーム差分の閾値 (0-255の輝度の平均絶対差)。
+            landmark_threshold (float): ランドマークの移動量の閾値 (正規化座標の最大絶対差)。
+            max_skip_interval (float): 省略を続けてよい最大の秒数。
+            thumbnail_size (tuple): フレーム差分に使う縮小画像の (幅, 高さ)。
+        """
+        self.frame_threshold = frame_threshold
+        self.landmark_threshold = landmark_threshold
+        self.max_skip_interval = max_skip_interval
+        self.thumbnail_size = thumbnail_size
+
+        self._thumbnail = np.zeros(thumbnail_size[::-1], dtype=np.uint8)
+        self._previous_thumbnail = None
+        self._last_detection_time = 0.0
+        self._previous_landmarks = None
+        self._last_classification_time = 0.0
+
+        self.frames = 0
+        self.detections_skipped = 0
+        self.classifications = 0
+        self.classifications_skipped = 0
+
+    def frame_changed(self, frame):
+        """
+        前回検出したフレームから画像が変化したかどうか。
+        False を返した場合、呼び出し側は前回の検出結果を使い回してよい。
+        """
+        self.frames += 1
+        small = cv2.resize(frame, self.thumbnail_size, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self._thumbnail)
+
+        now = time.monotonic()
+        if self._previous_thumbnail is not None and now - self._last_detection_time < self.max_skip_interval:
+            difference = cv2.absdiff(self._thumbnail, self._previous_thumbnail).mean()
+            if difference < self.frame_threshold:
+                self.detections_skipped += 1
+                return False
+
+        if self._previous_thumbnail is None:
+            self._previous_thumbnail = self._thumbnail.copy()
+        else:
+            self._previous_thumbnail[...] = self._thumbnail
+        self._last_detection_time = now
+        return True
+
+    def landmarks_changed(self, landmarks):
+        """
+        前回分類したランドマークから手が動いたかどうか。
+
+        Args:
+            landmarks (np.ndarray): 形状 (手の数, 63) のランドマーク。
+        """
+        self.classifications += 1
+        now = time.monotonic()
+        previous = self._previous_landmarks
+        if previous is not None and previous.shape == landmarks.shape and \
+                now - self._last_classification_time < self.max_skip_interval:
+            if np.abs(landmarks - previous).max() < self.landmark_threshold:
+                self.classifications_skipped += 1
+                return False
+
+        if previous is None or previous.shape != landmarks.shape:
+            self._previous_landmarks = landmarks.copy()
+        else:
+            previous[...] = landmarks
+        self._last_classification_time = now
+        return True
+
+    def reset(self):
+        """手の状態の記憶を消す (次の判定は必ず処理を行う)"""
+        self._previous_thumbnail = None
+        self._previous_landmarks = None
+
+    def summary_text(self):
+        """省略できた検出・分類の割合"""
+        detection_rate = self.detections_skipped / self.frames * 100 if self.frames else 0.0
+        classification_rate = self.classifications_skipped / self.classifications * 100 if self.classifications else 0.0
+        return (f"gate: skipped detect {self.detections_skipped}/{self.frames} ({detection_rate:.0f}%), "
+                f"classify {self.classifications_skipped}/{self.classifications} ({classification_rate:.0f}%)")
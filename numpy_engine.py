@@ -0,0 +1,137 @@
+import json
+
+import h5py
+import numpy as np
+
+class NumpyInferenceEngine:
+    """
+    model.h5 (Keras Sequential / Dense層のみ) をNumPyだけで推論するクラス。
+    重みは初期化時に一度だけ読み込み、1行推論では事前確保したバッファを使い回す。
+    Keras の model.predict と同じ predict(x) インターフェースを持つ。
+    """
+    def __init__(self, model_path='model.h5', layers=None):
+        """
+        Args:
+            model_path (str): Kerasで保存したh5モデルのパス。
+            layers (list): 読み込み済みの (kernel, bias, activation) のリスト。指定した場合は model_path を使わない。
+        """
+        self.layers = layers if layers is not None else load_dense_layers(model_path)
+        self.input_dim = self.layers[0][0].shape[0]
+        self.output_dim = self.layers[-1][0].shape[1]
+
+        # 1行推論用のバッファ (入力 + 各層の出力)
+        self._input_buffer = np.zeros((1, self.input_dim), dtype=np.float32)
+        self._buffers = [np.zeros((1, kernel.shape[1]), dtype=np.float32)
+                         for kernel, _, _ in self.layers]
+        self._batch_buffers = {}
+
+    def _get_buffers(self, batch_size):
+        """バッチサイズに応じた出力バッファを返す (サイズごとに一度だけ確保)"""
+        if batch_size == 1:
+            return self._buffers
+        buffers = self._batch_buffers.get(batch_size)
+        if buffers is None:
+            buffers = [np.zeros((batch_size, kernel.shape[1]), dtype=np.float32)
+                       for kernel, _, _ in self.layers]
+            self._batch_buffers[batch_size] = buffers
+        return buffers
+
+    def predict(self, x, verbose=0):
+        """
+        順伝播を行い、各クラスの確率を返す。
+
+        Args:
+            x: 形状 (batch, input_dim) の入力。
+            verbose: Kerasとの互換用 (未使用)。
+
+        Returns:
+            np.ndarray: 形状 (batch, output_dim) の確率。内部バッファのビューなので、
+            保持する場合は呼び出し側でコピーすること。
+        """
+        x = np.asarray(x)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        if x.shape[0] == 1:
+            self._input_buffer[...] = x
+            h = self._input_buffer
+        else:
+            h = x.astype(np.float32, copy=False)
+
+        for (kernel, bias, activation), out in zip(self.layers, self._get_buffers(x.shape[0])):
+            np.matmul(h, kernel, out=out)
+            out += bias
+            _apply_activation(out, activation)
+            h = out
+        return h
+
+def _apply_activation(x, activation):
+    """活性化関数をインプレースで適用する"""
+    if activation == 'relu':
+        np.maximum(x, 0, out=x)
+    elif activation == 'softmax':
+        x -= x.max(axis=1, keepdims=True)
+        np.exp(x, out=x)
+        x /= x.sum(axis=1, keepdims=True)
+    elif activation == 'sigmoid':
+        np.negative(x, out=x)
+        np.exp(x, out=x)
+        x += 1
+        np.reciprocal(x, out=x)
+    elif activation == 'tanh':
+        np.tanh(x, out=x)
+    elif activation != 'linear':
+        raise ValueError(f"Unsupported activation: {activation}")
+
+def load_dense_layers(model_path):
+    """
+    h5ファイルからDense層の (kernel, bias, activation) のリストを読み込む。
+    Dropoutなど推論時に恒等写像となる層は読み飛ばす。
+    """
+    with h5py.File(model_path, 'r') as f:
+        config = f.attrs['model_config']
+        if isinstance(config, bytes):
+            config = config.decode('utf-8')
+        layer_configs = json.loads(config)['config']['layers']
+
+        weights_group = f['model_weights'] if 'model_weights' in f else f
+        layers = []
+        for layer_config in layer_configs:
+            class_name = layer_config['class_name']
+            if class_name in ('InputLayer', 'Dropout'):
+                continue
+            if class_name != 'Dense':
+                raise ValueError(f"Unsupported layer for numpy engine: {class_name}")
+
+            name = layer_config['config']['name']
+            group = weights_group[name]
+            weight_names = [n.decode('utf-8') if isinstance(n, bytes) else n
+                            for n in group.attrs['weight_names']]
+            weights = {n.split('/')[-1].split(':')[0]: np.asarray(group[n], dtype=np.float32)
+                       for n in weight_names}
+            kernel = np.ascontiguousarray(weights['kernel'])
+            bias = weights.get('bias', np.zeros(kernel.shape[1], dtype=np.float32))
+            layers.append((kernel, bias, layer_config['config'].get('activation', 'linear')))
+
+    if not layers:
+        raise ValueError(f"No Dense layers found in {model_path}")
+    return layers
+
+if __name__ == "__main__":
+    # Kerasの推論結果と一致するか確認する
+    import pandas as pd
+    from tensorflow.keras.models import load_model
+
+    df = pd.read_csv("hand_landmarks.csv")
+    X = df.drop('label', axis=1).values.astype(np.float32)
+
+    engine = NumpyInferenceEngine('model.h5')
+    keras_model = load_model('model.h5')
+
+    expected = keras_model.predict(X, verbose=0)
+    actual = engine.predict(X)
+    print(f"Max abs diff (batch): {np.abs(expected - actual).max():.2e}")
+    print(f"Argmax agreement: {(expected.argmax(axis=1) == actual.argmax(axis=1)).mean() * 100:.2f}%")
+
+    single_diff = max(np.abs(keras_model.predict(X[i:i + 1], verbose=0) - engine.predict(X[i:i + 1])).max()
+                      for i in range(0, len(X), 100))
+    print(f"Max abs diff (single row): {single_diff:.2e}")
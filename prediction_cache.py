@@ -0,0 +1,69 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from landmark_features import normalize_landmarks
+
+class PredictionCache:
+    """
+    正規化・量子化したランドマークをキーに (ラベル, 信頼度) を保持する有界のLRUキャッシュ。
+    同じ手の形は位置や大きさが違っても同じキーになるため、繰り返し出てくる形では順伝播を省略できる。
+    """
+    def __init__(self, maxsize=1024, grid=0.05):
+        """
+        Args:
+            maxsize (int): 保持する最大件数。超えた場合は最も古く使われたものから捨てる。
+            grid (float): 量子化の刻み (正規化後の座標単位)。大きいほどヒットしやすいが粗くなる。
+        """
+        self.maxsize = maxsize
+        self.grid = grid
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def keys(self, landmarks):
+        """形状 (n, 63) のランドマークからキー (bytes) のリストを作る"""
+        quantized = np.rint(normalize_landmarks(landmarks) / self.grid).astype(np.int16)
+        return [row.tobytes() for row in quantized]
+
+    def get(self, key):
+        """キーに対応する値を返す。無ければ None"""
+        entries = self._entries
+        value = entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """
+        モデルを差し替えたときなど、保持している結果をすべて捨てる。
+        認識中の別スレッドから呼ばれても壊れないよう、辞書ごと置き換える。
+        """
+        self._entries = OrderedDict()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def summary_text(self):
+        stats = self.stats()
+        return (f"cache: {stats['hit_rate'] * 100:.0f}% hit ({stats['hits']}/{stats['hits'] + stats['misses']}), "
+                f"{stats['size']} entries, {stats['evictions']} evicted")
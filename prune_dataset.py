@@ -0,0 +1,143 @@
+import argparse
+import json
+
+import numpy as np
+
+from dataset_store import read_sources, save_store
+from landmark_features import normalize_landmarks
+
+# 収集したランドマークから、ほぼ同じ形のサンプルを間引くツール。
+# 収集スクリプトは手が映っている間のフレームをすべて記録するため、連続する行はほとんど同じになる。
+# ラベルごとに正規化したランドマークを格子に区切り、各セルから重心に最も近い1件だけを残す。
+
+DEFAULT_GRID = 0.1
+PRUNED_STORE_DIR = "hand_landmarks_pruned"
+
+def _cell_representatives(features, cells):
+    """
+    各セルに属するサンプルのうち、セルの重心に最も近いもののインデックスを返す。
+
+    Args:
+        features (np.ndarray): 形状 (n, 63) の正規化済みランドマーク。
+        cells (np.ndarray): 長さ n のセル番号 (0 から セル数-1)。
+    """
+    n_cells = int(cells.max()) + 1
+    sums = np.zeros((n_cells, features.shape[1]), dtype=np.float64)
+    np.add.at(sums, cells, features)
+    centroids = sums / np.bincount(cells, minlength=n_cells)[:, np.newaxis]
+    distances = ((features - centroids[cells]) ** 2).sum(axis=1)
+
+    # セル番号、距離の順に並べ、各セルの先頭を取る
+    order = np.lexsort((distances, cells))
+    sorted_cells = cells[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_cells[1:] != sorted_cells[:-1]
+    return order[first]
+
+def prune_near_duplicates(X, y, grid=DEFAULT_GRID, max_per_label=None, growth=1.25):
+    """
+    ラベルごとに近いサンプルをまとめ、代表のサンプルだけを残す。
+
+    Args:
+        X (np.ndarray): 形状 (N, 63) のランドマーク。
+        y (np.ndarray): 長さ N のラベル。
+        grid (float): 格子の間隔 (正規化後の座標単位)。
+        max_per_label (int): ラベルごとに残す最大の件数。超える場合は格子を growth 倍ずつ粗くする。
+        growth (float): 格子を粗くするときの倍率。
+
+    Returns:
+        tuple: (残す行のインデックス (昇順), ラベルごとの {before, after, grid} の辞書)
+    """
+    features = normalize_landmarks(X)
+    keep, stats = [], {}
+    for label in np.unique(y):
+        rows = np.flatnonzero(y == label)
+        label_grid = grid
+        while True:
+            quantized = np.floor(features[rows] / label_grid).astype(np.int32)
+            _, cells = np.unique(quantized, axis=0, return_inverse=True)
+            cells = cells.ravel()
+            n_cells = int(cells.max()) + 1
+            if max_per_label is None or n_cells <= max_per_label:
+                break
+            label_grid *= growth
+        keep.append(rows[_cell_representatives(features[rows], cells)])
+        stats[str(label)] = {"before": int(len(rows)), "after": n_cells, "grid": label_grid}
+    return np.sort(np.concatenate(keep)), stats
+
+def compare_training(X, y, grid=DEFAULT_GRID, max_per_label=None, epochs=10, test_size=0.2, seed=42):
+    """
+    同じテストデータに対して、間引く前と後の訓練データで学習した結果を比べる。
+    テストデータは間引く前に分けておき、間引きは訓練データにだけ適用する。
+
+    Returns:
+        dict: full / pruned それぞれの行数、学習時間、正解率、ラベルごとの正解率。
+    """
+    from sklearn.model_selection import train_test_split
+
+    from gesture_model import train_and_evaluate
+
+    classes, codes = np.unique(y, return_inverse=True)
+    train_indices, test_indices = train_test_split(np.arange(len(X)), test_size=test_size,
+                                                   random_state=seed, stratify=codes)
+    pruned_indices = train_indices[prune_near_duplicates(X[train_indices], y[train_indices],
+                                                         grid, max_per_label)[0]]
+
+    report = {}
+    for name, indices in (("full", train_indices), ("pruned", pruned_indices)):
+        _, result = train_and_evaluate(X[indices], codes[indices], X[test_indices], codes[test_indices],
+                                       len(classes), epochs=epochs, seed=seed)
+        correct = result["predicted"] == codes[test_indices]
+        report[name] = {
+            "train_rows": int(len(indices)),
+            "train_seconds": result["train_seconds"],
+            "accuracy": result["accuracy"],
+            "per_label_accuracy": {str(label): float(correct[codes[test_indices] == i].mean())
+                                   for i, label in enumerate(classes)},
+        }
+    report["time_saved_percent"] = (1 - report["pruned"]["train_seconds"] / report["full"]["train_seconds"]) * 100
+    report["accuracy_change_points"] = (report["pruned"]["accuracy"] - report["full"]["accuracy"]) * 100
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune near-duplicate samples from landmark datasets.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("prune", "間引いたデータをストアに保存する"),
+                            ("report", "間引く前と後で学習し、学習時間と正解率を比べる")):
+        subparser = subparsers.add_parser(name, help=help_text)
+        subparser.add_argument("sources", nargs="+", help="ランドマークのCSV、シャードのディレクトリ、またはストア")
+        subparser.add_argument("--grid", type=float, default=DEFAULT_GRID, help="格子の間隔 (正規化後の座標単位)")
+        subparser.add_argument("--max-per-label", type=int, default=None, help="ラベルごとに残す最大の件数")
+    subparsers.choices["prune"].add_argument("--output", default=PRUNED_STORE_DIR)
+    subparsers.choices["report"].add_argument("--epochs", type=int, default=10)
+    subparsers.choices["report"].add_argument("--json", default=None, help="結果を書き出すJSONファイル")
+    args = parser.parse_args()
+
+    X, y, _ = read_sources(args.sources)
+    if args.command == "prune":
+        keep, stats = prune_near_duplicates(X, y, args.grid, args.max_per_label)
+        for label, stat in stats.items():
+            print(f"{label:<5} {stat['before']:6d} -> {stat['after']:6d}  (grid {stat['grid']:.3f})")
+        save_store(X[keep], y[keep], args.output, sources=args.sources, pruning=stats)
+        print(f"Kept {len(keep)} of {len(X)} rows ({len(keep) / len(X) * 100:.1f}%), saved to {args.output}")
+        print(f"Train on it with: python data_Preprocessing.py {args.output}")
+        return
+
+    report = compare_training(X, y, args.grid, args.max_per_label, args.epochs)
+    for name in ("full", "pruned"):
+        result = report[name]
+        print(f"{name:<7} rows {result['train_rows']:6d}  train {result['train_seconds']:7.2f} s  "
+              f"accuracy {result['accuracy'] * 100:6.2f}%")
+    print(f"Training time saved: {report['time_saved_percent']:.1f}%  "
+          f"accuracy change: {report['accuracy_change_points']:+.2f} points")
+    worst = sorted(report["pruned"]["per_label_accuracy"].items(),
+                   key=lambda item: item[1] - report["full"]["per_label_accuracy"][item[0]])[:5]
+    for label, accuracy in worst:
+        print(f"  {label:<5} {report['full']['per_label_accuracy'][label] * 100:6.2f}% -> {accuracy * 100:6.2f}%")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
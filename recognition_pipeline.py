@@ -0,0 +1,100 @@
+import threading
+import time
+
+from frame_pipeline import LatestFrameQueue
+
+class _PreviewTap:
+    """取得元の read() をそのまま返しつつ、読んだフレームを最新のものだけ残るキューにも置く"""
+    def __init__(self, source, frames):
+        self.source = source
+        self.frames = frames
+
+    def read(self):
+        ret, frame = self.source.read()
+        if ret:
+            self.frames.put(frame)
+        return ret, frame
+
+class RecognitionPipeline:
+    """
+    カメラ取得 → 手の検出 → 分類 をそれぞれ別スレッドで実行するパイプライン。
+    GestureRecognizer.pipeline() の各段を古いフレームを捨てるキュー (LatestFrameQueue) でつなぐため、
+    遅い段があっても古いフレームは捨てられる。
+    Tkのメインスレッドは、取得段が読んだ最新のフレームを get_latest_frame() で毎回受け取って表示し、
+    認識結果は get_latest() で届いたときだけ受け取る。表示は認識の速さに左右されない。
+    """
+    def __init__(self, cap, recognizer, queue_size=1):
+        """
+        Args:
+            cap: cv2.VideoCapture 互換のフレーム取得元。
+            recognizer (GestureRecognizer): 認識に使うインスタンス。
+            queue_size (int): 各段の間のキューの長さ。
+        """
+        self.cap = cap
+        self.recognizer = recognizer
+        self.queue_size = queue_size
+
+        self.preview_queue = LatestFrameQueue(1) # 取得段が読んだ最新のフレーム (反転前)
+        self.result_queue = LatestFrameQueue(1)
+
+        self._frames = None # 実行中の FramePipeline
+        self._thread = None
+        self._recognized_count = 0
+        self._fps_start_time = time.monotonic()
+
+    def start(self):
+        """ワーカースレッドを起動する"""
+        self._recognized_count = 0
+        self._fps_start_time = time.monotonic()
+        source = _PreviewTap(self.cap, self.preview_queue)
+        self._frames = self.recognizer.pipeline(source, queue_size=self.queue_size, retry=True)
+        self._thread = threading.Thread(target=self._classify_worker, name="classify", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """
+        ワーカースレッドを停止し、終了するまで待つ。
+        次のラウンドのパイプラインが同じ recognizer.hands を使うため、スレッドが残ったまま戻ってはいけない。
+        timeout 秒ごとに、まだ終了していない旨を表示して待ち続ける。
+        """
+        if self._frames is not None:
+            self._frames.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            while self._thread.is_alive():
+                print(f"Waiting for the {self._thread.name} thread to stop...")
+                self._thread.join(timeout)
+        self._thread = None
+
+    def get_latest_frame(self):
+        """
+        取得段が読んだ最新のフレームを取り出す。認識の結果を待たないため、表示の更新に使う。
+
+        Returns:
+            np.ndarray or None: 反転前のBGRのフレーム。前回から新しいフレームが無ければ None。
+        """
+        return self.preview_queue.get_latest()
+
+    def get_latest(self):
+        """
+        最新の認識結果を取り出す。
+
+        Returns:
+            tuple or None: (描画用の MediaPipe のランドマーク, 手ごとの HandPrediction のリスト)。
+            新しい結果が無ければ None。
+        """
+        return self.result_queue.get_latest()
+
+    @property
+    def recognition_fps(self):
+        """認識 (分類段) のスループット"""
+        elapsed = time.monotonic() - self._fps_start_time
+        return self._recognized_count / elapsed if elapsed > 0 else 0.0
+
+    def _classify_worker(self):
+        telemetry = self.recognizer.telemetry
+        # 取得と検出の段は FramePipeline が別スレッドで実行し、このスレッドでは分類以降を行う
+        for packet in self._frames:
+            telemetry.end_frame(predictions=[(p.label, p.confidence) for p in packet.predictions])
+            self._recognized_count += 1
+            self.result_queue.put((packet.multi_hand_landmarks, packet.predictions))
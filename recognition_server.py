@@ -0,0 +1,387 @@
+import argparse
+import asyncio
+import json
+import struct
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# 複数のクライアント (キオスク端末やWebのフロントエンド) で1つの認識器を共有するためのサーバー。
+# すべてのクライアントの要求をマイクロバッチにまとめ、バッチごとに1回だけ順伝播を行う。
+#
+# プロトコル: 要求・応答ともに「種別 (1バイト) + 長さ (4バイト, ビッグエンディアン) + 本体」。
+#   L: 本体は形状 (手の数, 63) の float32 のランドマーク (リトルエンディアン)
+#   J: 本体はJPEGの画像。サーバー側で手を検出してから判別する
+#   M: 本体は空。サーバーの計測値を返す
+# 応答の種別は常に R で、本体はUTF-8のJSON。
+
+REQUEST_LANDMARKS = b'L'
+REQUEST_JPEG = b'J'
+REQUEST_METRICS = b'M'
+RESPONSE = b'R'
+HEADER = struct.Struct("!cI")
+LANDMARK_DTYPE = np.dtype('<f4')
+
+async def read_message(reader):
+    """1つのメッセージを読み、(種別, 本体) を返す。接続が閉じられた場合は None"""
+    try:
+        header = await reader.readexactly(HEADER.size)
+        kind, length = HEADER.unpack(header)
+        body = await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        return None
+    return kind, body
+
+def write_message(writer, kind, body):
+    writer.write(HEADER.pack(kind, len(body)) + body)
+
+class MicroBatcher:
+    """
+    要求を集め、max_batch_size 行に達するか最初の要求から max_wait 秒経ったところで
+    まとめて1回の predict_batch を実行する。1回の predict_batch に渡す行数は max_batch_size を超えない
+    (入りきらない要求は次のバッチに回し、max_batch_size より多い行の要求は分割する)。
+    """
+    def __init__(self, predict_batch, max_batch_size=32, max_wait=0.005, history=1000):
+        """
+        Args:
+            predict_batch (callable): 形状 (n, 63) の配列を受け取り (ラベルのリスト, 信頼度の配列) を返す関数。
+            max_batch_size (int): 1回の順伝播にまとめる最大の行数。
+            max_wait (float): 最初の要求からバッチを締め切るまでの最大の待ち時間 [秒]。
+            history (int): 計測値の統計に使う直近の件数。
+        """
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = asyncio.Queue()
+        self._carry = None # 前のバッチに入りきらず、次のバッチの先頭にする要求
+        # 順伝播はイベントループを止めないよう専用のスレッドで1つずつ実行する
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="predict")
+
+        self.requests = 0
+        self.batches = 0
+        self._batch_sizes = deque(maxlen=history)
+        self._queue_depths = deque(maxlen=history)
+        self._latencies = deque(maxlen=history)
+
+    async def predict(self, landmarks):
+        """
+        形状 (手の数, 63) のランドマークを次のバッチに加え、結果を待つ。
+
+        Returns:
+            tuple: (ラベルのリスト, 信頼度のリスト)
+        """
+        if len(landmarks) > self.max_batch_size:
+            size = self.max_batch_size
+            parts = await asyncio.gather(*(self.predict(landmarks[i:i + size])
+                                           for i in range(0, len(landmarks), size)))
+            return [label for labels, _ in parts for label in labels], [c for _, cs in parts for c in cs]
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((landmarks, future, time.perf_counter()))
+        return await future
+
+    async def run(self):
+        """バッチを組んで実行し続ける"""
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._carry is not None:
+                items, self._carry = [self._carry], None
+            else:
+                items = [await self._queue.get()]
+            rows = len(items[0][0])
+            deadline = loop.time() + self.max_wait
+            while rows < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if rows + len(item[0]) > self.max_batch_size:
+                    self._carry = item
+                    break
+                items.append(item)
+                rows += len(item[0])
+            self._queue_depths.append(self._queue.qsize())
+
+            batch = np.concatenate([landmarks for landmarks, _, _ in items])
+            try:
+                labels, confidences = await loop.run_in_executor(self._executor, self.predict_batch, batch)
+            except Exception as e:
+                for _, future, _ in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            offset = 0
+            for landmarks, future, enqueue_time in items:
+                n = len(landmarks)
+                if not future.done():
+                    future.set_result((labels[offset:offset + n], [float(c) for c in confidences[offset:offset + n]]))
+                offset += n
+                self._latencies.append(now - enqueue_time)
+            self.requests += len(items)
+            self.batches += 1
+            self._batch_sizes.append(len(batch))
+
+    def metrics(self):
+        """キューの深さ、バッチサイズ、要求のレイテンシ [ミリ秒] の統計"""
+        latencies_ms = np.array(self._latencies) * 1000
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "queue_depth": self._queue.qsize(),
+            "queue_depth_mean": float(np.mean(self._queue_depths)) if self._queue_depths else 0.0,
+            "batch_size_mean": float(np.mean(self._batch_sizes)) if self._batch_sizes else 0.0,
+            "batch_size_max": int(max(self._batch_sizes)) if self._batch_sizes else 0,
+            "latency_p50_ms": float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else 0.0,
+            "latency_p95_ms": float(np.percentile(latencies_ms, 95)) if len(latencies_ms) else 0.0,
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+class RecognitionServer:
+    """GestureRecognizer を共有し、クライアントからの要求を MicroBatcher で処理するサーバー"""
+    def __init__(self, recognizer, max_batch_size=32, max_wait=0.005, hands=None):
+        """
+        Args:
+            recognizer (GestureRecognizer): 判別に使う認識器 (predict_landmarks だけを使う)。
+            max_batch_size (int): 1回の順伝播にまとめる最大の行数。
+            max_wait (float): バッチを締め切るまでの最大の待ち時間 [秒]。
+            hands: JPEGの検出に使う MediaPipe Hands。None なら最初のJPEGで静止画モードのものを作る。
+        """
+        self.recognizer = recognizer
+        self.batcher = MicroBatcher(recognizer.predict_landmarks, max_batch_size, max_wait)
+        # JPEGはクライアントごとに別の映像なので、認識器の Hands (トラッキングモード) や motion_gate、
+        # 前回の検出結果は共有せず、フレームを独立に扱う静止画モードの Hands で検出する
+        self.hands = hands
+        # MediaPipe Hands はスレッドセーフではないため、JPEGの検出も1スレッドで順に行う
+        self._detect_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="detect")
+        self.clients = 0
+
+    def _create_hands(self):
+        import mediapipe as mp
+        return mp.solutions.hands.Hands(static_image_mode=True, max_num_hands=self.recognizer.max_num_hands,
+                                        min_detection_confidence=0.5)
+
+    def _detect_jpeg(self, body):
+        import cv2
+
+        from frame_pipeline import detect_hands, extract_landmarks, flip_frame
+
+        frame = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("Could not decode JPEG")
+        if self.hands is None:
+            self.hands = self._create_hands()
+        # ゲーム画面と同じく反転したフレームで検出する (左右判定をそろえるため)
+        multi_hand_landmarks, multi_handedness = detect_hands(self.hands, flip_frame(frame))
+        out = np.empty((len(multi_hand_landmarks), 63), dtype=np.float32)
+        landmarks, handedness = extract_landmarks(multi_hand_landmarks, multi_handedness, out)
+        return landmarks, handedness or []
+
+    async def _respond(self, kind, body):
+        if kind == REQUEST_METRICS:
+            return dict(self.batcher.metrics(), clients=self.clients)
+
+        handedness = None
+        if kind == REQUEST_LANDMARKS:
+            landmarks = np.frombuffer(body, dtype=LANDMARK_DTYPE).reshape(-1, 63).astype(np.float32)
+        elif kind == REQUEST_JPEG:
+            loop = asyncio.get_running_loop()
+            landmarks, handedness = await loop.run_in_executor(self._detect_executor, self._detect_jpeg, body)
+        else:
+            raise ValueError(f"Unknown request type: {kind!r}")
+
+        if len(landmarks) == 0:
+            return {"predictions": []}
+        labels, confidences = await self.batcher.predict(landmarks)
+        predictions = [{"label": label, "confidence": confidence} for label, confidence in zip(labels, confidences)]
+        if handedness:
+            for prediction, hand in zip(predictions, handedness):
+                prediction["handedness"] = hand
+        return {"predictions": predictions}
+
+    async def handle_client(self, reader, writer):
+        """
+        1つの接続を処理する。要求は読んだ順にバッチへ投入し、
+        応答は要求の順番どおりに返す (クライアントは応答を待たずに次の要求を送ってよい)。
+        """
+        self.clients += 1
+        pending = asyncio.Queue()
+
+        async def send_responses():
+            while True:
+                task = await pending.get()
+                if task is None:
+                    break
+                try:
+                    response = await task
+                except Exception as e:
+                    response = {"error": str(e)}
+                write_message(writer, RESPONSE, json.dumps(response).encode("utf-8"))
+                await writer.drain()
+
+        sender = asyncio.create_task(send_responses())
+        try:
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    break
+                await pending.put(asyncio.create_task(self._respond(*message)))
+        finally:
+            await pending.put(None)
+            try:
+                await sender
+            except ConnectionError:
+                pass
+            self.clients -= 1
+            writer.close()
+
+    async def report_metrics(self, interval):
+        """interval 秒ごとに計測値を表示する"""
+        while True:
+            await asyncio.sleep(interval)
+            metrics = self.batcher.metrics()
+            print(f"clients {self.clients}  requests {metrics['requests']}  batches {metrics['batches']}  "
+                  f"queue {metrics['queue_depth']} (mean {metrics['queue_depth_mean']:.1f})  "
+                  f"batch mean {metrics['batch_size_mean']:.1f} max {metrics['batch_size_max']}  "
+                  f"latency p50 {metrics['latency_p50_ms']:.2f} ms p95 {metrics['latency_p95_ms']:.2f} ms")
+
+    async def serve(self, host="127.0.0.1", port=8765, report_interval=5.0):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        batcher_task = asyncio.create_task(self.batcher.run())
+        reporter = asyncio.create_task(self.report_metrics(report_interval)) if report_interval else None
+        print(f"Recognition server listening on {host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher_task.cancel()
+            if reporter is not None:
+                reporter.cancel()
+            self.batcher.close()
+            self._detect_executor.shutdown(wait=True)
+            if self.hands is not None:
+                self.hands.close()
+
+class RecognitionClient:
+    """RecognitionServer の asyncio クライアント"""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8765):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _request(self, kind, body=b""):
+        write_message(self.writer, kind, body)
+        await self.writer.drain()
+        message = await read_message(self.reader)
+        if message is None:
+            raise ConnectionError("Server closed the connection")
+        response = json.loads(message[1].decode("utf-8"))
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    async def classify_landmarks(self, landmarks):
+        """形状 (手の数, 63) または (63,) のランドマークを判別し、手ごとの予測のリストを返す"""
+        body = np.asarray(landmarks, dtype=LANDMARK_DTYPE).reshape(-1, 63).tobytes()
+        return (await self._request(REQUEST_LANDMARKS, body))["predictions"]
+
+    async def classify_jpeg(self, jpeg_bytes):
+        """JPEG画像の手を検出して判別する"""
+        return (await self._request(REQUEST_JPEG, jpeg_bytes))["predictions"]
+
+    async def metrics(self):
+        return await self._request(REQUEST_METRICS)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+async def run_loopback(host, port, landmarks_csv, num_clients, requests_per_client):
+    """
+    hand_landmarks.csv の行を num_clients 個の同時接続から送り、
+    正解率と往復のレイテンシ、サーバーの計測値を表示する。
+    """
+    from benchmark import load_landmarks
+
+    X, y = load_landmarks(landmarks_csv)
+    rng = np.random.default_rng(0)
+
+    async def client_loop(client_index):
+        client = await RecognitionClient.connect(host, port)
+        indices = rng.integers(0, len(X), requests_per_client)
+        latencies, correct = [], 0
+        try:
+            for i in indices:
+                start_time = time.perf_counter()
+                predictions = await client.classify_landmarks(X[i])
+                latencies.append(time.perf_counter() - start_time)
+                correct += predictions[0]["label"] == str(y[i])
+        finally:
+            await client.close()
+        return latencies, correct
+
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*(client_loop(i) for i in range(num_clients)))
+    elapsed = time.perf_counter() - start_time
+
+    latencies_ms = np.concatenate([latencies for latencies, _ in results]) * 1000
+    correct = sum(c for _, c in results)
+    print(f"Requests: {len(latencies_ms)} from {num_clients} clients  throughput: {len(latencies_ms) / elapsed:.1f} req/s")
+    print(f"Accuracy: {correct / len(latencies_ms) * 100:.2f}%")
+    print(f"Round trip: p50 {np.percentile(latencies_ms, 50):.2f} ms  p95 {np.percentile(latencies_ms, 95):.2f} ms")
+
+    client = await RecognitionClient.connect(host, port)
+    print("Server metrics:", json.dumps(await client.metrics(), indent=2))
+    await client.close()
+
+def main():
+    from discrimination_app import ENGINES
+
+    parser = argparse.ArgumentParser(description="Headless gesture recognition server with micro-batching.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="認識サーバーを起動する")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--model", default="model.h5")
+    serve_parser.add_argument("--engine", default="numpy", choices=ENGINES)
+    serve_parser.add_argument("--max-batch-size", type=int, default=32)
+    serve_parser.add_argument("--max-wait-ms", type=float, default=5.0, help="バッチを締め切るまでの最大の待ち時間")
+    serve_parser.add_argument("--report-interval", type=float, default=5.0, help="計測値を表示する間隔 (秒、0で無効)")
+
+    client_parser = subparsers.add_parser("loopback", help="CSVのランドマークを送ってサーバーを試す")
+    client_parser.add_argument("--host", default="127.0.0.1")
+    client_parser.add_argument("--port", type=int, default=8765)
+    client_parser.add_argument("--landmarks", default="hand_landmarks.csv")
+    client_parser.add_argument("--clients", type=int, default=8)
+    client_parser.add_argument("--requests", type=int, default=200, help="クライアントごとの要求数")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        from discrimination_app import GestureRecognizer
+
+        recognizer = GestureRecognizer(model_path=args.model, engine=args.engine)
+        recognizer.warm_up()
+        server = RecognitionServer(recognizer, args.max_batch_size, args.max_wait_ms / 1000)
+        try:
+            asyncio.run(server.serve(args.host, args.port, args.report_interval))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            recognizer.release()
+    else:
+        asyncio.run(run_loopback(args.host, args.port, args.landmarks, args.clients, args.requests))
+
+if __name__ == "__main__":
+    main()
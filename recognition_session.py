@@ -0,0 +1,174 @@
+import os
+import threading
+import time
+
+from frame_sources import open_frame_source
+from recognition_pipeline import RecognitionPipeline
+
+class RecognitionSession:
+    """
+    アプリケーション全体で共有する認識セッション。
+    GestureRecognizer とカメラを一度だけ生成し、ゲームの各ラウンドで使い回す。
+    ラウンド間はカメラを解放せず suspend / resume で切り替える。suspend ではフレームを読む取得段
+    (パイプラインモードのワーカースレッド) を止め、resume で作り直す。
+    TensorFlow / MediaPipe の読み込みは start_loading() でバックグラウンドに逃がす。
+    """
+    def __init__(self, model_path='model.h5', engine='numpy', source=0, telemetry=None,
+                 detection_width=640, motion_gate=None, prediction_cache='auto', cascade=False, temporal=None):
+        """
+        Args:
+            model_path (str): 使用する学習済みモデルのパス。
+            engine (str): GestureRecognizer に渡す推論エンジン。
+            source: open_frame_source に渡すフレーム取得元の指定 (カメラ番号、"replay:PATH"、"synthetic" など)。
+            telemetry (LatencyTelemetry): 段ごとの所要時間を記録する場合に指定する。
+            detection_width (int): 手の検出に使う縮小フレームの幅。
+            motion_gate (MotionGate): 手が動いていないときに検出・分類を省略する場合に指定する。
+            prediction_cache: GestureRecognizer に渡す予測キャッシュ (PredictionCache、None、または 'auto')。
+            cascade (bool): プロトタイプを第1段とするカスケードで分類するかどうか。
+            temporal (TemporalSmoother): 直近のフレームの窓で予測を安定させる場合に指定する。
+        """
+        self.model_path = model_path
+        self.engine = engine
+        self.source = source
+        self.telemetry = telemetry
+        self.detection_width = detection_width
+        self.motion_gate = motion_gate
+        self.prediction_cache = prediction_cache
+        self.cascade = cascade
+        self.temporal = temporal
+        self.recognizer = None # 読み込み完了までは None
+        self.cap = None
+        self.pipeline = None # ラウンド中のみ動かす RecognitionPipeline (パイプラインモードのとき)
+        self.active = False # ラウンド中かどうか
+
+        # --- バックグラウンド読み込みの状態 ---
+        self.ready_event = threading.Event()
+        self.load_error = None
+        self.load_seconds = None
+        self._loader = None
+        self._model_mtime = None # 読み込んだモデルファイルの更新時刻
+        self._reloader = None
+
+    def start_loading(self):
+        """重いインポートとモデルの構築をバックグラウンドスレッドで開始する"""
+        if self._loader is None:
+            self._loader = threading.Thread(target=self._load, name="recognizer-loader", daemon=True)
+            self._loader.start()
+
+    def _load(self):
+        start_time = time.perf_counter()
+        self._model_mtime = self._current_model_mtime()
+        try:
+            # mediapipe / tensorflow はここで初めてインポートされる
+            from discrimination_app import GestureRecognizer
+            recognizer = GestureRecognizer(model_path=self.model_path, engine=self.engine,
+                                           telemetry=self.telemetry,
+                                           detection_width=self.detection_width,
+                                           motion_gate=self.motion_gate,
+                                           prediction_cache=self.prediction_cache,
+                                           cascade=self.cascade,
+                                           temporal=self.temporal)
+            recognizer.warm_up()
+            self.recognizer = recognizer
+        except Exception as e:
+            print(f"Error loading recognizer: {e}")
+            self.load_error = e
+        finally:
+            self.load_seconds = time.perf_counter() - start_time
+            self.ready_event.set()
+
+    def _current_model_mtime(self):
+        try:
+            return os.path.getmtime(self.model_path)
+        except OSError:
+            return None
+
+    def check_model_update(self):
+        """
+        モデルファイルが更新されていれば、バックグラウンドで読み込んで認識器に差し替える。
+        incremental_training.py で追加学習したモデルを、ゲームを止めずに反映するために定期的に呼ぶ。
+
+        Returns:
+            bool: 差し替えを開始したかどうか。
+        """
+        if not self.is_ready() or (self._reloader is not None and self._reloader.is_alive()):
+            return False
+        mtime = self._current_model_mtime()
+        if mtime is None or mtime == self._model_mtime:
+            return False
+        self._model_mtime = mtime
+        self._reloader = threading.Thread(target=self._reload_model, name="model-reloader", daemon=True)
+        self._reloader.start()
+        return True
+
+    def _reload_model(self):
+        try:
+            self.recognizer.reload_model(self.model_path)
+            print(f"Reloaded model from {self.model_path}")
+        except Exception as e:
+            # 読み込みに失敗した場合は古いモデルのまま続ける
+            print(f"Error reloading model: {e}")
+
+    def is_ready(self):
+        """認識器の読み込みとウォームアップが完了しているかどうか"""
+        return self.ready_event.is_set() and self.recognizer is not None
+
+    def wait_until_ready(self, timeout=None):
+        """
+        読み込みの完了を待つ。未開始であればここで開始する。
+
+        Returns:
+            bool: 認識器が利用可能になったかどうか。
+        """
+        self.start_loading()
+        self.ready_event.wait(timeout)
+        return self.is_ready()
+
+    def resume(self, num_hands=1, pipelined=False):
+        """
+        ラウンドを開始する。フレーム取得元が未オープンの場合のみオープンする。
+        認識する手の最大数はラウンドの人数に合わせて切り替える。
+        録画ファイルの再生はループさせ、ラウンドの途中で映像が途切れないようにする。
+
+        Args:
+            num_hands (int): 同時に認識する手の最大数。
+            pipelined (bool): True なら取得・検出・分類を別スレッドで行う RecognitionPipeline を起動し、
+                self.pipeline に置く。False ならゲームループが直接 cap から読む。
+
+        Returns:
+            cv2.VideoCapture 互換のソース。オープンに失敗した場合は None。
+        """
+        self.recognizer.set_max_num_hands(num_hands)
+        if self.cap is None or not self.cap.isOpened():
+            self.cap = open_frame_source(self.source, loop=True)
+            if not self.cap.isOpened():
+                print("Error: Could not open camera.")
+                self.cap = None
+                return None
+        if pipelined:
+            self.pipeline = RecognitionPipeline(self.cap, self.recognizer)
+            self.pipeline.start()
+        self.active = True
+        return self.cap
+
+    def suspend(self):
+        """
+        ラウンドを終了する。取得段のスレッドを止めて (終了まで待つ)、次の resume までフレームを読まない。
+        カメラのデバイスとモデルは開き直しに時間がかかるため保持したままにする。
+        """
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.pipeline = None
+        self.active = False
+
+    def close(self):
+        """アプリケーション終了時にすべてのリソースを解放する"""
+        self.suspend()
+        if self.cap is not None and self.cap.isOpened():
+            self.cap.release()
+        self.cap = None
+        if self.recognizer is not None:
+            self.recognizer.release()
+            self.recognizer = None
+        if self.telemetry is not None:
+            self.telemetry.close()
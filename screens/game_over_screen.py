@@ -5,6 +5,7 @@ class GameOverScreen(tk.Frame):
     def __init__(self, parent, controller):
         tk.Frame.__init__(self, parent)
         self.controller = controller
+        self.num_players = 1
 
         label = ttk.Label(self, text="Game Over!", font=("Helvetica", 24))
         label.pack(pady=20, padx=20)
@@ -13,7 +14,7 @@ class GameOverScreen(tk.Frame):
         self.score_label.pack(pady=10)
 
         restart_button = ttk.Button(self, text="Play Again",
-                                    command=lambda: controller.show_frame("GamePlayScreen"))
+                                    command=lambda: controller.show_frame("GamePlayScreen", num_players=self.num_players))
         restart_button.pack(pady=10)
 
         main_menu_button = ttk.Button(self, text="Main Menu",
@@ -21,4 +22,10 @@ class GameOverScreen(tk.Frame):
         main_menu_button.pack(pady=10)
 
     def set_score(self, score):
-        self.score_label.config(text=f"Final Score: {score}")
+        if isinstance(score, list):
+            # 2人プレイ
+            self.num_players = len(score)
+            self.score_label.config(text="Final Score: " + "  ".join(f"P{i + 1}: {s}" for i, s in enumerate(score)))
+        else:
+            self.num_players = 1
+            self.score_label.config(text=f"Final Score: {score}")
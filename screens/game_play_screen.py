@@ -5,12 +5,18 @@ from PIL import Image, ImageTk
 import time
 import random # randomモジュールをインポート
 
-# discrimination.pyからジェスチャー認識クラスをインポート
-from discrimination_app import GestureRecognizer
+from frame_buffers import FrameBufferPool
+from frame_scheduler import AdaptiveFrameScheduler
 
 # ★★★★★ array.txtのファイルパスを定義 ★★★★★
 POSE_LIST_FILE = "array.txt"
 
+# カメラ取得・検出・分類を別スレッドで実行するかどうか
+PIPELINED_MODE = True
+
+# ゲームループの目標FPS
+TARGET_FPS = 30
+
 class GamePlayScreen(tk.Frame):
     """
     Tkinterをベースにしたゲームアプリケーションのメインクラス。
@@ -25,6 +31,12 @@ class GamePlayScreen(tk.Frame):
         # --- アスペクト比維持のための変数 ---
         self.video_container_width = 1
         self.video_container_height = 1
+        self.display_size = None # 表示用フレームのサイズ (コンテナサイズが変わったときだけ再計算する)
+
+        # --- 表示用のバッファ (毎フレームの確保を避ける) ---
+        self.photo = None # 使い回すPhotoImage
+        self._display_buffers = FrameBufferPool(1)
+        self._display_rgb_buffers = FrameBufferPool(1)
 
         # --- スタイルの設定 (ゲージの太さと背景色) ---
         style = ttk.Style(self)
@@ -41,6 +53,8 @@ class GamePlayScreen(tk.Frame):
 
         # --- スコアの初期化 ---
         self.score = 0
+        self.num_players = 1 # 2人プレイでは画面の左右で手をプレイヤーに割り当てる
+        self.scores = [0]
 
         # --- ポーズリストの読み込みと初期お題の設定 ---
         self.pose_list = []
@@ -60,29 +74,41 @@ class GamePlayScreen(tk.Frame):
         self.last_matched_prompt_time = 0 # 最後にマッチした時刻
         self.match_cooldown = 2 # マッチ後のクールダウン秒数
 
-        # --- ジェスチャー認識クラスの初期化 ---
-        self.recognizer = GestureRecognizer(model_path='model.h5')
+        # --- ジェスチャー認識はGameManagerが保持するセッションを共有する ---
+        self.session = controller.session
+        self.recognizer = self.session.recognizer
 
-        # --- カメラの初期化はstart_game_loopで行う ---
+        # --- カメラはstart_game_loopでセッションから受け取る ---
         self.cap = None # 初期化は後で行う
+        self.pipeline = None # パイプラインモード時のワーカー
         self.running = False # ゲームループの実行フラグ
+        self.scheduler = AdaptiveFrameScheduler(target_fps=TARGET_FPS)
+        self.last_predictions = [] # 認識を間引いたフレームで使う直前の結果
+        self.last_hand_landmarks = []
+
+        # --- 表示FPS計測用の変数 ---
+        self.display_frame_count = 0
+        self.display_fps_start_time = time.monotonic()
+        self.last_telemetry_display_time = 0 # 段ごとの計測結果を最後に表示した時刻
+        self.telemetry_text = ""
 
         # --- UIウィジェットの作成と配置 ---
         self._create_widgets()
 
-    def start_game_loop(self, debug=False):
-        """ゲームループを開始し、カメラを初期化する"""
+    def start_game_loop(self, debug=False, num_players=1):
+        """ゲームループを開始し、セッションからカメラを受け取る"""
         self.debug = debug
-        self.cap = cv2.VideoCapture(0)
-        if not self.cap.isOpened():
-            print("Error: Could not open camera.")
+        self.num_players = num_players
+        self.cap = self.session.resume(num_hands=num_players, pipelined=PIPELINED_MODE)
+        if self.cap is None:
             self.controller.show_game_over_screen(self.score)
             return
         
         # タイマーとスコアをリセット
         self.start_time = time.time()
         self.score = 0
-        self.score_label.config(text=f"Score: {self.score}")
+        self.scores = [0] * num_players
+        self._update_score_label()
         self.last_gauge_change_time = time.time()
         if self.debug_label:
             self.debug_label.config(text="")
@@ -105,15 +131,25 @@ class GamePlayScreen(tk.Frame):
         else:
             self.current_prompt_text = random.choice(self.pose_list)
         self.prompt_display_label.config(text=f"Make a {self.current_prompt_text} sign")
+        self.recognizer.set_target(self.current_prompt_text)
+
+        self.display_frame_count = 0
+        self.display_fps_start_time = time.monotonic()
+        self.scheduler.reset()
+        self.last_predictions = []
+        self.last_hand_landmarks = []
+        # パイプラインモードでは、取得段を含むワーカーはセッションが resume / suspend で起動・停止する
+        self.pipeline = self.session.pipeline
 
         self.running = True
         self.update_game()
 
     def stop_game_loop(self):
-        """ゲームループを停止し、リソースを解放する"""
+        """ゲームループを停止し、セッションを一時停止する (カメラは解放しない)"""
         self.running = False
-        if self.cap and self.cap.isOpened():
-            self.cap.release()
+        self.pipeline = None
+        self.session.suspend()
+        self.cap = None
 
     def _create_widgets(self):
         """UIウィジェットを作成し、画面に配置する (gridシステムを使用)"""
@@ -162,6 +198,7 @@ class GamePlayScreen(tk.Frame):
     def on_resize(self, event):
         self.video_container_width = event.width
         self.video_container_height = event.height
+        self.display_size = self._compute_display_size()
 
     def update_numerical_timer(self):
         elapsed_time = int(time.time() - self.start_time)
@@ -199,57 +236,190 @@ class GamePlayScreen(tk.Frame):
 
         self.current_prompt_text = new_prompt
         self.prompt_display_label.config(text=f"Make a {self.current_prompt_text} sign")
+        self.recognizer.set_target(self.current_prompt_text)
 
-    def update_game(self):
-        if not self.running:
-            return
+    def _compute_display_size(self):
+        """コンテナサイズに合わせた16:9の表示サイズを返す"""
+        container_w = self.video_container_width * 0.8
+        container_h = self.video_container_height * 0.8
+
+        target_w = int(container_w)
+        target_h = int(container_w / 16 * 9)
+
+        if target_h > container_h:
+            target_h = int(container_h)
+            target_w = int(container_h / 9 * 16)
+        
+        if target_w > 0 and target_h > 0:
+            return (target_w, target_h)
+        return None
+
+    def _render_for_display(self, frame, multi_hand_landmarks):
+        """
+        検出とは別に、表示サイズへのリサイズとランドマークの描画を行う。
+        ランドマークは正規化座標なので、リサイズ後のフレームにそのまま描画できる。
+        """
+        display_size = self.display_size
+        if display_size is not None and (frame.shape[1], frame.shape[0]) != display_size:
+            with self.recognizer.telemetry.stage("display_resize"):
+                dst = self._display_buffers.get((display_size[1], display_size[0]) + frame.shape[2:])
+                frame = cv2.resize(frame, display_size, dst=dst, interpolation=cv2.INTER_AREA)
+        if self.debug:
+            self.recognizer.draw_landmarks(frame, multi_hand_landmarks)
+        return frame
 
-        ret, frame = self.cap.read()
-        if ret:
-            container_w = self.video_container_width * 0.8
-            container_h = self.video_container_height * 0.8
+    def _update_score_label(self):
+        if self.num_players == 1:
+            self.score_label.config(text=f"Score: {self.score}")
+        else:
+            self.score_label.config(text="  ".join(f"P{i + 1}: {score}" for i, score in enumerate(self.scores)))
 
-            target_w = int(container_w)
-            target_h = int(container_w / 16 * 9)
+    def _player_for(self, prediction):
+        """手のバウンディングボックスの中心から、その手を出しているプレイヤーを決める"""
+        if self.num_players == 1:
+            return 0
+        center_x = (prediction.bbox[0] + prediction.bbox[2]) / 2
+        return min(int(center_x * self.num_players), self.num_players - 1)
 
-            if target_h > container_h:
-                target_h = int(container_h)
-                target_w = int(container_h / 9 * 16)
+    def _check_match(self, label, confidence, player=0):
+        """予測結果がお題と一致していればプレイヤーのスコアを加算し、お題を変更する"""
+        current_time = time.time()
+        if label == self.current_prompt_text and \
+           confidence > self.match_threshold and \
+           (current_time - self.last_matched_prompt_time) > self.match_cooldown:
             
-            if target_w > 0 and target_h > 0:
-                frame = cv2.resize(frame, (target_w, target_h), interpolation=cv2.INTER_AREA)
+            self.scores[player] += 1
+            self.score = self.scores[0] if self.num_players == 1 else sum(self.scores)
+            self._update_score_label()
 
-            processed_frame, label, confidence = self.recognizer.recognize(frame, debug=self.debug)
+            self._change_prompt()
+            self.last_matched_prompt_time = current_time
+            self.last_gauge_change_time = current_time
 
-            if self.debug:
-                self.debug_label.config(text=f"Debug: {label} ({confidence:.2f})")
+    def _show_result(self, pil_image, predictions, fresh=True):
+        """
+        認識結果を画面に反映する。
+
+        Args:
+            pil_image: 表示する画像。None なら表示中の画像をそのままにする。
+            predictions: 手ごとの HandPrediction のリスト。
+            fresh (bool): このフレームで認識した結果かどうか。間引いたフレームでは判定を行わない。
+        """
+        # プレイヤーごとに信頼度が最も高い手を採用する
+        best = [None] * self.num_players
+        for prediction in predictions:
+            player = self._player_for(prediction)
+            if best[player] is None or prediction.confidence > best[player].confidence:
+                best[player] = prediction
 
-            self.photo = self._cv2_to_imagetk(processed_frame)
-            self.video_label.config(image=self.photo)
+        if self.debug:
+            if self.num_players == 1:
+                label, confidence = (best[0].label, best[0].confidence) if best[0] else ("unknown", 0.0)
+                debug_text = f"Debug: {label} ({confidence:.2f})"
+            else:
+                debug_text = "Debug: " + " / ".join(
+                    f"P{i + 1} {p.label} ({p.confidence:.2f})" if p else f"P{i + 1} -"
+                    for i, p in enumerate(best))
+            if self.pipeline:
+                elapsed = time.monotonic() - self.display_fps_start_time
+                display_fps = self.display_frame_count / elapsed if elapsed > 0 else 0.0
+                debug_text += f"  display {display_fps:.1f} fps / recognition {self.pipeline.recognition_fps:.1f} fps"
+            else:
+                debug_text += "  " + self.scheduler.status_text()
+
+            # 段ごとのパーセンタイルは毎フレーム計算せず、0.5秒ごとに更新する
+            current_time = time.monotonic()
+            if current_time - self.last_telemetry_display_time >= 0.5:
+                self.telemetry_text = self.recognizer.telemetry.summary_text()
+                if self.recognizer.motion_gate is not None:
+                    self.telemetry_text = (self.recognizer.motion_gate.summary_text() + "\n" + self.telemetry_text).strip()
+                if self.recognizer.prediction_cache is not None:
+                    self.telemetry_text = (self.recognizer.prediction_cache.summary_text() + "\n" + self.telemetry_text).strip()
+                if self.recognizer.temporal is not None:
+                    self.telemetry_text = (self.recognizer.temporal.summary_text() + "\n" + self.telemetry_text).strip()
+                if hasattr(self.recognizer.model, 'summary_text'):
+                    self.telemetry_text = (self.recognizer.model.summary_text() + "\n" + self.telemetry_text).strip()
+                self.last_telemetry_display_time = current_time
+            if self.telemetry_text:
+                debug_text += "\n" + self.telemetry_text
+            self.debug_label.config(text=debug_text)
+
+        if pil_image is not None:
+            with self.recognizer.telemetry.stage("to_imagetk"):
+                self._update_photo(pil_image)
+            self.display_frame_count += 1
+
+        if not fresh:
+            return
+        for player, prediction in enumerate(best):
+            if prediction is not None:
+                self._check_match(prediction.label, prediction.confidence, player)
 
-            current_time = time.time()
-            if label == self.current_prompt_text and \
-               confidence > self.match_threshold and \
-               (current_time - self.last_matched_prompt_time) > self.match_cooldown:
-                
-                self.score += 1
-                self.score_label.config(text=f"Score: {self.score}")
+    def update_game(self):
+        if not self.running:
+            return
 
-                self._change_prompt()
-                self.last_matched_prompt_time = current_time
-                self.last_gauge_change_time = current_time
+        self.scheduler.begin()
+        recognized = False
+        telemetry = self.recognizer.telemetry
+        if self.pipeline:
+            # ワーカーが用意した最新の結果だけを取り出す。
+            # 認識はワーカーが行い、追いつかないフレームは古いフレームを捨てるキューで落とされるため、
+            # スケジューラはループの周期だけを決める (recognized=False のままにして間引きを使わない)
+            result = self.pipeline.get_latest()
+            fresh = result is not None
+            if fresh:
+                self.last_hand_landmarks, self.last_predictions = result
+
+            # 表示は認識結果を待たず、取得段の最新のフレームで毎回更新する
+            frame = self.pipeline.get_latest_frame()
+            pil_image = None
+            if frame is not None:
+                frame = self._render_for_display(self.recognizer.flip(frame), self.last_hand_landmarks)
+                with telemetry.stage("to_pil"):
+                    pil_image = self._cv2_to_pil(frame)
+            if pil_image is not None or fresh:
+                self._show_result(pil_image, self.last_predictions, fresh=fresh)
+                telemetry.end_frame()
+        else:
+            with telemetry.stage("cap_read"):
+                ret, frame = self.cap.read()
+            if ret:
+                if self.scheduler.should_recognize():
+                    # 全員分の手をまとめて1回で分類する
+                    frame, multi_hand_landmarks, multi_handedness = self.recognizer.detect(frame)
+                    self.last_predictions = self.recognizer.classify_hands(multi_hand_landmarks, multi_handedness)
+                    self.last_hand_landmarks = multi_hand_landmarks
+                    recognized = True
+                else:
+                    # 負荷が高いときは認識を間引き、表示だけを更新する
+                    frame = self.recognizer.flip(frame)
+                processed_frame = self._render_for_display(frame, self.last_hand_landmarks)
+                with telemetry.stage("to_pil"):
+                    pil_image = self._cv2_to_pil(processed_frame)
+                self._show_result(pil_image, self.last_predictions, fresh=recognized)
+                telemetry.end_frame(predictions=[(p.label, p.confidence) for p in self.last_predictions],
+                                    recognized=recognized)
 
         if not self.debug:
             self.update_numerical_timer()
             self.update_gauge_timer()
 
-        self.after(15, self.update_game)
+        # 今回の所要時間を差し引いて、目標FPSに合うように次回を予約する
+        self.after(self.scheduler.end(recognized), self.update_game)
 
-    def _cv2_to_imagetk(self, frame):
-        cv_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        pil_image = Image.fromarray(cv_image)
-        return ImageTk.PhotoImage(image=pil_image)
+    def _cv2_to_pil(self, frame):
+        cv_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._display_rgb_buffers.get(frame.shape))
+        return Image.fromarray(cv_image)
+
+    def _update_photo(self, pil_image):
+        """PhotoImageを使い回して表示を更新する。サイズが変わったときだけ作り直す"""
+        if self.photo is None or (self.photo.width(), self.photo.height()) != pil_image.size:
+            self.photo = ImageTk.PhotoImage(image=pil_image)
+            self.video_label.config(image=self.photo)
+        else:
+            self.photo.paste(pil_image)
 
     def on_closing(self):
         self.stop_game_loop()
-        self.controller.show_game_over_screen(self.score)
\ No newline at end of file
+        self.controller.show_game_over_screen(self.score if self.num_players == 1 else list(self.scores))
\ No newline at end of file
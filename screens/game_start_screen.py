@@ -9,14 +9,38 @@ class GameStartScreen(tk.Frame):
         label = ttk.Label(self, text="Jesture Game - Main Menu", font=("Helvetica", 24))
         label.pack(pady=20, padx=20)
 
-        start_button = ttk.Button(self, text="Start Game",
-                                  command=lambda: controller.show_frame("GamePlayScreen"))
-        start_button.pack(pady=10)
+        # 認識器の読み込みが終わるまではボタンを無効にしておく
+        self.start_button = ttk.Button(self, text="Loading...", state=tk.DISABLED,
+                                       command=lambda: controller.show_frame("GamePlayScreen"))
+        self.start_button.pack(pady=10)
+
+        self.two_player_button = ttk.Button(self, text="2 Players", state=tk.DISABLED,
+                                            command=lambda: controller.show_frame("GamePlayScreen", num_players=2))
+        self.two_player_button.pack(pady=10)
 
         quit_button = ttk.Button(self, text="Quit",
                                  command=controller.destroy)
         quit_button.pack(pady=10)
 
-        debug_button = ttk.Button(self, text="Debug Mode",
-                                  command=lambda: controller.show_frame("GamePlayScreen", debug=True))
-        debug_button.pack(pady=10)
+        self.debug_button = ttk.Button(self, text="Debug Mode", state=tk.DISABLED,
+                                       command=lambda: controller.show_frame("GamePlayScreen", debug=True))
+        self.debug_button.pack(pady=10)
+
+        self.status_label = ttk.Label(self, text="Loading recognizer...", font=("Helvetica", 12))
+        self.status_label.pack(pady=10)
+
+        self.after(100, self.check_ready)
+
+    def check_ready(self):
+        """認識セッションの準備状況を確認し、完了していればボタンを有効にする"""
+        session = self.controller.session
+        if session.is_ready():
+            self.start_button.config(text="Start Game", state=tk.NORMAL)
+            self.debug_button.config(state=tk.NORMAL)
+            self.two_player_button.config(state=tk.NORMAL)
+            self.status_label.config(text=f"Ready ({session.load_seconds:.1f}s)")
+        elif session.ready_event.is_set():
+            self.start_button.config(text="Start Game")
+            self.status_label.config(text=f"Failed to load recognizer: {session.load_error}")
+        else:
+            self.after(100, self.check_ready)
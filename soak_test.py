@@ -0,0 +1,242 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+import numpy as np
+
+from frame_sources import RECORDING_FILE
+from main_app import GameManager
+
+# 長時間の連続運転で、メモリの増加とフレーム時間の悪化を検出するソークテスト。
+# GameManager を実際に起動し、スタート画面 → ゲーム → ゲームオーバー画面 を繰り返す。
+# フレームはカメラではなく録画の再生 (既定は frame_sources.RECORDING_FILE を繰り返し再生) から取る。
+# 合成フレームには手が写っておらず分類が実行されないため、--synthetic を指定した場合だけ使い、レポートに残す。
+
+def current_rss_bytes():
+    """現在の常駐メモリ量 [バイト]"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # 取得できない環境では最大常駐量で代用する (増加の検出には使える)
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+def object_counts():
+    """型ごとの生存オブジェクト数"""
+    gc.collect()
+    return Counter(type(obj).__name__ for obj in gc.get_objects())
+
+class SoakMonitor:
+    """一定間隔でメモリ・オブジェクト数・フレーム時間を記録し、基準時点からの増加を求める"""
+    def __init__(self, use_tracemalloc=True, top=10):
+        self.use_tracemalloc = use_tracemalloc
+        self.top = top
+        self.samples = []
+        self.frame_times = [] # 直近のサンプル以降のフレーム時間 [秒]
+        self.baseline = None
+        self._baseline_counts = None
+        self._baseline_snapshot = None
+        if use_tracemalloc:
+            tracemalloc.start()
+
+    def record_frame(self, seconds):
+        self.frame_times.append(seconds)
+
+    def set_baseline(self):
+        """ウォームアップ後の状態を基準にする"""
+        self._baseline_counts = object_counts()
+        if self.use_tracemalloc:
+            self._baseline_snapshot = tracemalloc.take_snapshot()
+        self.baseline = self.sample(None)
+
+    def sample(self, cycle):
+        counts = object_counts()
+        frame_ms = np.array(self.frame_times) * 1000
+        self.frame_times = []
+        sample = {
+            "time": time.time(),
+            "cycle": cycle,
+            "rss_mb": current_rss_bytes() / 2**20,
+            "objects": sum(counts.values()),
+            "frames": int(len(frame_ms)),
+            "frame_p50_ms": float(np.percentile(frame_ms, 50)) if len(frame_ms) else None,
+            "frame_p95_ms": float(np.percentile(frame_ms, 95)) if len(frame_ms) else None,
+            "frame_p99_ms": float(np.percentile(frame_ms, 99)) if len(frame_ms) else None,
+        }
+        if self._baseline_counts is not None:
+            growth = counts - self._baseline_counts
+            sample["object_growth_by_type"] = dict(growth.most_common(self.top))
+        if self._baseline_snapshot is not None:
+            stats = tracemalloc.take_snapshot().compare_to(self._baseline_snapshot, "lineno")
+            sample["top_allocators"] = [{"where": str(stat.traceback), "size_diff_kb": stat.size_diff / 1024,
+                                         "count_diff": stat.count_diff}
+                                        for stat in stats[:self.top]]
+        self.samples.append(sample)
+        return sample
+
+    def check_budgets(self, max_rss_growth_mb, max_object_growth, max_p95_ratio):
+        """
+        基準時点から最後のサンプルまでの増加が予算内かを調べる。
+
+        Returns:
+            list: 超過した項目の説明。空なら合格。
+        """
+        if self.baseline is None or not self.samples:
+            return ["no samples were taken after the warm-up"]
+        last = self.samples[-1]
+        failures = []
+        rss_growth = last["rss_mb"] - self.baseline["rss_mb"]
+        if rss_growth > max_rss_growth_mb:
+            failures.append(f"RSS grew by {rss_growth:.1f} MB (budget {max_rss_growth_mb} MB)")
+        object_growth = last["objects"] - self.baseline["objects"]
+        if object_growth > max_object_growth:
+            failures.append(f"{object_growth} more live objects (budget {max_object_growth})")
+
+        # フレーム時間は基準直後の最初の区間と最後の区間の p95 を比べる
+        windows = [s for s in self.samples if s["cycle"] is not None and s["frame_p95_ms"] is not None]
+        if len(windows) >= 2:
+            ratio = windows[-1]["frame_p95_ms"] / windows[0]["frame_p95_ms"]
+            if ratio > max_p95_ratio:
+                failures.append(f"frame p95 drifted {ratio:.2f}x "
+                                f"({windows[0]['frame_p95_ms']:.1f} -> {windows[-1]['frame_p95_ms']:.1f} ms, "
+                                f"budget {max_p95_ratio}x)")
+        return failures
+
+class SoakDriver:
+    """Tk のタイマーで画面遷移を行い、ラウンドを繰り返す"""
+    def __init__(self, app, monitor, cycles, round_seconds, warmup_cycles, sample_every, num_players,
+                 on_finished):
+        self.app = app
+        self.monitor = monitor
+        self.cycles = cycles
+        self.round_seconds = round_seconds
+        self.warmup_cycles = warmup_cycles
+        self.sample_every = sample_every
+        self.num_players = num_players
+        self.on_finished = on_finished
+        self.cycle = 0
+        self.start_time = time.monotonic()
+
+    def start(self):
+        self.app.after(200, self._wait_until_ready)
+
+    def _wait_until_ready(self):
+        if self.app.session.is_ready():
+            self._start_round()
+        elif self.app.session.load_error is not None:
+            self.on_finished(f"recognizer failed to load: {self.app.session.load_error}")
+        else:
+            self.app.after(200, self._wait_until_ready)
+
+    def _start_round(self):
+        self.app.show_frame("GameStartScreen")
+        self.app.after(300, self._play)
+
+    def _play(self):
+        self.app.show_frame("GamePlayScreen", num_players=self.num_players)
+        screen = self.app.frames["GamePlayScreen"]
+        screen.numerical_timer_value = self.round_seconds
+
+        # ゲームループ1回ごとの所要時間を記録する (after() は属性から呼ぶのでインスタンスで上書きできる)
+        update_game = screen.update_game
+
+        def timed_update_game():
+            start_time = time.perf_counter()
+            update_game()
+            self.monitor.record_frame(time.perf_counter() - start_time)
+        screen.update_game = timed_update_game
+        self.app.after(500, self._wait_for_game_over)
+
+    def _wait_for_game_over(self):
+        screen = self.app.frames.get("GamePlayScreen")
+        if screen is not None and screen.running:
+            self.app.after(500, self._wait_for_game_over)
+            return
+
+        self.cycle += 1
+        if self.cycle == self.warmup_cycles:
+            self.monitor.set_baseline()
+            print(f"Baseline after {self.cycle} warm-up rounds: {self.monitor.baseline['rss_mb']:.1f} MB, "
+                  f"{self.monitor.baseline['objects']} objects")
+        elif self.cycle > self.warmup_cycles and (self.cycle - self.warmup_cycles) % self.sample_every == 0:
+            sample = self.monitor.sample(self.cycle)
+            print(f"[round {self.cycle}, {time.monotonic() - self.start_time:.0f} s] "
+                  f"RSS {sample['rss_mb']:.1f} MB  objects {sample['objects']}  "
+                  f"frame p50 {sample['frame_p50_ms'] or 0:.1f} ms p95 {sample['frame_p95_ms'] or 0:.1f} ms")
+        elif self.cycle <= self.warmup_cycles:
+            # ウォームアップ中のフレーム時間は基準に含めない
+            self.monitor.frame_times = []
+
+        if self.cycle >= self.cycles:
+            self.on_finished(None)
+        else:
+            # ゲームオーバー画面を少し表示してから次のラウンドへ
+            self.app.after(300, self._start_round)
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test: repeat game rounds and watch memory and frame times.")
+    parser.add_argument("--source", default=f"replay:{RECORDING_FILE}", help="フレーム取得元 (replay:PATH など)")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="録画の代わりに合成フレームを使う (手が写っていないため、分類の負荷は含まれない)")
+    parser.add_argument("--cycles", type=int, default=200, help="繰り返すラウンド数")
+    parser.add_argument("--round-seconds", type=int, default=10, help="1ラウンドの長さ (秒)")
+    parser.add_argument("--warmup-cycles", type=int, default=3, help="基準を取る前に捨てるラウンド数")
+    parser.add_argument("--sample-every", type=int, default=5, help="何ラウンドごとに記録するか")
+    parser.add_argument("--players", type=int, default=1, choices=[1, 2])
+    parser.add_argument("--no-tracemalloc", action="store_true", help="tracemalloc を使わない (オーバーヘッドを避ける)")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=50.0)
+    parser.add_argument("--max-object-growth", type=int, default=20000)
+    parser.add_argument("--max-p95-ratio", type=float, default=1.5, help="フレーム時間の p95 の悪化の許容倍率")
+    parser.add_argument("--report", default="soak_report.json")
+    args = parser.parse_args()
+
+    source = "synthetic" if args.synthetic else args.source
+    synthetic = source.startswith("synthetic")
+    if source.startswith("replay:"):
+        path = source[len("replay:"):]
+        if not os.path.exists(path):
+            parser.error(f"{path} not found. Record one with 'python frame_sources.py record {path}' "
+                         "or pass --synthetic.")
+    print(f"Input: {source}" + (" (synthetic frames without hands)" if synthetic else ""))
+
+    monitor = SoakMonitor(use_tracemalloc=not args.no_tracemalloc)
+    app = GameManager(source=source)
+    app.attributes('-fullscreen', False)
+    outcome = {}
+
+    def finished(error):
+        outcome["error"] = error
+        app.destroy()
+
+    driver = SoakDriver(app, monitor, args.cycles, args.round_seconds, args.warmup_cycles, args.sample_every,
+                        args.players, finished)
+    driver.start()
+    app.mainloop()
+
+    failures = [outcome["error"]] if outcome.get("error") else monitor.check_budgets(
+        args.max_rss_growth_mb, args.max_object_growth, args.max_p95_ratio)
+    with open(args.report, "w") as f:
+        json.dump({"args": vars(args), "input": source, "synthetic": synthetic,
+                   "rounds": driver.cycle, "baseline": monitor.baseline,
+                   "samples": monitor.samples, "failures": failures}, f, indent=2)
+    print(f"Report saved to {args.report}")
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print(f"PASS: {driver.cycle} rounds within budgets" + (" (synthetic frames without hands)" if synthetic else ""))
+
+if __name__ == "__main__":
+    main()
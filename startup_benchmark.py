@@ -0,0 +1,78 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# 起動時間の計測: 最初のウィンドウ表示までの時間と、最初の予測までの時間を記録する
+REPORT_FILE = "startup_benchmark.json"
+
+def measure_once():
+    """1回分の起動時間を計測する (子プロセスで実行される)"""
+    import numpy as np
+
+    start_time = time.perf_counter()
+    from main_app import GameManager
+    import_seconds = time.perf_counter() - start_time
+
+    app = GameManager()
+    app.update()
+    first_window_seconds = time.perf_counter() - start_time
+
+    # 認識器の読み込みを待ちながらTkのイベントを処理する
+    while not app.session.ready_event.is_set():
+        app.update()
+        time.sleep(0.01)
+
+    first_prediction_seconds = None
+    if app.session.is_ready():
+        recognizer = app.session.recognizer
+        recognizer.recognize(np.zeros((480, 640, 3), dtype=np.uint8))
+        recognizer._predict_hand_shape(np.zeros(63, dtype=np.float32))
+        first_prediction_seconds = time.perf_counter() - start_time
+
+    result = {
+        "import_seconds": import_seconds,
+        "first_window_seconds": first_window_seconds,
+        "first_prediction_seconds": first_prediction_seconds,
+        "background_load_seconds": app.session.load_seconds,
+    }
+    app.destroy()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app startup latency.")
+    parser.add_argument("--runs", type=int, default=3, help="計測回数 (毎回新しいプロセスで起動する)")
+    parser.add_argument("--output", default=REPORT_FILE, help="結果を書き出すJSONファイル")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_once()))
+        return
+
+    runs = []
+    for i in range(args.runs):
+        output = subprocess.run([sys.executable, __file__, "--child"],
+                                capture_output=True, text=True, check=True).stdout
+        # 子プロセスの最終行が計測結果
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+        print(f"Run {i + 1}: {runs[-1]}")
+
+    summary = {}
+    for key in runs[0]:
+        values = [run[key] for run in runs if run[key] is not None]
+        if values:
+            summary[key] = {"median": statistics.median(values), "min": min(values), "max": max(values)}
+
+    report = {"timestamp": time.time(), "python": sys.version, "runs": runs, "summary": summary}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for key, stats in summary.items():
+        print(f"{key}: median {stats['median']:.3f}s (min {stats['min']:.3f}s, max {stats['max']:.3f}s)")
+    print(f"Report saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+class LatencyTelemetry:
+    """
+    認識処理の各段の所要時間を計測するクラス。
+    段ごとに直近 window 件の所要時間を保持し、p50/p95/p99 を計算する。
+    jsonl_path を指定するとフレームごとの計測結果をJSONLファイルに書き出す。
+    """
+    def __init__(self, window=300, jsonl_path=None):
+        """
+        Args:
+            window (int): パーセンタイル計算に使う直近のサンプル数。
+            jsonl_path (str): フレームごとの記録を書き出すファイル。None なら書き出さない。
+        """
+        self.window = window
+        self.samples = {} # 段の名前 -> 所要時間(秒)のdeque
+        self.frame_count = 0
+        self._local = threading.local() # スレッドごとの計測中フレーム
+        self._lock = threading.Lock()
+        self._jsonl_file = open(jsonl_path, "a") if jsonl_path else None
+
+    @contextmanager
+    def stage(self, name):
+        """with ブロックの所要時間を name の段として記録する"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start_time)
+
+    def record(self, name, seconds):
+        """段の所要時間を記録する"""
+        current = self._current_frame()
+        current[name] = current.get(name, 0.0) + seconds
+        samples = self.samples.get(name)
+        if samples is None:
+            with self._lock:
+                samples = self.samples.setdefault(name, deque(maxlen=self.window))
+        samples.append(seconds)
+
+    def end_frame(self, **extra):
+        """
+        現在のスレッドで計測中のフレームを確定し、JSONLに書き出す。
+
+        Args:
+            **extra: 記録に追加する値 (予測ラベルなど)。
+        """
+        current = self._current_frame()
+        if not current:
+            return
+        with self._lock:
+            self.frame_count += 1
+            if self._jsonl_file is not None:
+                record = {
+                    "frame": self.frame_count,
+                    "time": time.time(),
+                    "thread": threading.current_thread().name,
+                    "stages_ms": {name: seconds * 1000 for name, seconds in current.items()},
+                }
+                record.update(extra)
+                self._jsonl_file.write(json.dumps(record) + "\n")
+        current.clear()
+
+    def percentiles(self, name):
+        """
+        Returns:
+            tuple or None: 段 name の (p50, p95, p99) [ミリ秒]。サンプルが無ければ None。
+        """
+        samples = self.samples.get(name)
+        if not samples:
+            return None
+        p50, p95, p99 = np.percentile(np.fromiter(samples, dtype=np.float64), [50, 95, 99]) * 1000
+        return p50, p95, p99
+
+    def summary_text(self):
+        """デバッグ表示用に各段のパーセンタイルを整形する"""
+        lines = []
+        for name in list(self.samples):
+            stats = self.percentiles(name)
+            if stats is not None:
+                lines.append(f"{name}: p50 {stats[0]:.1f} / p95 {stats[1]:.1f} / p99 {stats[2]:.1f} ms")
+        return "\n".join(lines)
+
+    def close(self):
+        if self._jsonl_file is not None:
+            self._jsonl_file.close()
+            self._jsonl_file = None
+
+    def _current_frame(self):
+        current = getattr(self._local, "current", None)
+        if current is None:
+            current = self._local.current = {}
+        return current
+
+class NullTelemetry:
+    """計測を行わない場合に使うダミー。呼び出し側で分岐せずに済むようにする"""
+    _context = nullcontext()
+
+    def stage(self, name):
+        return self._context
+
+    def record(self, name, seconds):
+        pass
+
+    def end_frame(self, **extra):
+        pass
+
+    def summary_text(self):
+        return ""
+
+    def close(self):
+        pass
+
+NULL_TELEMETRY = NullTelemetry()
@@ -0,0 +1,399 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+from landmark_features import normalize_landmarks
+
+# 直近のフレームのランドマークを使う時系列の認識。
+# 1フレームの63次元だけでは、動きのある文字や、形が似ていてフレームごとに結果が揺れる文字を安定して判定できない。
+#
+# 手ごとに固定長のリングバッファを持ち、フレームが入るたびに次の2つを更新する:
+#   LandmarkWindow  窓内の特徴量 (平均・標準偏差・最初から最後への変化)。合計と二乗和を
+#                   差分で更新するため、1フレームあたりの計算量は窓の長さに依らない
+#   TemporalVote    窓内の各フレームの予測ラベルを信頼度で重み付けした投票
+# シーケンスモデル (train サブコマンドで学習) があれば窓の特徴量からも予測し、投票と信頼度の高い方を使う。
+
+# 1フレームの特徴: 正規化したランドマーク (63) + 手首の画像内の位置 (3)
+# 正規化すると手全体の移動が消えるため、手首の位置を別に持つ
+FRAME_FEATURES = 66
+# 窓の特徴: 平均・標準偏差・最初から最後への変化
+WINDOW_FEATURES = FRAME_FEATURES * 3
+
+DEFAULT_WINDOW = 15 # 30fps で0.5秒
+DEFAULT_BUDGET_MS = 1.0 # 時系列の処理に許す1フレームあたりの時間
+
+def frame_features(landmarks):
+    """
+    形状 (N, 63) のランドマークを形状 (N, FRAME_FEATURES) の1フレームの特徴にする。
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float32).reshape(-1, 63)
+    return np.concatenate([normalize_landmarks(landmarks), landmarks[:, :3]], axis=1)
+
+def window_features(sequence):
+    """
+    1つの窓 (形状 (フレーム数, 63)) の特徴を一括で計算する。学習とテストで使う。
+    LandmarkWindow.features() と同じ値になる。
+    """
+    features = frame_features(sequence).astype(np.float64)
+    return np.concatenate([features.mean(axis=0), features.std(axis=0), features[-1] - features[0]]).astype(np.float32)
+
+def sliding_windows(sequences, labels, size, stride=1):
+    """
+    シーケンスから長さ size の窓をずらしながら切り出し、窓の特徴とラベルを返す。
+
+    Args:
+        size (int): 窓の長さ (フレーム数)。
+        stride (int): 窓をずらすフレーム数。1以上 size 以下 (size より大きいと間のフレームが使われない)。
+
+    Returns:
+        tuple: (形状 (窓の数, WINDOW_FEATURES) の配列, ラベルの配列)
+    """
+    if size < 1:
+        raise ValueError(f"Window size must be at least 1, got {size}")
+    if not 1 <= stride <= size:
+        raise ValueError(f"Stride must be between 1 and the window size ({size}), got {stride}")
+    X, y = [], []
+    for sequence, label in zip(sequences, labels):
+        for start in range(0, len(sequence) - size + 1, stride):
+            X.append(window_features(sequence[start:start + size]))
+            y.append(label)
+    return np.array(X, dtype=np.float32).reshape(-1, WINDOW_FEATURES), np.array(y, dtype=str)
+
+class LandmarkWindow:
+    """
+    直近 size フレームの特徴のリングバッファ。
+    合計と二乗和を、追加したフレームと押し出されたフレームの差分で更新する。
+    """
+    def __init__(self, size=DEFAULT_WINDOW, resync_interval=1000):
+        """
+        Args:
+            size (int): 窓の長さ (フレーム数)。
+            resync_interval (int): この回数の更新ごとに合計を計算し直し、差分更新の丸め誤差の蓄積を防ぐ。
+        """
+        self.size = size
+        self.resync_interval = resync_interval
+        self._frames = np.zeros((size, FRAME_FEATURES), dtype=np.float64)
+        self._sum = np.zeros(FRAME_FEATURES, dtype=np.float64)
+        self._sum_sq = np.zeros(FRAME_FEATURES, dtype=np.float64)
+        self._features = np.empty(WINDOW_FEATURES, dtype=np.float32)
+        self.count = 0 # 窓に入っているフレーム数
+        self._next = 0 # 次に書き込む位置 (= 最も古いフレームの位置)
+        self._updates = 0
+
+    def reset(self):
+        self._sum[:] = 0
+        self._sum_sq[:] = 0
+        self.count = 0
+        self._next = 0
+
+    @property
+    def full(self):
+        return self.count == self.size
+
+    def push(self, features):
+        """1フレームの特徴 (FRAME_FEATURES 次元) を追加し、窓から出た最も古いフレームを差し引く"""
+        slot = self._frames[self._next]
+        if self.count == self.size:
+            self._sum -= slot
+            self._sum_sq -= slot * slot
+        else:
+            self.count += 1
+        slot[:] = features
+        self._sum += slot
+        self._sum_sq += slot * slot
+        self._next = (self._next + 1) % self.size
+
+        self._updates += 1
+        if self._updates % self.resync_interval == 0:
+            frames = self._frames[:self.count] if self.count < self.size else self._frames
+            self._sum = frames.sum(axis=0)
+            self._sum_sq = (frames * frames).sum(axis=0)
+
+    def features(self):
+        """窓の特徴 (平均・標準偏差・最初から最後への変化)。返す配列は次の呼び出しで上書きされる"""
+        n = self.count
+        mean = self._sum / n
+        variance = np.maximum(self._sum_sq / n - mean * mean, 0.0)
+        oldest = self._frames[self._next if n == self.size else 0]
+        newest = self._frames[(self._next - 1) % self.size]
+        out = self._features
+        out[:FRAME_FEATURES] = mean
+        out[FRAME_FEATURES:2 * FRAME_FEATURES] = np.sqrt(variance)
+        out[2 * FRAME_FEATURES:] = newest - oldest
+        return out
+
+class TemporalVote:
+    """
+    直近 size フレームの予測ラベルを信頼度で重み付けして投票する。
+    ラベルごとの合計を差分で更新するため、1フレームあたりの計算量は窓の長さに依らない。
+    """
+    def __init__(self, size=DEFAULT_WINDOW):
+        self.size = size
+        self._votes = [None] * size # (ラベル, 信頼度)
+        self._scores = {}
+        self.count = 0
+        self._next = 0
+
+    def reset(self):
+        self._votes = [None] * self.size
+        self._scores = {}
+        self.count = 0
+        self._next = 0
+
+    def push(self, label, confidence):
+        old = self._votes[self._next]
+        if old is not None:
+            old_label, old_confidence = old
+            score = self._scores[old_label] - old_confidence
+            if score <= 1e-9:
+                del self._scores[old_label]
+            else:
+                self._scores[old_label] = score
+        else:
+            self.count += 1
+        self._votes[self._next] = (label, confidence)
+        self._scores[label] = self._scores.get(label, 0.0) + confidence
+        self._next = (self._next + 1) % self.size
+
+    def result(self):
+        """
+        Returns:
+            tuple: (得票が最も多いラベル, 得票 / 窓の長さ)。窓が埋まるまでは信頼度が低めに出る。
+        """
+        if not self._scores:
+            return "unknown", 0.0
+        label = max(self._scores, key=self._scores.get)
+        return label, self._scores[label] / self.size
+
+class TemporalSmoother:
+    """
+    GestureRecognizer の時系列モード。各手の予測を窓内の投票 (とシーケンスモデル) で安定させる。
+    2人プレイでは手を画面の左から順に並べて、同じ位置の手を同じ窓に入れる。
+    シーケンスモデルの推論が budget_ms を超える場合は、推論するフレームの間隔を広げる。
+    """
+    def __init__(self, window=DEFAULT_WINDOW, sequence_model=None, budget_ms=DEFAULT_BUDGET_MS, max_hands=2):
+        """
+        Args:
+            window (int): 窓の長さ (フレーム数)。
+            sequence_model (str): train サブコマンドで作ったシーケンスモデル (.h5)。None なら投票のみ。
+            budget_ms (float): 時系列の処理に許す1フレームあたりの時間 [ミリ秒]。
+            max_hands (int): 窓を持つ手の最大数。
+        """
+        self.window = window
+        self.budget_ms = budget_ms
+        self.windows = [LandmarkWindow(window) for _ in range(max_hands)]
+        self.votes = [TemporalVote(window) for _ in range(max_hands)]
+        self._sequence_results = [None] * max_hands # 手ごとの直近のシーケンスモデルの結果
+
+        self.sequence_engine = None
+        self.sequence_labels = None
+        if sequence_model is not None:
+            from gesture_model import load_labels
+            from numpy_engine import NumpyInferenceEngine
+            self.sequence_engine = NumpyInferenceEngine(sequence_model)
+            self.sequence_labels = load_labels(sequence_model)
+            if self.sequence_labels is None:
+                raise ValueError(f"No labels found for {sequence_model}")
+        self.stride = 1 # シーケンスモデルを推論するフレームの間隔
+        self._frame_count = 0
+        self._overhead_ms = 0.0 # 1フレームあたりの処理時間の指数移動平均
+        self.sequence_answers = 0
+        self.vote_answers = 0
+
+    def reset(self):
+        for window, vote in zip(self.windows, self.votes):
+            window.reset()
+            vote.reset()
+        self._sequence_results = [None] * len(self.windows)
+
+    def update(self, landmarks, predictions):
+        """
+        1フレーム分の結果を窓に追加し、時系列で安定させた結果を返す。
+
+        Args:
+            landmarks (np.ndarray): 形状 (手の数, 63) のランドマーク。
+            predictions (list): 手ごとの HandPrediction (1フレームだけでの予測)。
+
+        Returns:
+            list: label と confidence を時系列の結果に置き換えた HandPrediction のリスト。
+        """
+        start_time = time.perf_counter()
+        n = min(len(predictions), len(self.windows))
+        # 手が減ったら、いなくなった位置の窓は空にする
+        for i in range(n, len(self.windows)):
+            if self.windows[i].count:
+                self.windows[i].reset()
+                self.votes[i].reset()
+                self._sequence_results[i] = None
+        if n == 0:
+            return predictions
+
+        order = sorted(range(n), key=lambda i: predictions[i].bbox[0] + predictions[i].bbox[2])
+        features = frame_features(landmarks[:n])
+        run_sequence = self.sequence_engine is not None and self._frame_count % self.stride == 0
+        self._frame_count += 1
+
+        full_windows = []
+        for slot, i in enumerate(order):
+            self.windows[slot].push(features[i])
+            self.votes[slot].push(predictions[i].label, predictions[i].confidence)
+            if run_sequence and self.windows[slot].full:
+                full_windows.append(slot)
+        if full_windows:
+            probabilities = self.sequence_engine.predict(np.stack([self.windows[slot].features()
+                                                                   for slot in full_windows]))
+            for slot, p in zip(full_windows, probabilities):
+                best = int(p.argmax())
+                self._sequence_results[slot] = (self.sequence_labels[best], float(p[best]))
+
+        smoothed = list(predictions)
+        for slot, i in enumerate(order):
+            label, confidence = self.votes[slot].result()
+            sequence_result = self._sequence_results[slot] if self.windows[slot].full else None
+            if sequence_result is not None and sequence_result[1] > confidence:
+                label, confidence = sequence_result
+                self.sequence_answers += 1
+            else:
+                self.vote_answers += 1
+            smoothed[i] = predictions[i]._replace(label=label, confidence=confidence)
+
+        self._adapt_stride((time.perf_counter() - start_time) * 1000)
+        return smoothed
+
+    def _adapt_stride(self, elapsed_ms):
+        """処理時間の平均が予算を超えたらシーケンスモデルの間隔を広げ、十分に余裕があれば戻す"""
+        self._overhead_ms = elapsed_ms if self._overhead_ms == 0.0 else 0.9 * self._overhead_ms + 0.1 * elapsed_ms
+        if self.sequence_engine is None:
+            return
+        # 間隔は窓の長さまで (それより広げると、どの窓にも入らないフレームができる)
+        if self._overhead_ms > self.budget_ms and self.stride < self.window:
+            self.stride = min(self.stride * 2, self.window)
+            self._overhead_ms = 0.0
+        elif self._overhead_ms < self.budget_ms / 4 and self.stride > 1:
+            self.stride //= 2
+            self._overhead_ms = 0.0
+
+    def summary_text(self):
+        total = self.sequence_answers + self.vote_answers
+        text = f"temporal: window {self.window}, {self._overhead_ms:.3f} ms/frame (budget {self.budget_ms} ms)"
+        if self.sequence_engine is not None:
+            text += (f", sequence model every {self.stride} frames, "
+                     f"{self.sequence_answers / total * 100 if total else 0:.0f}% of answers")
+        return text
+
+def train_sequence_model(directory, output, window=DEFAULT_WINDOW, epochs=30, seed=42):
+    """
+    collect_hand_landmarks.py --sequence で記録したシーケンスから窓の特徴を切り出し、
+    シーケンスモデルを学習してラベルと一緒に保存する。
+
+    Returns:
+        dict: 学習の結果。
+    """
+    import tensorflow as tf
+    from sklearn.model_selection import train_test_split
+
+    from gesture_model import save_labels, train_and_evaluate
+    from landmark_store import read_sequences
+
+    tf.keras.utils.set_random_seed(seed)
+    sequences, labels = read_sequences(directory, min_length=window)
+    if not sequences:
+        raise ValueError(f"No sequences of at least {window} frames in {directory}")
+
+    # 同じシーケンスの窓が学習とテストに分かれないよう、シーケンス単位で分ける
+    stratify = labels if min(np.unique(labels, return_counts=True)[1]) >= 2 else None
+    train_indices, test_indices = train_test_split(np.arange(len(sequences)), test_size=0.2, random_state=seed,
+                                                   stratify=stratify)
+    X_train, y_train = sliding_windows([sequences[i] for i in train_indices], labels[train_indices], window)
+    X_test, y_test = sliding_windows([sequences[i] for i in test_indices], labels[test_indices], window)
+    classes = sorted(set(labels))
+    model, result = train_and_evaluate(X_train, np.searchsorted(classes, y_train),
+                                       X_test, np.searchsorted(classes, y_test),
+                                       len(classes), widths=(64, 32), epochs=epochs, seed=seed)
+    model.save(output)
+    save_labels(output, classes)
+    return {"sequences": len(sequences), "train_windows": int(len(X_train)), "test_windows": int(len(X_test)),
+            "classes": classes, "accuracy": result["accuracy"], "train_seconds": result["train_seconds"]}
+
+def measure_overhead(model_path, engine, window, sequence_model, budget_ms, frames=2000, seed=0):
+    """
+    ランドマークの列を classify_landmark_array に通し、時系列モードの有無で1フレームの所要時間を比べる。
+    合わせて、差分更新と窓全体からの再計算で特徴の計算時間を比べる。
+    """
+    from benchmark import time_callable
+    from discrimination_app import GestureRecognizer
+
+    rng = np.random.default_rng(seed)
+    # 手の形がゆっくり変わる列 (前のフレームに小さなノイズを足していく)
+    stream = np.cumsum(rng.normal(0, 0.002, (frames, 63)), axis=0).astype(np.float32) + \
+        rng.random(63, dtype=np.float32)
+
+    results = {}
+    for name, temporal in (("single_frame", None),
+                           ("temporal", TemporalSmoother(window, sequence_model, budget_ms))):
+        recognizer = GestureRecognizer(model_path=model_path, engine=engine, prediction_cache=None,
+                                       temporal=temporal)
+        rows = iter(np.concatenate([stream, stream]))
+        results[name] = time_callable(lambda: recognizer.classify_landmark_array(next(rows)[np.newaxis, :]), frames)
+        recognizer.release()
+
+    incremental = LandmarkWindow(window)
+    features = iter(np.concatenate([frame_features(stream)] * 2))
+
+    def push_and_read():
+        incremental.push(next(features))
+        incremental.features()
+    results["window_incremental"] = time_callable(push_and_read, frames)
+    windows = iter(range(frames * 2))
+    results["window_recompute"] = time_callable(
+        lambda: window_features(stream[max(0, next(windows) - window + 1):][:window]), frames)
+
+    overhead = results["temporal"]["p95_ms"] - results["single_frame"]["p95_ms"]
+    results["overhead_p95_ms"] = overhead
+    results["within_budget"] = overhead <= budget_ms
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Sliding-window temporal recognition tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="記録したシーケンスでシーケンスモデルを学習する")
+    train_parser.add_argument("directory", help="collect_hand_landmarks.py --sequence のシャードのディレクトリ")
+    train_parser.add_argument("--output", default="model.sequence.h5")
+    train_parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    train_parser.add_argument("--epochs", type=int, default=30)
+
+    bench_parser = subparsers.add_parser("benchmark", help="時系列モードによる1フレームの所要時間の増加を計測する")
+    bench_parser.add_argument("--model", default="model.h5")
+    bench_parser.add_argument("--engine", default="numpy")
+    bench_parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    bench_parser.add_argument("--sequence-model", default=None)
+    bench_parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    bench_parser.add_argument("--output", default=None, help="結果を書き出すJSONファイル")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        result = train_sequence_model(args.directory, args.output, args.window, args.epochs)
+        print(f"{result['sequences']} sequences, {result['train_windows']} training windows, "
+              f"{len(result['classes'])} classes")
+        print(f"Test accuracy: {result['accuracy'] * 100:.2f}% (trained in {result['train_seconds']:.1f} s)")
+        print(f"Model saved to {args.output}")
+        print(f"Use it with GestureRecognizer(temporal=TemporalSmoother({args.window}, '{args.output}'))")
+        return
+
+    results = measure_overhead(args.model, args.engine, args.window, args.sequence_model, args.budget_ms)
+    for name in ("single_frame", "temporal", "window_incremental", "window_recompute"):
+        r = results[name]
+        print(f"{name:<19} p50 {r['p50_ms']:.4f} ms  p95 {r['p95_ms']:.4f} ms")
+    print(f"Temporal overhead (p95): {results['overhead_p95_ms']:.4f} ms "
+          f"({'within' if results['within_budget'] else 'OVER'} budget of {args.budget_ms} ms)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if not results["within_budget"]:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
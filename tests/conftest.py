@@ -0,0 +1,27 @@
+import os
+import sys
+
+# テストはリポジトリ直下のモジュールを直接インポートする
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def fake_game_screen(**attributes):
+    """
+    Tk を使わずに GamePlayScreen.update_game を呼ぶための最小限の画面。
+    after() に渡された待ち時間は calls に記録する。attributes で属性を追加・上書きする。
+    """
+    from types import SimpleNamespace
+
+    from screens.game_play_screen import GamePlayScreen
+    from telemetry import NULL_TELEMETRY
+
+    screen = SimpleNamespace(
+        running=True, debug=True, pipeline=None, calls=[], last_predictions=[], last_hand_landmarks=[],
+        recognizer=SimpleNamespace(telemetry=NULL_TELEMETRY, flip=lambda frame: frame),
+        _render_for_display=lambda frame, landmarks: frame,
+        _cv2_to_pil=lambda frame: None,
+        _show_result=lambda pil_image, predictions, fresh=True: None)
+    vars(screen).update(attributes)
+    screen.update_game = lambda: GamePlayScreen.update_game(screen)
+    screen.after = lambda delay, callback: screen.calls.append(delay)
+    return screen
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+model_selection = pytest.importorskip("sklearn.model_selection")
+
+from conftest import ROOT
+from cascade_engine import CascadeEngine
+from knn_engine import KnnInferenceEngine
+
+@pytest.fixture(scope="module")
+def cascade_and_test_rows():
+    df = pd.read_csv(os.path.join(ROOT, "hand_landmarks.csv"))
+    X = df.drop('label', axis=1).values.astype(np.float32)
+    y = df['label'].values.astype(str)
+    X_train, X_test, y_train, y_test = model_selection.train_test_split(X, y, test_size=0.2, random_state=42,
+                                                                        stratify=y)
+    X_fit, X_calibrate, y_fit, _ = model_selection.train_test_split(X_train, y_train, test_size=0.25,
+                                                                    random_state=0, stratify=y_train)
+    # tensorflow が無くても動くよう、第2段には近傍探索を使う
+    fast = KnnInferenceEngine(X_fit, y_fit, mode='prototype')
+    full = KnnInferenceEngine(X_fit, y_fit, mode='knn')
+    cascade = CascadeEngine(fast, full).calibrate(X_calibrate)
+    targets = np.array([fast.labels.index(label) for label in y_test])
+    return cascade, X_test, targets
+
+def count_rejects(cascade, X, targets):
+    cascade.target_rejects = 0
+    for row, target in zip(X, targets):
+        cascade.set_target(int(target))
+        cascade.predict(row[None])
+    cascade.set_target(None)
+    return cascade.target_rejects
+
+def test_reject_thresholds_are_per_class(cascade_and_test_rows):
+    cascade, _, targets = cascade_and_test_rows
+    thresholds = cascade.reject_thresholds[np.unique(targets)]
+    assert (thresholds > 0).all()
+    assert (thresholds <= cascade.match_threshold).all()
+
+def test_prompt_reject_fires_for_mismatched_targets(cascade_and_test_rows):
+    cascade, X, targets = cascade_and_test_rows
+    margin = cascade.margin
+    cascade.margin = np.inf # 第1段のマージンで答える行を無くし、お題による棄却だけを見る
+    try:
+        classes = np.unique(targets)
+        mismatched = classes[(np.searchsorted(classes, targets) + 1) % len(classes)]
+        assert count_rejects(cascade, X, mismatched) / len(X) > 0.5
+        # お題と一致する行はほとんど棄却しない
+        assert count_rejects(cascade, X, targets) / len(X) < 0.05
+    finally:
+        cascade.margin = margin
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("h5py")
+
+from conftest import ROOT
+from compact_model import Int8InferenceEngine, load_compact_engine, save_compact
+from numpy_engine import NumpyInferenceEngine, load_dense_layers
+
+@pytest.fixture(scope="module")
+def layers():
+    return load_dense_layers(os.path.join(ROOT, "model.h5"))
+
+@pytest.fixture(scope="module")
+def inputs():
+    import pandas as pd
+
+    df = pd.read_csv(os.path.join(ROOT, "hand_landmarks.csv"))
+    return df.drop('label', axis=1).values.astype(np.float32)[::10]
+
+def test_int8_engine_computes_with_int8_kernels(layers, inputs, tmp_path):
+    path = str(tmp_path / "model_int8.npz")
+    save_compact(layers, path, 'int8')
+    engine = load_compact_engine(path)
+
+    assert isinstance(engine, Int8InferenceEngine)
+    assert all(kernel.dtype == np.int8 for kernel, _, _, _ in engine.layers)
+
+    expected = NumpyInferenceEngine(layers=layers).predict(inputs)
+    probabilities = engine.predict(inputs)
+    assert probabilities.shape == expected.shape
+    assert (probabilities.argmax(axis=1) == expected.argmax(axis=1)).mean() > 0.95
+    difference = np.abs(probabilities - expected).max(axis=1)
+    assert difference.mean() < 0.03
+    assert difference.max() < 0.25
+
+@pytest.mark.parametrize("variant", ["float16", "pruned50"])
+def test_storage_only_variants_compute_in_float32(layers, tmp_path, variant):
+    path = str(tmp_path / f"model_{variant}.npz")
+    save_compact(layers, path, variant)
+    engine = load_compact_engine(path)
+
+    assert isinstance(engine, NumpyInferenceEngine)
+    assert all(kernel.dtype == np.float32 for kernel, _, _ in engine.layers)
@@ -0,0 +1,32 @@
+import itertools
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from dataset_store import batch_generator, make_tf_dataset
+
+def epoch_orders(make_epoch, epochs=3):
+    return [np.concatenate([x[:, 0] for x, _ in make_epoch()]) for _ in range(epochs)]
+
+@pytest.fixture
+def data():
+    X = np.arange(64 * 63, dtype=np.float32).reshape(64, 63) / 63
+    y = np.arange(64) % 4
+    return X, y, np.arange(64)
+
+def test_shared_rng_reshuffles_each_epoch(data):
+    X, y, indices = data
+    rng = np.random.default_rng(0)
+    # Keras と同じく、エポックごとにジェネレータを作り直して1エポック分だけ読む
+    orders = epoch_orders(lambda: itertools.islice(batch_generator(X, y, indices, 8, 4, True, rng), 8))
+    assert not np.array_equal(orders[0], orders[1])
+    assert not np.array_equal(orders[1], orders[2])
+
+def test_make_tf_dataset_reshuffles_each_epoch(data):
+    pytest.importorskip("tensorflow")
+    X, y, indices = data
+    dataset = make_tf_dataset(X, y, indices, batch_size=8, num_classes=4, shuffle=True, seed=0)
+    orders = epoch_orders(lambda: ((x.numpy(), t) for x, t in dataset))
+    assert not np.array_equal(orders[0], orders[1])
+    assert sorted(orders[0]) == sorted(orders[1])
@@ -0,0 +1,83 @@
+from collections import deque
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("mediapipe")
+
+import detection_pool
+from discrimination_app import GestureRecognizer, HandPrediction
+from frame_buffers import FrameBufferPool
+from telemetry import NULL_TELEMETRY
+
+class FakeDetectionPool:
+    """ワーカーを起動せず、フレームの画素値をランドマークとして返す DetectionPool の代わり"""
+    created = []
+
+    def __init__(self, frame_shape, num_workers=2, slots=None, max_num_hands=1):
+        self.frame_shape = frame_shape
+        self.slot_bytes = int(np.prod(frame_shape))
+        self.slots = slots or num_workers * 2
+        self._queue = deque()
+        self.lost = 0
+        FakeDetectionPool.created.append(self)
+
+    @property
+    def in_flight(self):
+        return len(self._queue)
+
+    def submit(self, frame, stream=None):
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame of shape {frame.shape} does not fit in a slot of shape {self.frame_shape}")
+        self._queue.append(float(frame[0, 0, 0]))
+
+    def get(self):
+        value = self._queue.popleft()
+        return 0, np.full((1, 63), value, dtype=np.float32), ['Right']
+
+    def close(self):
+        self.lost += len(self._queue)
+
+class FrameList:
+    def __init__(self, frames):
+        self.frames = deque(frames)
+
+    def read(self):
+        return (True, self.frames.popleft()) if self.frames else (False, None)
+
+@pytest.fixture
+def recognizer(monkeypatch):
+    monkeypatch.setattr(detection_pool, "DetectionPool", FakeDetectionPool)
+    FakeDetectionPool.created = []
+    # MediaPipe Hands を作らずに並列処理の部分だけを使う
+    recognizer = GestureRecognizer.__new__(GestureRecognizer)
+    recognizer.detection_workers = 2
+    recognizer.detection_pool = None
+    recognizer.detection_width = None
+    recognizer._detection_buffers = FrameBufferPool(1)
+    recognizer.max_num_hands = 1
+    recognizer.telemetry = NULL_TELEMETRY
+    recognizer.classify_landmark_array = lambda landmarks, handedness: [
+        HandPrediction(str(int(hand[0])), 1.0, side, None) for hand, side in zip(landmarks, handedness)]
+    return recognizer
+
+def test_mixed_frame_sizes_keep_results_paired(recognizer):
+    shapes = [(48, 64, 3)] * 5 + [(96, 128, 3)] * 3 + [(48, 64, 3)] * 2 + [(120, 160, 3)] * 2
+    frames = [np.full(shape, i, dtype=np.uint8) for i, shape in enumerate(shapes)]
+
+    results = list(recognizer._process_source_parallel(FrameList(frames), debug=False, max_frames=None))
+
+    assert [label for _, label, _ in results] == [str(i) for i in range(len(frames))]
+    assert [frame.shape for frame, _, _ in results] == shapes
+    # 大きいフレームが来るたびに1度だけ作り直し、作り直す時点で投入済みのフレームは残っていない
+    assert [pool.frame_shape for pool in FakeDetectionPool.created] == [(48, 64, 3), (96, 128, 3), (120, 160, 3)]
+    assert all(pool.lost == 0 for pool in FakeDetectionPool.created[:-1])
+
+def test_max_frames_counts_frames_waiting_for_resize(recognizer):
+    shapes = [(48, 64, 3)] * 3 + [(96, 128, 3)] * 3
+    frames = [np.full(shape, i, dtype=np.uint8) for i, shape in enumerate(shapes)]
+
+    results = list(recognizer._process_source_parallel(FrameList(frames), debug=False, max_frames=4))
+
+    assert [label for _, label, _ in results] == ['0', '1', '2', '3']
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from frame_pipeline import FramePipeline
+
+class NumberedSource:
+    """左端の列に何番目のフレームかを書いたフレームを返す取得元"""
+    def __init__(self, num_frames):
+        self.num_frames = num_frames
+        self.count = 0
+
+    def read(self):
+        if self.count == self.num_frames:
+            return False, None
+        self.count += 1
+        frame = np.zeros((4, 6, 3), dtype=np.uint8)
+        frame[:, 0] = self.count
+        return True, frame
+
+class FakeHands:
+    """反転後のフレームの右端の値を x 座標にした手を1つ返す"""
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+
+    def process(self, image_rgb):
+        value = int(image_rgb[0, -1, 0])
+        if value == self.fail_at:
+            raise RuntimeError("detection failed")
+        hand = SimpleNamespace(landmark=[SimpleNamespace(x=value, y=0.0, z=0.0)] * 21)
+        handedness = SimpleNamespace(classification=[SimpleNamespace(label="Right")])
+        return SimpleNamespace(multi_hand_landmarks=[hand], multi_handedness=[handedness])
+
+class EchoRecognizer:
+    """ランドマークの x 座標をそのまま予測として返す認識器"""
+    def __init__(self):
+        self.calls = 0
+
+    def classify_landmark_array(self, landmarks, handedness):
+        self.calls += 1
+        return [(float(row[0]), label) for row, label in zip(landmarks, handedness)]
+
+    def classify_landmark_batches(self, landmark_batches, handedness_batches):
+        self.calls += 1
+        return [[(float(row[0]), label) for row, label in zip(landmarks, handedness)]
+                for landmarks, handedness in zip(landmark_batches, handedness_batches)]
+
+def build(num_frames, recognizer, batch_size=1, hands=None):
+    return (FramePipeline(NumberedSource(num_frames))
+            .preprocess(buffer=1)
+            .detect(hands or FakeHands(), buffer=2)
+            .extract(max_num_hands=2)
+            .classify(recognizer, batch_size=batch_size))
+
+@pytest.mark.parametrize("batch_size", [1, 3])
+def test_stages_fill_every_packet_in_order(batch_size):
+    recognizer = EchoRecognizer()
+    packets = [(packet.index, packet.frame[0, -1, 0], packet.landmarks.shape, packet.predictions)
+               for packet in build(7, recognizer, batch_size)]
+
+    assert packets == [(i, i + 1, (1, 63), [(float(i + 1), "Right")]) for i in range(7)]
+    assert recognizer.calls == (7 if batch_size == 1 else 3)
+
+def test_error_in_buffered_stage_reaches_the_consumer():
+    pipeline = build(5, EchoRecognizer(), hands=FakeHands(fail_at=3))
+    seen = []
+    with pytest.raises(RuntimeError, match="detection failed"):
+        for packet in pipeline:
+            seen.append(packet.index)
+    assert seen == [0, 1]
+
+def test_run_stops_when_sink_returns_false():
+    pipeline = build(10, EchoRecognizer())
+    assert pipeline.run(lambda packet: packet.index < 3) == 4
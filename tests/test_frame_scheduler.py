@@ -0,0 +1,49 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("PIL.ImageTk")
+
+from conftest import fake_game_screen
+from frame_scheduler import AdaptiveFrameScheduler
+from screens.game_play_screen import GamePlayScreen
+from telemetry import NULL_TELEMETRY
+
+SLOW = 0.005 # 1フレームの予算 (1 ms) を超える処理時間 [秒]
+
+def fake_screen(pipeline=None):
+    """認識と表示がどちらも1フレームの予算を超える画面"""
+    def detect(frame):
+        time.sleep(SLOW)
+        return frame, [], []
+
+    return fake_game_screen(
+        pipeline=pipeline,
+        scheduler=AdaptiveFrameScheduler(target_fps=1000, adapt_interval=2),
+        cap=SimpleNamespace(read=lambda: (True, np.zeros((4, 4, 3), dtype=np.uint8))),
+        recognizer=SimpleNamespace(telemetry=NULL_TELEMETRY, detect=detect, flip=lambda frame: frame,
+                                   classify_hands=lambda landmarks, handedness: []),
+        _show_result=lambda pil_image, predictions, fresh=True: time.sleep(SLOW))
+
+def run_loop(screen, iterations=20):
+    for _ in range(iterations):
+        GamePlayScreen.update_game(screen)
+
+def test_synchronous_mode_thins_out_slow_recognition():
+    screen = fake_screen()
+    run_loop(screen)
+    assert screen.scheduler.recognition_stride > 1
+
+def test_pipelined_mode_only_paces_the_loop():
+    result = ([], [])
+    frame = np.zeros((4, 4, 3), dtype=np.uint8)
+    screen = fake_screen(pipeline=SimpleNamespace(get_latest=lambda: result, get_latest_frame=lambda: frame))
+    screen.scheduler.should_recognize = lambda: pytest.fail("pipelined mode must not consult the stride")
+    run_loop(screen)
+    # 表示が遅くても、認識の間引きは古いフレームを捨てるキューに任せる
+    assert screen.scheduler.recognition_stride == 1
+    assert screen.scheduler.recognition_time == 0.0
+    assert len(screen.calls) == 20
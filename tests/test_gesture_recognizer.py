@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("mediapipe")
+
+from discrimination_app import GestureRecognizer, load_engine
+
+def test_unknown_engine_raises_instead_of_loading_without_a_model():
+    with pytest.raises(ValueError, match="Unknown engine"):
+        GestureRecognizer(model_path='model.h5', engine='tflite')
+
+def test_load_engine_rejects_unknown_engine():
+    with pytest.raises(ValueError, match="Unknown engine"):
+        load_engine('model.h5', 'tflite')
+
+class StillHand:
+    """手が動いていないと判定し続ける motion_gate"""
+    def landmarks_changed(self, landmarks):
+        return False
+
+def test_motion_gated_frames_still_advance_the_temporal_window():
+    import numpy as np
+
+    from telemetry import NULL_TELEMETRY
+    from temporal_window import TemporalSmoother
+
+    # MediaPipe Hands を作らずに分類の部分だけを使う
+    recognizer = GestureRecognizer.__new__(GestureRecognizer)
+    recognizer.max_num_hands = 1
+    recognizer.telemetry = NULL_TELEMETRY
+    recognizer.motion_gate = StillHand()
+    recognizer.temporal = TemporalSmoother(window=4, max_hands=1)
+    recognizer._last_predictions = []
+    recognizer._last_raw_predictions = []
+    predicted = []
+
+    def predict_landmarks(batch):
+        predicted.append(len(batch))
+        return ['a'], np.array([0.9], dtype=np.float32)
+    recognizer.predict_landmarks = predict_landmarks
+
+    landmarks = np.random.default_rng(0).random((1, 63)).astype(np.float32)
+    for _ in range(6):
+        predictions = recognizer.classify_landmark_array(landmarks, ['Right'])
+    assert predicted == [1] # 2フレーム目以降は分類を省略する
+    assert recognizer.temporal.windows[0].full
+    assert recognizer.temporal._frame_count == 6
+    assert predictions[0].label == 'a'
@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+model_selection = pytest.importorskip("sklearn.model_selection")
+
+from conftest import ROOT
+from knn_engine import KnnInferenceEngine
+
+MATCH_THRESHOLD = 0.8 # ゲームが一致とみなす信頼度
+
+@pytest.fixture(scope="module")
+def split():
+    df = pd.read_csv(os.path.join(ROOT, "hand_landmarks.csv"))
+    X = df.drop('label', axis=1).values.astype(np.float32)
+    y = df['label'].values.astype(str)
+    return model_selection.train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+@pytest.mark.parametrize("mode", ["knn", "prototype"])
+def test_held_out_confidence_passes_game_threshold(split, mode):
+    X_train, X_test, y_train, y_test = split
+    engine = KnnInferenceEngine(X_train, y_train, mode=mode)
+    probabilities = engine.predict(X_test)
+    predicted = np.array(engine.labels)[probabilities.argmax(axis=1)]
+    correct = predicted == y_test
+    confidence = probabilities.max(axis=1)
+
+    assert correct.mean() > 0.95
+    # 正解した行の大半はゲームの閾値を超える信頼度で答える
+    assert (confidence[correct] > MATCH_THRESHOLD).mean() > 0.9
+    assert np.median(confidence[correct]) > 0.9
+
+def test_far_input_has_low_confidence(split):
+    X_train, _, y_train, _ = split
+    engine = KnnInferenceEngine(X_train, y_train, mode='prototype')
+    far = np.random.default_rng(0).normal(0, 1, (20, 63)).astype(np.float32)
+    assert np.median(engine.predict(far).max(axis=1)) < MATCH_THRESHOLD
@@ -0,0 +1,56 @@
+import glob
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from landmark_store import LandmarkShardWriter, read_sequences, read_shards, shard_paths
+
+def sample(i):
+    return np.full(63, i, dtype=np.float32)
+
+def test_interrupted_write_keeps_completed_shards_and_resumes(tmp_path):
+    directory = str(tmp_path / "shards")
+    with LandmarkShardWriter(directory, chunk_size=4, session="first") as writer:
+        for i in range(6):
+            writer.append(sample(i), "a" if i % 2 else "b")
+    assert len(shard_paths(directory)) == 2
+
+    # シャードの書き込み中にクラッシュした状態: 途中で切れた一時ファイルが残る
+    with open(shard_paths(directory)[0], "rb") as f:
+        truncated = f.read()[:100]
+    with open(os.path.join(directory, "shard-000002.npz.tmp"), "wb") as f:
+        f.write(truncated)
+    assert len(read_shards(directory)["label"]) == 6
+
+    writer = LandmarkShardWriter(directory, chunk_size=4, session="second")
+    assert not glob.glob(os.path.join(directory, "*.tmp"))
+    assert writer.label_counts == {"a": 3, "b": 3}
+    writer.append(sample(6), "b")
+    writer.close()
+
+    data = read_shards(directory)
+    assert os.path.basename(shard_paths(directory)[-1]) == "shard-000002.npz"
+    np.testing.assert_array_equal(data["landmarks"][:, 0], np.arange(7))
+    assert data["session"].tolist() == ["first"] * 6 + ["second"]
+
+def test_exception_inside_with_block_flushes_buffered_samples(tmp_path):
+    directory = str(tmp_path / "shards")
+    with pytest.raises(KeyboardInterrupt):
+        with LandmarkShardWriter(directory, chunk_size=256, flush_interval=60) as writer:
+            writer.append(sample(0), "a")
+            writer.append(sample(1), "a")
+            raise KeyboardInterrupt
+    assert len(read_shards(directory)["label"]) == 2
+
+def test_sequences_spanning_shards_are_regrouped(tmp_path):
+    directory = str(tmp_path / "shards")
+    with LandmarkShardWriter(directory, chunk_size=3) as writer:
+        writer.append_sequence([sample(i) for i in range(5)], "no", timestamps=list(range(5)))
+        writer.append(sample(9), "a")
+    sequences, labels = read_sequences(directory)
+    assert labels.tolist() == ["no"]
+    np.testing.assert_array_equal(sequences[0][:, 0], np.arange(5))
+
+    assert LandmarkShardWriter(directory).label_counts == {"no": 1, "a": 1}
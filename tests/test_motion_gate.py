@@ -0,0 +1,36 @@
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from motion_gate import MotionGate
+
+def frame(value):
+    return np.full((48, 64, 3), value, dtype=np.uint8)
+
+def test_still_frames_skip_detection_until_the_interval_expires():
+    gate = MotionGate(frame_threshold=2.0, max_skip_interval=0.05)
+    assert gate.frame_changed(frame(100))
+    assert not gate.frame_changed(frame(101))
+    assert gate.frame_changed(frame(120))
+    assert not gate.frame_changed(frame(120))
+
+    time.sleep(0.06)
+    # 静止が続いても max_skip_interval ごとに検出し直す
+    assert gate.frame_changed(frame(120))
+    assert (gate.frames, gate.detections_skipped) == (5, 2)
+
+def test_landmarks_compare_against_the_last_classified_hand():
+    gate = MotionGate(landmark_threshold=0.01, max_skip_interval=10)
+    hand = np.zeros((1, 63), dtype=np.float32)
+    assert gate.landmarks_changed(hand)
+    # 少しずつ動く手は、前回分類したときからの移動量で判定する
+    assert not gate.landmarks_changed(hand + 0.006)
+    assert gate.landmarks_changed(hand + 0.012)
+    # 手の数が変わったら必ず分類する
+    assert gate.landmarks_changed(np.zeros((2, 63), dtype=np.float32))
+
+    gate.reset()
+    assert gate.landmarks_changed(np.zeros((2, 63), dtype=np.float32))
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+h5py = pytest.importorskip("h5py")
+
+from conftest import ROOT
+from numpy_engine import NumpyInferenceEngine, load_dense_layers
+
+MODEL_PATH = os.path.join(ROOT, "model.h5")
+
+@pytest.fixture(scope="module")
+def X():
+    df = pd.read_csv(os.path.join(ROOT, "hand_landmarks.csv"))
+    return df.drop('label', axis=1).values.astype(np.float32)[::10]
+
+def reference_forward(x):
+    """読み込んだ重みで、バッファを使わずに float64 で順伝播する"""
+    h = x.astype(np.float64)
+    for kernel, bias, activation in load_dense_layers(MODEL_PATH):
+        h = h @ kernel.astype(np.float64) + bias
+        if activation == 'relu':
+            h = np.maximum(h, 0)
+        else:
+            assert activation == 'softmax'
+            h = np.exp(h - h.max(axis=1, keepdims=True))
+            h /= h.sum(axis=1, keepdims=True)
+    return h
+
+def test_batch_and_single_row_match_reference(X):
+    engine = NumpyInferenceEngine(MODEL_PATH)
+    expected = reference_forward(X)
+    assert (engine.input_dim, engine.output_dim) == (63, expected.shape[1])
+
+    np.testing.assert_allclose(engine.predict(X), expected, atol=1e-5)
+    # 1行推論は内部バッファを使い回すので、続けて呼んでも前の結果が混ざらない
+    for row, want in zip(X[:20], expected[:20]):
+        np.testing.assert_allclose(engine.predict(row.reshape(1, -1))[0], want, atol=1e-5)
+
+def test_matches_keras_round_trip(X):
+    keras = pytest.importorskip("tensorflow.keras")
+    keras_model = keras.models.load_model(MODEL_PATH)
+    engine = NumpyInferenceEngine(MODEL_PATH)
+
+    expected = keras_model.predict(X, verbose=0)
+    actual = engine.predict(X)
+    np.testing.assert_allclose(actual, expected, atol=1e-5)
+    assert (actual.argmax(axis=1) == expected.argmax(axis=1)).all()
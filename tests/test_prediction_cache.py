@@ -0,0 +1,35 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from prediction_cache import PredictionCache
+
+def hand(seed):
+    return np.random.default_rng(seed).uniform(0, 1, (1, 63)).astype(np.float32)
+
+def test_evicts_least_recently_used_entry():
+    cache = PredictionCache(maxsize=2)
+    cache.put(b"a", ("a", 0.9))
+    cache.put(b"b", ("b", 0.9))
+    assert cache.get(b"a") == ("a", 0.9) # a が最近使われたものになる
+
+    cache.put(b"c", ("c", 0.9))
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") == ("a", 0.9)
+    assert cache.get(b"c") == ("c", 0.9)
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1, "evictions": 1, "hit_rate": 0.75}
+
+def test_same_shape_at_another_position_and_scale_shares_a_key():
+    cache = PredictionCache()
+    landmarks = hand(0)
+    moved = (landmarks.reshape(21, 3) * 0.5 + [0.2, 0.1, 0.0]).reshape(1, 63)
+    assert cache.keys(landmarks) == cache.keys(moved)
+    assert cache.keys(landmarks) != cache.keys(hand(1))
+
+def test_clear_drops_entries():
+    cache = PredictionCache()
+    key, = cache.keys(hand(0))
+    cache.put(key, ("a", 0.9))
+    cache.clear()
+    assert cache.get(key) is None
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,132 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("PIL.ImageTk")
+
+from conftest import fake_game_screen
+from recognition_pipeline import RecognitionPipeline
+from screens.game_play_screen import GamePlayScreen
+from telemetry import NULL_TELEMETRY
+
+class CountingSource:
+    """読むたびに画素値が1ずつ増えるフレームを返す取得元"""
+    def __init__(self):
+        self.count = 0
+
+    def read(self):
+        self.count += 1
+        time.sleep(0.001)
+        return True, np.full((4, 4, 3), self.count % 256, dtype=np.uint8)
+
+class SlowRecognizer:
+    """取得は止めずに、分類結果が1つも出ないほど遅い認識器"""
+    telemetry = NULL_TELEMETRY
+
+    def pipeline(self, source, queue_size=1, retry=False):
+        stop_event = threading.Event()
+
+        def capture():
+            while not stop_event.is_set():
+                source.read()
+
+        thread = threading.Thread(target=capture, daemon=True)
+
+        class Frames:
+            def __iter__(self):
+                thread.start()
+                stop_event.wait() # 分類の結果は返さない
+                return iter(())
+
+            def close(self):
+                stop_event.set()
+        return Frames()
+
+def test_preview_advances_without_recognition_results():
+    pipeline = RecognitionPipeline(CountingSource(), SlowRecognizer())
+    pipeline.start()
+    try:
+        seen = []
+        for _ in range(5):
+            time.sleep(0.02)
+            frame = pipeline.get_latest_frame()
+            assert frame is not None
+            seen.append(int(frame[0, 0, 0]))
+        assert pipeline.get_latest() is None
+        assert seen == sorted(set(seen))
+    finally:
+        pipeline.stop()
+
+def test_game_loop_shows_every_captured_frame():
+    frames = iter(np.full((4, 4, 3), i, dtype=np.uint8) for i in range(10))
+    shown = []
+    screen = fake_game_screen(
+        scheduler=SimpleNamespace(begin=lambda: None, end=lambda recognized: 1),
+        pipeline=SimpleNamespace(get_latest=lambda: None, get_latest_frame=lambda: next(frames)),
+        _cv2_to_pil=lambda frame: int(frame[0, 0, 0]),
+        _show_result=lambda pil_image, predictions, fresh=True: shown.append((pil_image, fresh)))
+    for _ in range(10):
+        GamePlayScreen.update_game(screen)
+    # 認識結果が届かなくても、毎回のループで新しいフレームを表示する (判定は行わない)
+    assert shown == [(i, False) for i in range(10)]
+
+def test_close_before_iteration_is_not_lost():
+    from frame_pipeline import FramePipeline
+
+    pipeline = FramePipeline(CountingSource(), retry=True).buffer(1, latest_only=True)
+    pipeline.close()
+    assert list(pipeline) == []
+
+def test_finished_pipeline_can_run_again():
+    from frame_pipeline import FramePipeline
+
+    pipeline = FramePipeline(CountingSource(), max_frames=3).buffer(1)
+    assert len(list(pipeline)) == 3
+    assert len(list(pipeline)) == 3
+
+class BusyRecognizer:
+    """分類段の処理に時間がかかる認識器 (実際の FramePipeline を使う)"""
+    telemetry = NULL_TELEMETRY
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+
+    def pipeline(self, source, queue_size=1, retry=False):
+        from frame_pipeline import FramePipeline
+
+        recognizer = self
+
+        class Stage:
+            def run(self, packets):
+                for packet in packets:
+                    recognizer.active += 1
+                    recognizer.max_active = max(recognizer.max_active, recognizer.active)
+                    time.sleep(0.05) # hands.process の代わり
+                    recognizer.active -= 1
+                    yield packet
+
+        frames = FramePipeline(source, retry=retry).buffer(queue_size, latest_only=True)
+
+        class Frames:
+            def __iter__(self):
+                return Stage().run(iter(frames))
+
+            def close(self):
+                frames.close()
+        return Frames()
+
+def test_stop_right_after_start_and_rounds_do_not_overlap():
+    recognizer = BusyRecognizer()
+    for delay in (0.0, 0.02, 0.02):
+        pipeline = RecognitionPipeline(CountingSource(), recognizer)
+        pipeline.start()
+        time.sleep(delay)
+        pipeline.stop(timeout=0.01)
+        # stop() はワーカーが終わるまで戻らないので、次のラウンドと処理が重ならない
+        assert recognizer.active == 0
+    assert recognizer.max_active == 1
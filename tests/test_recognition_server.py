@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from recognition_server import MicroBatcher, RecognitionServer
+
+def run_batcher(requests, max_batch_size=32, max_wait=0.01):
+    """requests の各行数の要求を同時に投入し、(各要求の結果, predict_batch に渡った行数) を返す"""
+    batch_sizes = []
+
+    def predict_batch(batch):
+        batch_sizes.append(len(batch))
+        # 1列目の値をそのままラベルにして、結果が正しい要求に戻ったかを確認できるようにする
+        return [str(int(row[0])) for row in batch], batch[:, 1]
+
+    async def main():
+        batcher = MicroBatcher(predict_batch, max_batch_size, max_wait)
+        runner = asyncio.create_task(batcher.run())
+        try:
+            inputs = [np.column_stack([np.arange(n) + 1000 * i, np.full(n, i)]).astype(np.float32)
+                      for i, n in enumerate(requests)]
+            return await asyncio.gather(*(batcher.predict(x) for x in inputs))
+        finally:
+            runner.cancel()
+            batcher.close()
+
+    return asyncio.run(main()), batch_sizes
+
+def test_batches_never_exceed_max_batch_size():
+    results, batch_sizes = run_batcher([20, 20, 5, 30, 1])
+    assert max(batch_sizes) <= 32
+    assert sum(batch_sizes) == 76
+    for i, (labels, confidences) in enumerate(results):
+        assert labels == [str(1000 * i + j) for j in range(len(labels))]
+        assert confidences == [float(i)] * len(labels)
+
+def test_oversized_request_is_split_and_reassembled():
+    results, batch_sizes = run_batcher([70])
+    assert max(batch_sizes) <= 32
+    labels, confidences = results[0]
+    assert labels == [str(j) for j in range(70)]
+    assert len(confidences) == 70
+
+class FakeHands:
+    """静止画モードの Hands の代わり。常に1つの手を返す"""
+    def __init__(self):
+        self.frames = 0
+
+    def process(self, image):
+        self.frames += 1
+        points = [SimpleNamespace(x=0.5, y=0.5, z=0.0)] * 21
+        handedness = SimpleNamespace(classification=[SimpleNamespace(label="Right")])
+        return SimpleNamespace(multi_hand_landmarks=[SimpleNamespace(landmark=points)],
+                               multi_handedness=[handedness])
+
+def test_jpeg_detection_does_not_use_the_shared_recognizer_state():
+    def fail(*args):
+        pytest.fail("the recognizer's tracking Hands / motion gate must not be used for JPEG requests")
+
+    recognizer = SimpleNamespace(max_num_hands=2, detect=fail, predict_landmarks=lambda x: ([], []))
+    hands = FakeHands()
+    server = RecognitionServer(recognizer, hands=hands)
+    _, jpeg = cv2.imencode(".jpg", np.zeros((48, 64, 3), dtype=np.uint8))
+    try:
+        for _ in range(2):
+            landmarks, handedness = server._detect_jpeg(jpeg.tobytes())
+            assert landmarks.shape == (1, 63)
+            assert handedness == ["Right"]
+        assert hands.frames == 2
+    finally:
+        server._detect_executor.shutdown()
@@ -0,0 +1,56 @@
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from frame_pipeline import FramePipeline
+from recognition_session import RecognitionSession
+from telemetry import NULL_TELEMETRY
+
+class CountingCamera:
+    """読んだ回数を数えるカメラの代わり"""
+    def __init__(self):
+        self.reads = 0
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        self.reads += 1
+        time.sleep(0.002)
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+class PassThroughRecognizer:
+    """検出・分類をせずにフレームをそのまま流す認識器"""
+    telemetry = NULL_TELEMETRY
+
+    def set_max_num_hands(self, num_hands):
+        pass
+
+    def pipeline(self, source, queue_size=1, retry=False):
+        return FramePipeline(source, retry=retry).buffer(queue_size, latest_only=True)
+
+def test_suspend_stops_capturing_until_resume():
+    session = RecognitionSession()
+    session.recognizer = PassThroughRecognizer()
+    session.ready_event.set()
+    camera = session.cap = CountingCamera()
+
+    session.resume(pipelined=True)
+    time.sleep(0.05)
+    assert camera.reads > 0
+
+    session.suspend()
+    assert session.pipeline is None
+    reads = camera.reads
+    time.sleep(0.05)
+    assert camera.reads == reads # 取得段が止まっている
+    assert not [t for t in threading.enumerate() if t.name == "classify"]
+
+    session.resume(pipelined=True)
+    time.sleep(0.05)
+    assert camera.reads > reads
+    session.suspend()
@@ -0,0 +1,40 @@
+from collections import namedtuple
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from temporal_window import WINDOW_FEATURES, TemporalSmoother, sliding_windows
+
+Prediction = namedtuple('Prediction', ['label', 'confidence', 'handedness', 'bbox'])
+
+def sequences(count=2, length=12):
+    rng = np.random.default_rng(0)
+    return [rng.random((length, 63)).astype(np.float32) for _ in range(count)], np.array(['a', 'i'])
+
+@pytest.mark.parametrize("stride", [0, -1, 6])
+def test_sliding_windows_rejects_stride_outside_the_window(stride):
+    data, labels = sequences()
+    with pytest.raises(ValueError):
+        sliding_windows(data, labels, size=5, stride=stride)
+
+def test_sliding_windows_accepts_stride_equal_to_window():
+    data, labels = sequences()
+    X, y = sliding_windows(data, labels, size=5, stride=5)
+    assert X.shape == (4, WINDOW_FEATURES)
+    assert list(y) == ['a', 'a', 'i', 'i']
+
+class SlowSequenceModel:
+    def predict(self, x):
+        return np.tile([0.9, 0.1], (len(x), 1))
+
+def test_adaptive_stride_never_exceeds_window():
+    smoother = TemporalSmoother(window=5, budget_ms=0.0, max_hands=1)
+    smoother.sequence_engine = SlowSequenceModel() # 予算0なので毎回間隔を広げようとする
+    smoother.sequence_labels = ['a', 'i']
+    landmarks = np.random.default_rng(0).random((1, 63)).astype(np.float32)
+    strides = []
+    for _ in range(20):
+        smoother.update(landmarks, [Prediction('a', 0.5, 'Right', (0.1, 0.1, 0.3, 0.3))])
+        strides.append(smoother.stride)
+    assert max(strides) == 5
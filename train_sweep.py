@@ -0,0 +1,165 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from dataset_store import read_sources
+from gesture_model import count_parameters, save_labels
+
+# 分類モデルのハイパーパラメータ探索。
+# 層の幅・Dropout・バッチサイズ・エポック数の組み合わせを層化k分割交差検証で評価し、
+# 目標の正解率を満たすもののうちパラメータ数が最も少ないモデルを選んで学習し直す。
+# ゲーム中の推論時間はモデルの大きさで決まるため、正解率が同程度なら小さいモデルを優先する。
+
+SEARCH_SPACE = {
+    "widths": [(32,), (64,), (64, 32), (128, 64), (64, 64, 32), (128, 64, 64)],
+    "dropout": [0.0, 0.2, 0.3],
+    "batch_size": [32, 64],
+    "epochs": [10, 20],
+}
+
+# ワーカープロセスごとに一度だけ受け取るデータ
+_worker_data = {}
+
+def _init_worker(X, codes, num_classes, threads):
+    # プロセスの数だけ並列に走るため、TensorFlow のスレッド数は絞る
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+    _worker_data.update(X=X, codes=codes, num_classes=num_classes)
+
+def _run_fold(trial, fold, train_indices, test_indices, params, seed):
+    """ワーカープロセスで1つの試行の1つの分割を学習・評価する"""
+    from gesture_model import train_and_evaluate
+
+    X, codes = _worker_data["X"], _worker_data["codes"]
+    _, result = train_and_evaluate(X[train_indices], codes[train_indices], X[test_indices], codes[test_indices],
+                                   _worker_data["num_classes"], widths=params["widths"], dropout=params["dropout"],
+                                   epochs=params["epochs"], batch_size=params["batch_size"], seed=seed + fold)
+    return trial, fold, result["accuracy"], result["train_seconds"]
+
+def search_trials(mode="grid", num_trials=20, seed=0):
+    """
+    探索するハイパーパラメータの組み合わせを返す。
+
+    Args:
+        mode (str): 'grid' ならすべての組み合わせ、'random' なら num_trials 個を無作為に選ぶ。
+    """
+    names = list(SEARCH_SPACE)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(SEARCH_SPACE[n] for n in names))]
+    if mode == "grid":
+        return grid
+    if mode == "random":
+        return random.Random(seed).sample(grid, min(num_trials, len(grid)))
+    raise ValueError(f"Unknown search mode: {mode}")
+
+def run_sweep(X, y, trials, folds=5, workers=None, seed=42):
+    """
+    すべての試行・分割をプロセスプールで並列に評価する。
+
+    Returns:
+        tuple: (クラスの並び, 試行ごとの結果のリスト)
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    classes, codes = np.unique(y, return_inverse=True)
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(X, codes))
+    workers = workers or os.cpu_count() or 1
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    accuracies = [[None] * folds for _ in trials]
+    seconds = [[None] * folds for _ in trials]
+    # TensorFlow は fork したプロセスでは正しく動かないため spawn で起動する
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=(X, codes, len(classes), threads)) as executor:
+        futures = [executor.submit(_run_fold, trial, fold, train_indices, test_indices, params, seed)
+                   for trial, params in enumerate(trials)
+                   for fold, (train_indices, test_indices) in enumerate(splits)]
+        for done, future in enumerate(as_completed(futures), 1):
+            trial, fold, accuracy, train_seconds = future.result()
+            accuracies[trial][fold] = accuracy
+            seconds[trial][fold] = train_seconds
+            print(f"[{done}/{len(futures)}] trial {trial} fold {fold}: {accuracy * 100:.2f}%")
+
+    results = []
+    for trial, params in enumerate(trials):
+        results.append(dict(
+            params,
+            widths=list(params["widths"]),
+            parameters=count_parameters(X.shape[1], len(classes), params["widths"]),
+            accuracy_mean=float(np.mean(accuracies[trial])),
+            accuracy_std=float(np.std(accuracies[trial])),
+            train_seconds_mean=float(np.mean(seconds[trial])),
+        ))
+    return list(classes), results
+
+def select_model(results, target_accuracy):
+    """
+    平均正解率が target_accuracy 以上の試行のうちパラメータ数が最も少ないものを返す。
+    満たすものが無ければ平均正解率が最も高いものを返す。
+    """
+    passing = [r for r in results if r["accuracy_mean"] >= target_accuracy]
+    if passing:
+        return min(passing, key=lambda r: (r["parameters"], -r["accuracy_mean"]))
+    return max(results, key=lambda r: r["accuracy_mean"])
+
+def main():
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep with stratified k-fold for the gesture classifier.")
+    parser.add_argument("sources", nargs="+", help="ランドマークのCSV、シャードのディレクトリ、またはストア")
+    parser.add_argument("--search", choices=["grid", "random"], default="random")
+    parser.add_argument("--trials", type=int, default=20, help="random の場合の試行数")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None, help="プロセス数 (省略時はCPUのコア数)")
+    parser.add_argument("--target-accuracy", type=float, default=0.95)
+    parser.add_argument("--output", default="model_sweep.h5", help="選んだ構成で学習し直したモデルの保存先")
+    parser.add_argument("--report", default="sweep_report.json")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    X, y, _ = read_sources(args.sources)
+    trials = search_trials(args.search, args.trials, args.seed)
+    print(f"{len(X)} rows, {len(set(y))} classes, {len(trials)} trials x {args.folds} folds")
+
+    start_time = time.perf_counter()
+    classes, results = run_sweep(X, y, trials, args.folds, args.workers, args.seed)
+    sweep_seconds = time.perf_counter() - start_time
+
+    results.sort(key=lambda r: r["parameters"])
+    for r in results:
+        print(f"{str(r['widths']):<16} dropout {r['dropout']:.1f}  batch {r['batch_size']:3d}  "
+              f"epochs {r['epochs']:2d}  params {r['parameters']:6d}  "
+              f"accuracy {r['accuracy_mean'] * 100:6.2f}% ± {r['accuracy_std'] * 100:.2f}")
+    best = select_model(results, args.target_accuracy)
+    if best["accuracy_mean"] < args.target_accuracy:
+        print(f"No trial reached {args.target_accuracy * 100:.1f}%; using the most accurate one")
+    print(f"Selected: {best['widths']} dropout {best['dropout']} ({best['parameters']} parameters, "
+          f"{best['accuracy_mean'] * 100:.2f}%)")
+
+    # 選んだ構成で全データを使って学習し直し、ラベルの順序と一緒に保存する
+    import tensorflow as tf
+    from tensorflow.keras.utils import to_categorical
+
+    from gesture_model import build_model
+
+    tf.keras.utils.set_random_seed(args.seed)
+    codes = np.searchsorted(classes, y)
+    model = build_model(X.shape[1], len(classes), best["widths"], best["dropout"])
+    model.fit(X, to_categorical(codes, len(classes)), epochs=best["epochs"], batch_size=best["batch_size"], verbose=0)
+    model.save(args.output)
+    save_labels(args.output, classes)
+    print(f"Model saved to {args.output} (labels in {args.output}.labels.json)")
+
+    with open(args.report, "w") as f:
+        json.dump({"classes": classes, "folds": args.folds, "target_accuracy": args.target_accuracy,
+                   "sweep_seconds": sweep_seconds, "selected": best, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()